@@ -0,0 +1,78 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+from typing import List, Dict, Optional
+from pydantic import BaseModel
+
+from app.profiling import list_profiles, profile_path
+from app.slow_queries import ORDER_KEYS, slow_query_log
+
+router = APIRouter()
+
+class SlowQueryEntry(BaseModel):
+    fingerprint_id: str
+    fingerprint: str
+    sample: str
+    count: int
+    slow: int
+    total_ms: float
+    mean_ms: Optional[float]
+    p50_ms: Optional[float]
+    p95_ms: Optional[float]
+    max_ms: float
+    last_seen: float
+    explain: Optional[str]
+
+class SlowQueryReport(BaseModel):
+    summary: Dict
+    order_by: str
+    queries: List[SlowQueryEntry]
+
+class ProfileEntry(BaseModel):
+    id: str
+    route: str
+    size: int
+    created_at: str
+
+@router.get("/slow-queries", response_model=SlowQueryReport)
+def get_slow_queries(
+    limit: int = Query(20, ge=1, le=500, description="取得件数"),
+    order_by: str = Query("total", description="並び順（total, count, mean, p50, p95, max, slow）")
+):
+    """
+    SQL 文のフィンガープリントごとの集計（order_by の降順で上位 limit 件）
+    """
+    if order_by not in ORDER_KEYS:
+        raise HTTPException(status_code=400, detail=f"order_by は {', '.join(ORDER_KEYS)} のいずれかです")
+    return SlowQueryReport(
+        summary=slow_query_log.summary(),
+        order_by=order_by,
+        queries=slow_query_log.top(limit, order_by)
+    )
+
+@router.post("/slow-queries/reset")
+def reset_slow_queries():
+    """
+    SQL 文の集計をリセット
+    """
+    slow_query_log.reset()
+    return {"status": "reset"}
+
+@router.get("/profiles", response_model=List[ProfileEntry])
+def get_profiles(
+    route: Optional[str] = Query(None, description="ルート（GET_api_v1_hospitals_nearby など）の部分一致"),
+    limit: int = Query(50, ge=1, le=500, description="取得件数")
+):
+    """
+    出力済みのリクエストのプロファイル（新しい順）
+    """
+    return list_profiles(route, limit)
+
+@router.get("/profiles/{profile_id:path}")
+def get_profile(profile_id: str):
+    """
+    プロファイルのファイル（speedscope 形式は https://www.speedscope.app で開ける）
+    """
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="プロファイルが見つかりません")
+    return FileResponse(path, filename=profile_id.rsplit("/", 1)[-1])
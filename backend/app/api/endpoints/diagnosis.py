@@ -1,6 +1,19 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from decouple import config
+import json
+
+from app.auth.dependencies import get_current_active_user
+from app.database import get_async_db
+from app.response_cache import response_cache
+from app.auth.principal import UserPrincipal
+from app.services.async_services import AsyncDiagnosisService
+from app.services.diagnosis_rules import SPECIALTIES, diagnosis_rule_engine
+from app.services.diagnosis_scoring import diagnosis_scoring_engine
+from app.services.symptom_search import symptom_search_index
 
 router = APIRouter()
 
@@ -17,15 +30,42 @@ class MedicalSpecialty(BaseModel):
     description: str
     urgency: str  # "low", "medium", "high"
 
+class DifferentialDiagnosis(BaseModel):
+    id: int
+    name: str
+    probability: float
+
 class DiagnosisResult(BaseModel):
     possible_conditions: List[str]
     recommended_specialties: List[MedicalSpecialty]
     urgency_level: str
     advice: str
     confidence: float
+    differential_diagnoses: List[DifferentialDiagnosis] = []
+
+class BatchSymptomInput(BaseModel):
+    symptom_id: Optional[int] = None
+    name: Optional[str] = None  # symptom_id が無い場合は名前・同義語から特定
+    severity: int = Field(..., ge=1, le=10)
+
+class BatchDiagnosisItem(BaseModel):
+    external_id: Optional[str] = None  # 提携先の問診票ID（応答にそのまま返す）
+    symptoms: List[BatchSymptomInput]
+
+class BatchDiagnosisInput(BaseModel):
+    items: List[BatchDiagnosisItem]
+
+# 1回の一括診断で受け付ける件数の上限
+BATCH_MAX_ITEMS = config("DIAGNOSIS_BATCH_MAX_ITEMS", default=10000, cast=int)
+
+# 応答に使う診療科モデルは起動時に一度だけ作成する
+ANALYSIS_SPECIALTIES = {
+    specialty_id: MedicalSpecialty(id=specialty_id, **specialty)
+    for specialty_id, specialty in SPECIALTIES.items()
+}
 
 @router.post("/analyze", response_model=DiagnosisResult)
-async def analyze_symptoms(diagnosis_input: DiagnosisInput):
+async def analyze_symptoms(diagnosis_input: DiagnosisInput, db: AsyncSession = Depends(get_async_db)):
     """
     症状を分析して、考えられる病気と推奨される診療科を返す
     """
@@ -33,93 +73,71 @@ async def analyze_symptoms(diagnosis_input: DiagnosisInput):
         # 実際の実装では、機械学習モデルや医療データベースを使用
         symptoms_text = " ".join(diagnosis_input.symptoms)
         
-        # 簡単な症状マッチングロジック（実際は複雑な分析）
-        possible_conditions = []
-        recommended_specialties = []
-        urgency_level = "medium"
-        advice = "症状が続く場合は医療機関を受診してください。"
-        confidence = 0.7
-        
-        # 症状に基づく条件分岐
-        if any(keyword in symptoms_text.lower() for keyword in ["頭痛", "めまい", "意識"]):
-            possible_conditions.append("頭部の疾患")
-            recommended_specialties.append(
-                MedicalSpecialty(
-                    id="neurology",
-                    name="神経内科",
-                    description="脳神経に関する疾患を診療",
-                    urgency="medium"
-                )
-            )
-            recommended_specialties.append(
-                MedicalSpecialty(
-                    id="neurosurgery",
-                    name="脳神経外科",
-                    description="脳血管疾患や脳腫瘍の手術的治療",
-                    urgency="high"
-                )
-            )
-        
-        if any(keyword in symptoms_text.lower() for keyword in ["発熱", "咳", "喉"]):
-            possible_conditions.append("呼吸器感染症")
-            recommended_specialties.append(
-                MedicalSpecialty(
-                    id="internal_medicine",
-                    name="内科",
-                    description="一般的な内科疾患の診療",
-                    urgency="medium"
-                )
-            )
-            recommended_specialties.append(
-                MedicalSpecialty(
-                    id="respiratory",
-                    name="呼吸器科",
-                    description="肺や気管支の疾患を専門的に診療",
-                    urgency="medium"
-                )
-            )
-        
-        if any(keyword in symptoms_text.lower() for keyword in ["腹痛", "吐き気", "下痢"]):
-            possible_conditions.append("消化器疾患")
-            recommended_specialties.append(
-                MedicalSpecialty(
-                    id="gastroenterology",
-                    name="消化器科",
-                    description="胃腸や肝臓の疾患を診療",
-                    urgency="medium"
-                )
-            )
-        
-        # 緊急度の判定
-        if any(keyword in symptoms_text.lower() for keyword in ["激痛", "意識消失", "呼吸困難"]):
-            urgency_level = "high"
-            advice = "緊急性が高い可能性があります。すぐに医療機関を受診してください。"
-            confidence = 0.9
+        # コンパイル済みのルールで全キーワードを1回の走査で照合
+        rule_match = diagnosis_rule_engine.match(symptoms_text)
         
-        # デフォルトの診療科を追加
-        if not recommended_specialties:
-            recommended_specialties.append(
-                MedicalSpecialty(
-                    id="general",
-                    name="一般内科",
-                    description="幅広い疾患に対応する総合診療",
-                    urgency="medium"
-                )
-            )
-            possible_conditions.append("一般的な疾患")
+        # 入力に現れた症状から、メモリ上の重み行列で全診断を採点
+        await db.run_sync(symptom_search_index.ensure_built)
+        await db.run_sync(diagnosis_scoring_engine.ensure_built)
+        candidates = diagnosis_scoring_engine.rank(
+            symptom_search_index.find_mentions(symptoms_text)
+        )
         
         return DiagnosisResult(
-            possible_conditions=possible_conditions,
-            recommended_specialties=recommended_specialties,
-            urgency_level=urgency_level,
-            advice=advice,
-            confidence=confidence
+            possible_conditions=rule_match.conditions,
+            recommended_specialties=[
+                ANALYSIS_SPECIALTIES[specialty_id] for specialty_id in rule_match.specialty_ids
+            ],
+            urgency_level=rule_match.urgency_level,
+            advice=rule_match.advice,
+            confidence=rule_match.confidence,
+            differential_diagnoses=[
+                DifferentialDiagnosis(**candidate.to_dict()) for candidate in candidates
+            ]
         )
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"診断処理中にエラーが発生しました: {str(e)}")
 
+@router.post("/analyze/batch")
+async def analyze_symptoms_batch(
+    batch_input: BatchDiagnosisInput,
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    複数の症状セットをまとめて分析し、1件ずつ NDJSON で返す
+    
+    採点はまとめて行い、診断結果は一括で保存する。各行は入力と同じ順で、
+    index と external_id を含む。
+    """
+    if len(batch_input.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"一度に分析できるのは {BATCH_MAX_ITEMS} 件までです"
+        )
+    
+    try:
+        diagnosis_service = AsyncDiagnosisService(db)
+        results = await diagnosis_service.analyze_symptoms_batch(
+            current_user.id,
+            [
+                [symptom.model_dump(exclude_none=True) for symptom in item.symptoms]
+                for item in batch_input.items
+            ]
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"一括診断中にエラーが発生しました: {str(e)}")
+    
+    def generate_lines():
+        for index, (item, result) in enumerate(zip(batch_input.items, results)):
+            line = {"index": index, "external_id": item.external_id, **result}
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(generate_lines(), media_type="application/x-ndjson")
+
 @router.get("/specialties", response_model=List[MedicalSpecialty])
+@response_cache.cached_response()
 async def get_medical_specialties():
     """
     すべての診療科を取得するエンドポイント
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, HTTPException, Query, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from pydantic import BaseModel
+from datetime import datetime
 
-from app.database import get_db
-from app.services.hospital_service import HospitalService
+from app.database import get_async_db
+from app.services.async_services import AsyncHospitalService
 from app.models.hospital import Hospital as HospitalModel
 
 router = APIRouter()
@@ -37,19 +38,22 @@ class HospitalSearchParams(BaseModel):
     user_location: Optional[Location] = None
     max_distance: Optional[float] = 10.0  # km
     emergency_only: bool = False
+    open_now: bool = False
+    open_at: Optional[datetime] = None  # 指定日時に営業中の病院のみ
 
 @router.post("/search", response_model=List[Hospital])
-async def search_hospitals(search_params: HospitalSearchParams, db: Session = Depends(get_db)):
+async def search_hospitals(search_params: HospitalSearchParams, db: AsyncSession = Depends(get_async_db)):
     """
     病院を検索するエンドポイント
     診療科、位置情報、距離などで絞り込み
     """
     try:
-        hospital_service = HospitalService(db)
+        hospital_service = AsyncHospitalService(db)
         
         # 診療科での検索
         specialty_name = search_params.specialties[0] if search_params.specialties else None
-        hospitals = hospital_service.search_hospitals("", specialty_name)
+        open_at = search_params.open_at or (datetime.now() if search_params.open_now else None)
+        hospitals = await hospital_service.search_hospitals("", specialty_name, open_at=open_at)
         
         # 病院データをAPIレスポンス形式に変換
         result_hospitals = []
@@ -90,17 +94,20 @@ async def get_nearby_hospitals(
     longitude: float = Query(..., description="経度"),
     radius: float = Query(5.0, description="検索半径(km)"),
     specialty: Optional[str] = Query(None, description="診療科"),
-    db: Session = Depends(get_db)
+    open_now: bool = Query(False, description="現在営業中の病院のみ"),
+    open_at: Optional[datetime] = Query(None, description="指定日時に営業中の病院のみ"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     現在地周辺の病院を取得するエンドポイント
     """
     try:
-        hospital_service = HospitalService(db)
+        hospital_service = AsyncHospitalService(db)
         
         # 近くの病院を検索
-        nearby_hospitals_data = hospital_service.get_nearby_hospitals(
-            latitude, longitude, radius, specialty
+        nearby_hospitals_data = await hospital_service.get_nearby_hospitals(
+            latitude, longitude, radius, specialty,
+            open_at=open_at or (datetime.now() if open_now else None)
         )
         
         # レスポンス形式に変換
@@ -137,13 +144,13 @@ async def get_nearby_hospitals(
         raise HTTPException(status_code=500, detail=f"周辺病院検索中にエラーが発生しました: {str(e)}")
 
 @router.get("/{hospital_id}", response_model=Hospital)
-async def get_hospital_details(hospital_id: str, db: Session = Depends(get_db)):
+async def get_hospital_details(hospital_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     病院の詳細情報を取得するエンドポイント
     """
     try:
-        hospital_service = HospitalService(db)
-        hospital = hospital_service.get_hospital_detail(int(hospital_id))
+        hospital_service = AsyncHospitalService(db)
+        hospital = await hospital_service.get_hospital_detail(int(hospital_id))
         
         if not hospital:
             raise HTTPException(status_code=404, detail="病院が見つかりません")
@@ -3,6 +3,8 @@ from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 
+from app.response_cache import response_cache
+
 router = APIRouter()
 
 class NewsItem(BaseModel):
@@ -222,6 +224,7 @@ async def get_hospital_news(
         raise HTTPException(status_code=500, detail=f"病院ニュース取得中にエラーが発生しました: {str(e)}")
 
 @router.get("/categories")
+@response_cache.cached_response()
 async def get_news_categories():
     """
     ニュースカテゴリ一覧を取得するエンドポイント
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_async_db, get_db
+from app.models.hospital import Hospital
+from app.models.news import HealthNews, HealthAlert
 from app.services.hospital_scraper import HospitalScraper
 from app.services.news_scraper import HealthNewsScraper
-from typing import List, Dict
+from app.services.scraping_jobs import JOB_STATUSES, ScrapingJobService, job_to_dict
+from typing import List, Dict, Optional
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -19,29 +24,38 @@ class HospitalScrapingRequest(BaseModel):
     prefectures: List[str] = ["東京都", "神奈川県", "埼玉県", "千葉県"]
     cities: List[str] = []
 
+class ScrapingJobResponse(BaseModel):
+    id: int
+    source: str
+    status: str
+    params: Dict
+    progress: Optional[Dict]
+    result: Optional[Dict]
+    error: Optional[str]
+    cancel_requested: bool
+    created_at: Optional[str]
+    started_at: Optional[str]
+    finished_at: Optional[str]
+
+# 本格スクレイピングはジョブとして登録し、別プロセスのワーカー（python -m app.worker）が
+# 実行する。即時実行（テスト用）のエンドポイントは def にしてスレッドプールで実行する
 @router.post("/hospitals/scrape", response_model=ScrapingResult)
-async def scrape_hospitals(
+def scrape_hospitals(
     request: HospitalScrapingRequest,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
-    病院情報をスクレイピングするエンドポイント
+    病院情報のスクレイピングをジョブとして登録するエンドポイント
     """
     try:
-        scraper = HospitalScraper(db)
-        
-        # バックグラウンドタスクとして実行
-        background_tasks.add_task(
-            run_hospital_scraping_task,
-            scraper,
-            request.prefectures
+        job = ScrapingJobService(db).enqueue(
+            "hospitals", {"prefectures": request.prefectures, "cities": request.cities}
         )
         
         return ScrapingResult(
-            status="started",
-            message="病院情報のスクレイピングを開始しました",
-            data={"prefectures": request.prefectures},
+            status="queued",
+            message="病院情報のスクレイピングを登録しました",
+            data={"job_id": job.id, "prefectures": request.prefectures},
             timestamp=datetime.now().isoformat()
         )
         
@@ -52,7 +66,7 @@ async def scrape_hospitals(
         )
 
 @router.post("/hospitals/scrape/immediate", response_model=ScrapingResult)
-async def scrape_hospitals_immediate(
+def scrape_hospitals_immediate(
     request: HospitalScrapingRequest,
     db: Session = Depends(get_db)
 ):
@@ -87,23 +101,17 @@ async def scrape_hospitals_immediate(
         )
 
 @router.post("/news/scrape", response_model=ScrapingResult)
-async def scrape_health_news(
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
-):
+def scrape_health_news(db: Session = Depends(get_db)):
     """
-    健康ニュースをスクレイピングするエンドポイント
+    健康ニュースのスクレイピングをジョブとして登録するエンドポイント
     """
     try:
-        scraper = HealthNewsScraper(db)
-        
-        # バックグラウンドタスクとして実行
-        background_tasks.add_task(run_news_scraping_task, scraper)
+        job = ScrapingJobService(db).enqueue("news")
         
         return ScrapingResult(
-            status="started",
-            message="健康ニュースのスクレイピングを開始しました",
-            data={},
+            status="queued",
+            message="健康ニュースのスクレイピングを登録しました",
+            data={"job_id": job.id},
             timestamp=datetime.now().isoformat()
         )
         
@@ -114,7 +122,7 @@ async def scrape_health_news(
         )
 
 @router.post("/news/scrape/immediate", response_model=ScrapingResult)
-async def scrape_health_news_immediate(db: Session = Depends(get_db)):
+def scrape_health_news_immediate(db: Session = Depends(get_db)):
     """
     健康ニュースを即座にスクレイピングするエンドポイント（テスト用）
     """
@@ -136,24 +144,22 @@ async def scrape_health_news_immediate(db: Session = Depends(get_db)):
         )
 
 @router.post("/all/scrape", response_model=ScrapingResult)
-async def scrape_all_data(
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
-):
+def scrape_all_data(db: Session = Depends(get_db)):
     """
-    すべてのデータ（病院情報・健康ニュース）をスクレイピングするエンドポイント
+    すべてのデータ（病院情報・健康ニュース）のスクレイピングをジョブとして登録するエンドポイント
     """
     try:
-        hospital_scraper = HospitalScraper(db)
-        news_scraper = HealthNewsScraper(db)
-        
-        # バックグラウンドタスクとして実行
-        background_tasks.add_task(run_full_scraping_task, hospital_scraper, news_scraper)
+        service = ScrapingJobService(db)
+        # ソースごとに別のジョブにする（ソースごとの同時実行数の上限で並行して実行される）
+        jobs = [
+            service.enqueue("hospitals", {"prefectures": HospitalScrapingRequest().prefectures}),
+            service.enqueue("news"),
+        ]
         
         return ScrapingResult(
-            status="started",
-            message="全データのスクレイピングを開始しました",
-            data={},
+            status="queued",
+            message="全データのスクレイピングを登録しました",
+            data={"job_ids": [job.id for job in jobs]},
             timestamp=datetime.now().isoformat()
         )
         
@@ -164,31 +170,30 @@ async def scrape_all_data(
         )
 
 @router.get("/status", response_model=Dict)
-async def get_scraping_status(db: Session = Depends(get_db)):
+async def get_scraping_status(db: AsyncSession = Depends(get_async_db)):
     """
     スクレイピングの状態を確認するエンドポイント
     """
     try:
-        # データベースから最新のスクレイピング結果を取得
-        from app.models.hospital import Hospital
-        from app.models.news import HealthNews, HealthAlert
-        
-        hospital_count = db.query(Hospital).count()
-        news_count = db.query(HealthNews).count()
-        alert_count = db.query(HealthAlert).count()
-        
-        # 最新のデータ取得日時
-        latest_hospital = db.query(Hospital).order_by(Hospital.last_updated.desc()).first()
-        latest_news = db.query(HealthNews).order_by(HealthNews.created_at.desc()).first()
+        # 件数と最新のデータ取得日時を1回のクエリでまとめて取得
+        hospital_count, news_count, alert_count, hospital_last_updated, news_last_updated = (
+            await db.execute(select(
+                select(func.count(Hospital.id)).scalar_subquery(),
+                select(func.count(HealthNews.id)).scalar_subquery(),
+                select(func.count(HealthAlert.id)).scalar_subquery(),
+                select(func.max(Hospital.last_updated)).scalar_subquery(),
+                select(func.max(HealthNews.created_at)).scalar_subquery(),
+            ))
+        ).one()
         
         return {
             "hospitals": {
                 "total": hospital_count,
-                "last_updated": latest_hospital.last_updated.isoformat() if latest_hospital else None
+                "last_updated": hospital_last_updated.isoformat() if hospital_last_updated else None
             },
             "news": {
                 "total": news_count,
-                "last_updated": latest_news.created_at.isoformat() if latest_news else None
+                "last_updated": news_last_updated.isoformat() if news_last_updated else None
             },
             "alerts": {
                 "total": alert_count
@@ -202,35 +207,37 @@ async def get_scraping_status(db: Session = Depends(get_db)):
             detail=f"ステータス取得に失敗しました: {str(e)}"
         )
 
-# バックグラウンドタスク関数
-async def run_hospital_scraping_task(scraper: HospitalScraper, prefectures: List[str]):
-    """病院スクレイピングをバックグラウンドで実行"""
-    try:
-        results = scraper.run_full_scraping(prefectures)
-        print(f"Hospital scraping completed: {results}")
-    except Exception as e:
-        print(f"Hospital scraping failed: {e}")
+@router.get("/jobs", response_model=List[ScrapingJobResponse])
+def list_scraping_jobs(
+    status: Optional[str] = Query(None, description="状態で絞り込み"),
+    source: Optional[str] = Query(None, description="ソースで絞り込み（hospitals / news）"),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db)
+):
+    """
+    スクレイピングジョブの一覧（新しい順）
+    """
+    if status is not None and status not in JOB_STATUSES:
+        raise HTTPException(status_code=400, detail=f"不明な状態です: {status}")
+    jobs = ScrapingJobService(db).list_jobs(status=status, source=source, limit=limit)
+    return [job_to_dict(job) for job in jobs]
 
-async def run_news_scraping_task(scraper: HealthNewsScraper):
-    """ニューススクレイピングをバックグラウンドで実行"""
-    try:
-        results = scraper.run_full_scraping()
-        print(f"News scraping completed: {results}")
-    except Exception as e:
-        print(f"News scraping failed: {e}")
+@router.get("/jobs/{job_id}", response_model=ScrapingJobResponse)
+def get_scraping_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    スクレイピングジョブの状態・進捗・結果
+    """
+    job = ScrapingJobService(db).get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    return job_to_dict(job)
 
-async def run_full_scraping_task(hospital_scraper: HospitalScraper, news_scraper: HealthNewsScraper):
-    """全データスクレイピングをバックグラウンドで実行"""
-    try:
-        # 病院データのスクレイピング
-        hospital_results = hospital_scraper.run_full_scraping()
-        print(f"Hospital scraping completed: {hospital_results}")
-        
-        # ニュースデータのスクレイピング
-        news_results = news_scraper.run_full_scraping()
-        print(f"News scraping completed: {news_results}")
-        
-        print("All scraping tasks completed successfully")
-        
-    except Exception as e:
-        print(f"Full scraping failed: {e}")
\ No newline at end of file
+@router.post("/jobs/{job_id}/cancel", response_model=ScrapingJobResponse)
+def cancel_scraping_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    スクレイピングジョブを取り消す（実行中のジョブは次の進捗報告の時点で停止）
+    """
+    job = ScrapingJobService(db).cancel_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    return job_to_dict(job)
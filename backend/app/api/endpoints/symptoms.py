@@ -1,7 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from pydantic import BaseModel
 
+from app.database import get_async_db
+from app.response_cache import response_cache
+from app.services.async_services import AsyncSymptomService
+
 router = APIRouter()
 
 class SymptomInput(BaseModel):
@@ -50,27 +55,34 @@ async def input_symptom(symptom: SymptomInput):
         raise HTTPException(status_code=500, detail=f"症状の処理中にエラーが発生しました: {str(e)}")
 
 @router.get("/suggestions", response_model=List[SymptomSuggestion])
-async def get_symptom_suggestions(category: Optional[str] = None):
+@response_cache.cached_response("symptoms")
+async def get_symptom_suggestions(
+    category: Optional[str] = Query(None, description="症状カテゴリ"),
+    q: Optional[str] = Query(None, description="入力途中の症状名（読み・同義語も可）"),
+    limit: int = Query(10, ge=1, le=50, description="取得件数"),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     症状候補を取得するエンドポイント
-    選択式の症状入力で使用
+    選択式の症状入力・入力補完で使用（よく記録される症状が先頭）
     """
-    # 実際の実装では データベースから取得
-    suggestions = [
-        SymptomSuggestion(text="頭痛", category="頭部", common=True),
-        SymptomSuggestion(text="発熱", category="全身", common=True),
-        SymptomSuggestion(text="腹痛", category="腹部", common=True),
-        SymptomSuggestion(text="咳", category="呼吸器", common=True),
-        SymptomSuggestion(text="めまい", category="頭部", common=False),
-        SymptomSuggestion(text="吐き気", category="消化器", common=False),
-    ]
-    
-    if category:
-        suggestions = [s for s in suggestions if s.category == category]
-    
-    return suggestions
+    try:
+        symptom_service = AsyncSymptomService(db)
+        suggestions = await symptom_service.get_symptom_suggestions(q or "", category, limit)
+        
+        return [
+            SymptomSuggestion(
+                text=suggestion["name"],
+                category=suggestion["category"],
+                common=suggestion["common"]
+            )
+            for suggestion in suggestions
+        ]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"症状候補の取得中にエラーが発生しました: {str(e)}")
 
 @router.get("/categories")
+@response_cache.cached_response()
 async def get_symptom_categories():
     """
     症状カテゴリを取得するエンドポイント
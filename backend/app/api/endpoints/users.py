@@ -1,13 +1,13 @@
 from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
 
-from app.database import get_db
-from app.services.user_service import UserService
+from app.database import get_async_db
+from app.services.async_services import AsyncUserService
 from app.auth.dependencies import get_current_active_user
-from app.models.user import User
+from app.auth.principal import UserPrincipal
 
 router = APIRouter()
 
@@ -68,16 +68,16 @@ class PasswordChange(BaseModel):
     new_password: str
 
 @router.post("/login")
-async def login_user(user_login: UserLogin, db: Session = Depends(get_db)):
+async def login_user(user_login: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """ユーザーログインエンドポイント"""
-    user_service = UserService(db)
-    return user_service.login(user_login.email, user_login.password)
+    user_service = AsyncUserService(db)
+    return await user_service.login(user_login.email, user_login.password)
 
 @router.post("/register", response_model=UserProfile)
-async def register_user(user_data: UserRegistration, db: Session = Depends(get_db)):
+async def register_user(user_data: UserRegistration, db: AsyncSession = Depends(get_async_db)):
     """ユーザー登録エンドポイント"""
-    user_service = UserService(db)
-    user = user_service.create_user(user_data.dict())
+    user_service = AsyncUserService(db)
+    user = await user_service.create_user(user_data.dict())
     
     return UserProfile(
         id=user.id,
@@ -98,35 +98,26 @@ async def register_user(user_data: UserRegistration, db: Session = Depends(get_d
     )
 
 @router.get("/profile", response_model=UserProfile)
-async def get_user_profile(current_user: User = Depends(get_current_active_user)):
+async def get_user_profile(
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
     """ユーザープロフィールを取得するエンドポイント"""
-    return UserProfile(
-        id=current_user.id,
-        email=current_user.email,
-        full_name=current_user.full_name,
-        phone_number=current_user.phone_number,
-        birth_date=current_user.birth_date,
-        gender=current_user.gender,
-        address=current_user.address,
-        emergency_contact_name=current_user.emergency_contact_name,
-        emergency_contact_phone=current_user.emergency_contact_phone,
-        medical_history=current_user.medical_history,
-        allergies=current_user.allergies,
-        medications=current_user.medications,
-        is_verified=current_user.is_verified,
-        created_at=current_user.created_at,
-        updated_at=current_user.updated_at
-    )
+    user_service = AsyncUserService(db)
+    profile = await user_service.get_user_profile(current_user.id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return UserProfile(**profile)
 
 @router.put("/profile", response_model=UserProfile)
 async def update_user_profile(
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """ユーザープロフィールを更新するエンドポイント"""
-    user_service = UserService(db)
-    updated_user = user_service.update_user(current_user.id, user_update.dict(exclude_unset=True))
+    user_service = AsyncUserService(db)
+    updated_user = await user_service.update_user(current_user.id, user_update.dict(exclude_unset=True))
     
     return UserProfile(
         id=updated_user.id,
@@ -179,12 +170,12 @@ async def get_notification_preferences():
 @router.put("/password")
 async def change_password(
     password_change: PasswordChange,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """パスワードを変更するエンドポイント"""
-    user_service = UserService(db)
-    user_service.change_password(
+    user_service = AsyncUserService(db)
+    await user_service.change_password(
         current_user.id, 
         password_change.current_password, 
         password_change.new_password
@@ -193,10 +184,10 @@ async def change_password(
 
 @router.delete("/account")
 async def delete_user_account(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """ユーザーアカウントを削除するエンドポイント"""
-    user_service = UserService(db)
-    user_service.delete_user(current_user.id)
+    user_service = AsyncUserService(db)
+    await user_service.delete_user(current_user.id)
     return {"message": "アカウントが正常に削除されました"}
\ No newline at end of file
@@ -1,6 +1,7 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
-from app.api.endpoints import symptoms, diagnosis, hospitals, users, news, scraping
+from app.api.endpoints import symptoms, diagnosis, hospitals, users, news, scraping, admin
+from app.auth.dependencies import require_admin_token
 
 router = APIRouter()
 
@@ -9,4 +10,7 @@ router.include_router(diagnosis.router, prefix="/diagnosis", tags=["診断"])
 router.include_router(hospitals.router, prefix="/hospitals", tags=["病院"])
 router.include_router(users.router, prefix="/users", tags=["ユーザー"])
 router.include_router(news.router, prefix="/news", tags=["ニュース・情報"])
-router.include_router(scraping.router, prefix="/scraping", tags=["スクレイピング"])
\ No newline at end of file
+router.include_router(scraping.router, prefix="/scraping", tags=["スクレイピング"])
+router.include_router(
+    admin.router, prefix="/admin", tags=["管理"], dependencies=[Depends(require_admin_token)]
+)
\ No newline at end of file
@@ -1,6 +1,7 @@
 from .jwt_handler import create_access_token, verify_token, get_current_user
 from .password import hash_password, verify_password
-from .dependencies import get_current_active_user
+from .dependencies import get_current_active_user, require_admin_token
+from .principal import UserPrincipal, invalidate_user
 
 __all__ = [
     "create_access_token",
@@ -8,5 +9,8 @@ __all__ = [
     "get_current_user",
     "hash_password",
     "verify_password",
-    "get_current_active_user"
+    "get_current_active_user",
+    "require_admin_token",
+    "UserPrincipal",
+    "invalidate_user"
 ]
\ No newline at end of file
@@ -1,19 +1,39 @@
-from fastapi import Depends, HTTPException, status
+import hmac
+from typing import Optional
+
+from decouple import config
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.user import User
 from app.auth.jwt_handler import verify_token
+from app.auth.principal import (
+    UserPrincipal, cache_principal, current_generation, get_cached_principal
+)
 
 security = HTTPBearer()
 
+# 管理用エンドポイント（/api/v1/admin/*）の X-Admin-Token。空なら管理用エンドポイントは無効
+ADMIN_TOKEN = config("ADMIN_TOKEN", default="")
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-) -> User:
-    """現在認証されているユーザーを取得"""
+) -> UserPrincipal:
+    """現在認証されているユーザーを取得
+
+    検証済みのトークンは短時間キャッシュし、その間は JWT の検証と
+    users テーブルの参照を省略する（Session は使うまで接続しない）。
+    """
+    token = credentials.credentials
+    cached = get_cached_principal(token)
+    if cached is not None:
+        return cached[1]
+
+    generation = current_generation()
     try:
-        payload = verify_token(credentials.credentials)
+        payload = verify_token(token)
         user_email = payload.get("sub")
         
         user = db.query(User).filter(User.email == user_email).first()
@@ -23,7 +43,9 @@ def get_current_user(
                 detail="User not found",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        return user
+        principal = UserPrincipal.from_user(user)
+        cache_principal(token, payload, principal, generation)
+        return principal
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -31,11 +53,26 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_active_user(current_user: UserPrincipal = Depends(get_current_user)) -> UserPrincipal:
     """現在のアクティブユーザーを取得"""
     if not current_user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Inactive user"
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """X-Admin-Token ヘッダーが ADMIN_TOKEN と一致するか確認"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not Found"
+        )
+    if x_admin_token is None or not hmac.compare_digest(
+        x_admin_token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid admin token"
+        )
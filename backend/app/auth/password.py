@@ -1,6 +1,36 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from decouple import config
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.metrics import registry
+
+# bcrypt のコスト。変更すると古いコストのハッシュはログイン時に再ハッシュされる
+BCRYPT_ROUNDS = config("BCRYPT_ROUNDS", default=12, cast=int)
+
+# ハッシュ化・照合を行うワーカー（thread / process）
+PASSWORD_HASH_EXECUTOR = config("PASSWORD_HASH_EXECUTOR", default="thread")
+PASSWORD_HASH_WORKERS = config("PASSWORD_HASH_WORKERS", default=min(4, os.cpu_count() or 1), cast=int)
+# 実行中のものに加えて待たせておける件数。超えた分は 503 を返す
+PASSWORD_HASH_QUEUE_LIMIT = config("PASSWORD_HASH_QUEUE_LIMIT", default=32, cast=int)
+
+# bcrypt 1回は数百ミリ秒なので、それに合わせたバケット
+HASH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    # 設定と異なるコストのハッシュは needs_update で再ハッシュ対象になる
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
 def hash_password(password: str) -> str:
     """パスワードをハッシュ化"""
@@ -8,4 +38,115 @@ def hash_password(password: str) -> str:
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """パスワードを検証"""
-    return pwd_context.verify(plain_password, hashed_password)
\ No newline at end of file
+    return pwd_context.verify(plain_password, hashed_password)
+
+def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """パスワードを検証し、コストが古ければ新しいハッシュも返す"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def _timed(func, *args):
+    """ワーカー内で func を実行し、開始時刻と所要時間を一緒に返す"""
+    started = time.monotonic()
+    result = func(*args)
+    return started, time.monotonic() - started, result
+
+
+class PasswordHasher:
+    """bcrypt のハッシュ化・照合をワーカープールで実行する
+
+    イベントループ上で bcrypt を実行すると、その間すべてのリクエストが止まる。
+    ここでは専用のプールに回し、実行中と待機中の合計が上限に達したら
+    新しい依頼を受け付けず 503 を返す（ログインが集中しても待ち行列が
+    際限なく伸びないようにする）。
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS,
+                 queue_limit: int = PASSWORD_HASH_QUEUE_LIMIT,
+                 executor_type: str = PASSWORD_HASH_EXECUTOR):
+        self.workers = max(1, workers)
+        self.queue_limit = max(0, queue_limit)
+        self.executor_type = executor_type
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+        self.hash_seconds = registry.histogram(
+            "password_hash_seconds", "パスワードのハッシュ化・照合の所要時間", HASH_BUCKETS
+        )
+        self.queue_wait_seconds = registry.histogram(
+            "password_hash_queue_wait_seconds", "パスワード処理がワーカーを待った時間"
+        )
+        self.rejected = registry.counter(
+            "password_hash_rejected_total", "混雑により受け付けなかったパスワード処理の件数"
+        )
+        self.rehashed = registry.counter(
+            "password_rehash_total", "ログイン時にコストを更新して再ハッシュした件数"
+        )
+        registry.gauge("password_hash_pending", "実行中・待機中のパスワード処理の件数",
+                       lambda: self._pending)
+
+    @property
+    def capacity(self) -> int:
+        """同時に受け付けられる件数（実行中 + 待機中）"""
+        return self.workers + self.queue_limit
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    async def _submit(self, func, *args):
+        with self._lock:
+            if self._pending >= self.capacity:
+                self.rejected.inc()
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Authentication service is busy, please retry",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+            executor = self._get_executor()
+
+        try:
+            submitted = time.monotonic()
+            future = executor.submit(_timed, func, *args)
+            started, elapsed, result = await asyncio.wrap_future(future)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+        self.queue_wait_seconds.observe(max(0.0, started - submitted))
+        self.hash_seconds.observe(elapsed)
+        return result
+
+    async def hash(self, password: str) -> str:
+        """パスワードをハッシュ化"""
+        return await self._submit(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """パスワードを検証"""
+        return await self._submit(verify_password, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str,
+                                hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """パスワードを検証し、コストが古ければ新しいハッシュも返す"""
+        verified, new_hash = await self._submit(verify_and_update, plain_password, hashed_password)
+        if new_hash:
+            self.rehashed.inc()
+        return verified, new_hash
+
+    def shutdown(self):
+        """ワーカープールを停止"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+password_hasher = PasswordHasher()
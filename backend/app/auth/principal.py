@@ -0,0 +1,92 @@
+import hmac
+import threading
+import time
+from typing import Optional, Tuple
+
+from decouple import config
+
+from app.cache import TTLCache
+
+# 検証済みトークンとユーザー情報を保持する時間（秒）。
+# 別プロセスでの更新はこの時間だけ遅れて反映される
+AUTH_CACHE_TTL_SECONDS = config("AUTH_CACHE_TTL_SECONDS", default=60, cast=float)
+AUTH_CACHE_MAX_ENTRIES = config("AUTH_CACHE_MAX_ENTRIES", default=10000, cast=int)
+
+
+class UserPrincipal:
+    """認証済みユーザーの軽量な表現（User 行の代わりに依存関係で渡す）"""
+
+    __slots__ = ("id", "email", "is_active", "is_verified")
+
+    def __init__(self, user_id: int, email: str, is_active: bool, is_verified: bool):
+        self.id = user_id
+        self.email = email
+        self.is_active = is_active
+        self.is_verified = is_verified
+
+    @classmethod
+    def from_user(cls, user) -> "UserPrincipal":
+        return cls(user.id, user.email, bool(user.is_active), bool(user.is_verified))
+
+
+# トークンの署名部分 -> (トークン全体, ペイロード, UserPrincipal)
+token_cache = TTLCache("auth_token", AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL_SECONDS)
+# ユーザーID -> プロフィールの dict
+profile_cache = TTLCache("user_profile", AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL_SECONDS)
+
+# 無効化のたびに進める世代。DB から読んでいる間に無効化があれば
+# 読んだ値は古い可能性があるため保存しない
+_generation = 0
+_generation_lock = threading.Lock()
+
+
+def _signature(token: str) -> str:
+    return token.rsplit(".", 1)[-1]
+
+
+def current_generation() -> int:
+    """DB から読む前に取得しておき、保存時に渡す"""
+    return _generation
+
+
+def get_cached_principal(token: str) -> Optional[Tuple[dict, UserPrincipal]]:
+    """検証済みトークンのペイロードとユーザーを返す（無ければ None）"""
+    entry = token_cache.get(_signature(token))
+    if entry is None:
+        return None
+    cached_token, payload, principal = entry
+    # 署名だけ一致する別トークンを通さないよう、トークン全体も比較する
+    if not hmac.compare_digest(cached_token, token):
+        return None
+    return payload, principal
+
+
+def cache_principal(token: str, payload: dict, principal: UserPrincipal, generation: int):
+    """検証済みトークンを保存（generation 以降に無効化されていれば保存しない）"""
+    ttl = AUTH_CACHE_TTL_SECONDS
+    expires_at = payload.get("exp")
+    if expires_at is not None:
+        # トークンの有効期限を越えてキャッシュしない
+        ttl = min(ttl, float(expires_at) - time.time())
+    with _generation_lock:
+        if generation == _generation:
+            token_cache.set(_signature(token), (token, payload, principal), ttl)
+
+
+def get_cached_profile(user_id: int) -> Optional[dict]:
+    return profile_cache.get(user_id)
+
+
+def cache_profile(user_id: int, profile: dict, generation: int):
+    with _generation_lock:
+        if generation == _generation:
+            profile_cache.set(user_id, profile)
+
+
+def invalidate_user(user_id: int):
+    """ユーザーの更新・削除・パスワード変更時にキャッシュを破棄"""
+    global _generation
+    with _generation_lock:
+        _generation += 1
+        token_cache.pop_where(lambda key, entry: entry[2].id == user_id)
+        profile_cache.pop(user_id)
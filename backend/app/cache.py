@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from app.metrics import registry
+
+
+class TTLCache:
+    """有効期限つきの LRU キャッシュ（スレッドセーフ）
+
+    エントリごとに有効期限を持ち、期限切れは取得時に捨てる。件数が
+    max_entries を超えたら最も長く使われていないものから追い出す。
+    ヒット・ミス件数と現在の件数は name を接頭辞としてメトリクスに登録する。
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl_seconds: float):
+        self.name = name
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = registry.counter(f"{name}_cache_hits_total", f"{name} キャッシュのヒット件数")
+        self.misses = registry.counter(f"{name}_cache_misses_total", f"{name} キャッシュのミス件数")
+        registry.gauge(f"{name}_cache_entries", f"{name} キャッシュの件数", lambda: len(self._entries))
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """有効なエントリの値を返す（無ければ default）"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits.inc()
+                    return value
+                del self._entries[key]
+        self.misses.inc()
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        """値を保存（ttl_seconds を省略すると既定の有効期間）"""
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        """エントリを削除"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def pop_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """条件に合うエントリをまとめて削除し、削除した件数を返す"""
+        with self._lock:
+            keys = [key for key, (_, value) in self._entries.items() if predicate(key, value)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,141 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from decouple import config
+from sqlalchemy import event
+from starlette.routing import Match
+
+from app.metrics import Counter, Histogram, UpDownGauge, registry
+
+# メトリクスを記録しないパス（/metrics 自体など）
+METRICS_EXCLUDED_PATHS = {
+    path.strip() for path in config("METRICS_EXCLUDED_PATHS", default="/metrics").split(",") if path.strip()
+}
+
+# 1リクエストあたりのクエリ数のバケット
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+# どのルートにも一致しなかったリクエストのラベル（パスをそのまま使うと系列が増え続ける）
+UNMATCHED_ROUTE = "unmatched"
+
+ROUTE_LABELS = ("method", "route")
+
+http_requests = registry.family(
+    "http_requests_total", "HTTPリクエスト数", ROUTE_LABELS + ("status",),
+    lambda: Counter("http_requests_total", "HTTPリクエスト数")
+)
+http_request_seconds = registry.family(
+    "http_request_duration_seconds", "HTTPリクエストの処理時間", ROUTE_LABELS,
+    lambda: Histogram("http_request_duration_seconds", "HTTPリクエストの処理時間")
+)
+http_requests_in_progress = registry.family(
+    "http_requests_in_progress", "処理中のHTTPリクエスト数", ROUTE_LABELS,
+    lambda: UpDownGauge("http_requests_in_progress", "処理中のHTTPリクエスト数")
+)
+http_request_db_queries = registry.family(
+    "http_request_db_queries", "1リクエストで実行したSQL文の数", ROUTE_LABELS,
+    lambda: Histogram("http_request_db_queries", "1リクエストで実行したSQL文の数", QUERY_COUNT_BUCKETS)
+)
+http_request_db_seconds = registry.family(
+    "http_request_db_seconds", "1リクエストでSQL文の実行にかかった時間", ROUTE_LABELS,
+    lambda: Histogram("http_request_db_seconds", "1リクエストでSQL文の実行にかかった時間")
+)
+db_queries = registry.counter("db_queries_total", "実行したSQL文の数（リクエスト外も含む）")
+db_query_seconds = registry.histogram("db_query_seconds", "SQL文1件の実行時間")
+
+
+class RequestStats:
+    """処理中のリクエストで実行した SQL 文の数と時間"""
+
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# 処理中のリクエストの RequestStats（スレッドプールで実行されるエンドポイントにも引き継がれる）
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    db_queries.inc()
+    db_query_seconds.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+
+def _handle_error(exception_context):
+    # 失敗した文も after_cursor_execute は呼ばれないため開始時刻を捨てる
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
+def instrument_engine(target):
+    """エンジンの SQL 文の数と実行時間を記録する（非同期エンジンは sync_engine に登録）"""
+    target = getattr(target, "sync_engine", target)
+    if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        event.listen(target, "before_cursor_execute", _before_cursor_execute)
+        event.listen(target, "after_cursor_execute", _after_cursor_execute)
+        event.listen(target, "handle_error", _handle_error)
+
+
+def route_template(app, scope) -> str:
+    """リクエストに一致するルートのパスのテンプレート（/hospitals/{hospital_id} など）"""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", UNMATCHED_ROUTE)
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """ルートごとのレイテンシ・処理中の件数・SQL 文の数と時間を記録する ASGI ミドルウェア"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in METRICS_EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope["app"], scope)
+        in_progress = http_requests_in_progress.labels(method, route)
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            _request_stats.reset(token)
+            http_requests.labels(method, route, status_code).inc()
+            http_request_seconds.labels(method, route).observe(elapsed)
+            http_request_db_queries.labels(method, route).observe(stats.queries)
+            http_request_db_seconds.labels(method, route).observe(stats.db_seconds)
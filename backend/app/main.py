@@ -1,11 +1,17 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
+from sqlalchemy import text
 from decouple import config
 import uvicorn
 
 from app.api.routes import router as api_router
-from app.database import create_tables
+from app.auth.password import password_hasher
+from app.database import async_engine, create_tables, engine, pool_status
+from app.instrumentation import MetricsMiddleware, instrument_engine
+from app.metrics import registry, render_prometheus
+from app.profiling import ProfilingMiddleware
+from app.slow_queries import SLOW_QUERY_EXPLAIN, slow_query_log
 
 app = FastAPI(
     title="Symptom Checker API",
@@ -25,6 +31,11 @@ async def startup_event():
     except Exception as e:
         print(f"初期データ投入でエラーが発生しました（既に存在する場合は正常）: {e}")
 
+@app.on_event("shutdown")
+def shutdown_event():
+    password_hasher.shutdown()
+    slow_query_log.shutdown()
+
 # CORS設定
 origins = config("CORS_ORIGINS", default="http://localhost:8080,http://localhost:3000").split(",")
 app.add_middleware(
@@ -35,6 +46,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 署名つきの X-Profile ヘッダー・PROFILE_SAMPLE_RATE で選ばれたリクエストをプロファイル
+app.add_middleware(ProfilingMiddleware)
+
+# ルートごとのレイテンシ・SQL 文の数と時間を記録（最後に追加し、一番外側で計測する）
+instrument_engine(engine)
+instrument_engine(async_engine)
+app.add_middleware(MetricsMiddleware)
+
+# SQL 文をフィンガープリントごとに集計（/api/v1/admin/slow-queries で参照）
+slow_query_log.install(engine, explain=SLOW_QUERY_EXPLAIN)
+slow_query_log.install(async_engine)
+
 # APIルートの追加
 app.include_router(api_router, prefix="/api/v1")
 
@@ -56,6 +79,33 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "symptom-checker-api"}
 
+@app.get("/health/db")
+def database_health_check():
+    """データベースへの疎通とコネクションプールの状態を返す"""
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        status = "healthy"
+    except Exception as e:
+        print(f"データベースのヘルスチェックに失敗しました: {e}")
+        status = "unhealthy"
+    
+    return JSONResponse(
+        status_code=200 if status == "healthy" else 503,
+        content={
+            "status": status,
+            "pool": pool_status(),
+            "metrics": registry.snapshot("db_pool_"),
+            "async_pool": pool_status(async_engine),
+            "async_metrics": registry.snapshot("db_async_pool_")
+        }
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus 形式のメトリクス"""
+    return PlainTextResponse(render_prometheus(registry), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     uvicorn.run(
         "app.main:app",
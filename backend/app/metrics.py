@@ -0,0 +1,296 @@
+import bisect
+import math
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# 待ち時間などの秒単位ヒストグラムの既定バケット（上限値）
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Counter:
+    """単調増加するカウンタ"""
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def snapshot(self) -> float:
+        return self._value
+
+
+class Gauge:
+    """現在値を返すゲージ（値は取得時にコールバックで読む）"""
+
+    def __init__(self, name: str, description: str, read: Callable[[], float]):
+        self.name = name
+        self.description = description
+        self._read = read
+
+    @property
+    def value(self) -> float:
+        return self._read()
+
+    def snapshot(self) -> float:
+        return self._read()
+
+
+class UpDownGauge:
+    """増減させて使うゲージ（処理中の件数など）"""
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self._value -= amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def snapshot(self) -> float:
+        return self._value
+
+
+class Histogram:
+    """固定バケットのヒストグラム（累積ではなくバケットごとの件数を保持）"""
+
+    def __init__(self, name: str, description: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # 最後は +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def cumulative_counts(self) -> List[int]:
+        """上限値ごとの累積件数（最後は +Inf）"""
+        total = 0
+        cumulative = []
+        for count in self._counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+    def quantile(self, q: float) -> Optional[float]:
+        """バケット内の線形補間による分位点の推定値（観測が無ければ None）"""
+        counts = self.cumulative_counts()
+        total = counts[-1]
+        if not total:
+            return None
+        rank = q * total
+        lower = 0.0
+        previous = 0
+        for upper, cumulative in zip(self.buckets, counts):
+            if cumulative >= rank:
+                in_bucket = cumulative - previous
+                fraction = (rank - previous) / in_bucket if in_bucket else 0.0
+                return lower + (upper - lower) * fraction
+            lower, previous = upper, cumulative
+        return self.buckets[-1]
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self._count,
+            "sum": round(self._sum, 6),
+            "p50": self._rounded(self.quantile(0.5)),
+            "p95": self._rounded(self.quantile(0.95)),
+            "p99": self._rounded(self.quantile(0.99)),
+            "buckets": {
+                str(upper): count
+                for upper, count in zip(list(self.buckets) + ["+Inf"], self.cumulative_counts())
+            },
+        }
+
+    def _rounded(self, value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value, 6)
+
+
+class MetricFamily:
+    """ラベルの値ごとに子メトリクスを持つメトリクス（ルートごとのレイテンシなど）
+
+    ラベルの値の組み合わせはそのまま系列の数になるため、パスそのものではなく
+    ルートのテンプレートのように値の種類が限られるものを使う。
+    """
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str],
+                 factory: Callable[[], object]):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._factory = factory
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def kind(self) -> type:
+        return type(self._factory())
+
+    def labels(self, *values) -> object:
+        """ラベルの値（label_names の順）に対応する子メトリクス"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._factory()
+                    self._children[key] = child
+        return child
+
+    def children(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def snapshot(self) -> dict:
+        return {",".join(key): child.snapshot() for key, child in self.children()}
+
+
+class MetricsRegistry:
+    """プロセス内のメトリクスを名前で管理"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, description: str) -> Counter:
+        return self._get_or_register(name, lambda: Counter(name, description))
+
+    def histogram(self, name: str, description: str,
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_register(name, lambda: Histogram(name, description, buckets))
+
+    def gauge(self, name: str, description: str, read: Callable[[], float]) -> Gauge:
+        # ゲージは読み取り先（エンジンなど）が変わることがあるため常に置き換える
+        return self.register(Gauge(name, description, read))
+
+    def up_down_gauge(self, name: str, description: str) -> UpDownGauge:
+        return self._get_or_register(name, lambda: UpDownGauge(name, description))
+
+    def family(self, name: str, description: str, label_names: Sequence[str],
+               factory: Callable[[], object]) -> MetricFamily:
+        """ラベルつきのメトリクス（factory は子メトリクスを作る関数）"""
+        return self._get_or_register(
+            name, lambda: MetricFamily(name, description, label_names, factory)
+        )
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def metrics(self) -> List[object]:
+        return list(self._metrics.values())
+
+    def snapshot(self, prefix: str = "") -> dict:
+        """名前が prefix で始まるメトリクスの現在値"""
+        return {
+            name: metric.snapshot()
+            for name, metric in sorted(self._metrics.items())
+            if name.startswith(prefix)
+        }
+
+    def _get_or_register(self, name: str, factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = factory()
+                self._metrics[name] = metric
+            return metric
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + "}"
+
+
+def _render_samples(lines: List[str], name: str, metric, labels: Sequence[Tuple[str, str]]):
+    if isinstance(metric, Histogram):
+        bounds = [_format_value(upper) for upper in metric.buckets] + ["+Inf"]
+        for upper, count in zip(bounds, metric.cumulative_counts()):
+            lines.append(f"{name}_bucket{_format_labels(list(labels) + [('le', upper)])} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(metric.sum)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {metric.count}")
+    else:
+        lines.append(f"{name}{_format_labels(labels)} {_format_value(metric.value)}")
+
+
+def _prometheus_type(kind: type) -> str:
+    if issubclass(kind, Counter):
+        return "counter"
+    if issubclass(kind, Histogram):
+        return "histogram"
+    return "gauge"
+
+
+def render_prometheus(metrics_registry: "MetricsRegistry") -> str:
+    """Prometheus のテキスト形式（0.0.4）で出力"""
+    lines: List[str] = []
+    for metric in sorted(metrics_registry.metrics(), key=lambda metric: metric.name):
+        is_family = isinstance(metric, MetricFamily)
+        kind = metric.kind if is_family else type(metric)
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {_prometheus_type(kind)}")
+        try:
+            if is_family:
+                for values, child in metric.children():
+                    _render_samples(lines, metric.name, child, list(zip(metric.label_names, values)))
+            else:
+                _render_samples(lines, metric.name, metric, [])
+        except Exception as e:
+            # ゲージの読み取り先が使えない場合もほかのメトリクスは出力する
+            print(f"メトリクス {metric.name} の読み取りに失敗しました: {e}")
+    return "\n".join(lines) + "\n"
+
+
+# プロセス内で共有するメトリクス
+registry = MetricsRegistry()
@@ -1,17 +1,21 @@
 from .user import User
-from .symptom import Symptom, UserSymptom
-from .diagnosis import Diagnosis, DiagnosisResult
+from .symptom import Symptom, UserSymptom, SymptomAlias
+from .diagnosis import Diagnosis, DiagnosisResult, DiagnosisSymptom
 from .hospital import Hospital, HospitalSpecialty
 from .news import HealthNews, HealthAlert
+from .scraping_job import ScrapingJob
 
 __all__ = [
     "User",
     "Symptom", 
     "UserSymptom",
+    "SymptomAlias",
     "Diagnosis",
     "DiagnosisResult", 
+    "DiagnosisSymptom",
     "Hospital",
     "HospitalSpecialty",
     "HealthNews",
-    "HealthAlert"
+    "HealthAlert",
+    "ScrapingJob"
 ]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, Float, JSON
+from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, Float, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from .base import Base, BaseModel
 
@@ -18,6 +18,21 @@ class Diagnosis(Base, BaseModel):
 
     # Relationships
     diagnosis_results = relationship("DiagnosisResult", back_populates="diagnosis")
+    symptom_links = relationship("DiagnosisSymptom", back_populates="diagnosis")
+
+class DiagnosisSymptom(Base, BaseModel):
+    __tablename__ = "diagnosis_symptoms"
+    __table_args__ = (
+        UniqueConstraint("diagnosis_id", "symptom_id", name="uq_diagnosis_symptoms_pair"),
+    )
+
+    diagnosis_id = Column(Integer, ForeignKey("diagnoses.id"), nullable=False, index=True)
+    symptom_id = Column(Integer, ForeignKey("symptoms.id"), nullable=False, index=True)
+    likelihood = Column(Float, nullable=False)  # P(symptom | diagnosis), 0.0-1.0
+
+    # Relationships
+    diagnosis = relationship("Diagnosis", back_populates="symptom_links")
+    symptom = relationship("Symptom")
 
 class DiagnosisResult(Base, BaseModel):
     __tablename__ = "diagnosis_results"
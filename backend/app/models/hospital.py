@@ -1,9 +1,13 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, Float, Time, DateTime
+from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, Float, Time, DateTime, Index
 from sqlalchemy.orm import relationship
 from .base import Base, BaseModel
 
 class Hospital(Base, BaseModel):
     __tablename__ = "hospitals"
+    __table_args__ = (
+        # スクレイピングの一括 upsert（ON CONFLICT）で使う自然キー
+        Index("uq_hospitals_name_address", "name", "address", unique=True),
+    )
 
     name = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
@@ -47,6 +51,9 @@ class Hospital(Base, BaseModel):
 
 class HospitalSpecialty(Base, BaseModel):
     __tablename__ = "hospital_specialties"
+    __table_args__ = (
+        Index("uq_hospital_specialties_hospital_name", "hospital_id", "specialty_name", unique=True),
+    )
 
     hospital_id = Column(Integer, ForeignKey("hospitals.id"), nullable=False)
     specialty_name = Column(String(100), nullable=False)
@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from .base import Base, BaseModel
 
 class HealthNews(Base, BaseModel):
     __tablename__ = "health_news"
+    __table_args__ = (
+        Index("uq_health_news_content_hash", "content_hash", unique=True),
+    )
 
     title = Column(String(500), nullable=False)
     content = Column(Text, nullable=False)
@@ -18,9 +21,13 @@ class HealthNews(Base, BaseModel):
     is_featured = Column(Boolean, default=False)
     is_published = Column(Boolean, default=True)
     view_count = Column(Integer, default=0)
+    content_hash = Column(String(64), nullable=True)  # スクレイピング時の重複判定用（ソース + タイトル）
 
 class HealthAlert(Base, BaseModel):
     __tablename__ = "health_alerts"
+    __table_args__ = (
+        Index("uq_health_alerts_content_hash", "content_hash", unique=True),
+    )
 
     title = Column(String(500), nullable=False)
     message = Column(Text, nullable=False)
@@ -32,4 +39,5 @@ class HealthAlert(Base, BaseModel):
     source_authority = Column(String(255), nullable=False)
     source_url = Column(String(1000), nullable=True)
     is_active = Column(Boolean, default=True)
-    is_public = Column(Boolean, default=True)
\ No newline at end of file
+    is_public = Column(Boolean, default=True)
+    content_hash = Column(String(64), nullable=True)  # スクレイピング時の重複判定用（発信元 + タイトル + 地域）
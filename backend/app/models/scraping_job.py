@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, Text, Boolean, DateTime, Index
+from .base import Base, BaseModel
+
+class ScrapingJob(Base, BaseModel):
+    __tablename__ = "scraping_jobs"
+    __table_args__ = (
+        # ワーカーが実行待ちのジョブを探す・ソースごとの実行中の件数を数える
+        Index("ix_scraping_jobs_status_source", "status", "source"),
+    )
+
+    source = Column(String(20), nullable=False)  # 'hospitals', 'news'
+    status = Column(String(20), nullable=False, default="queued")  # 'queued', 'running', 'succeeded', 'failed', 'cancelled'
+    params = Column(Text, nullable=True)  # JSON string
+    progress = Column(Text, nullable=True)  # JSON string（途中経過）
+    result = Column(Text, nullable=True)  # JSON string
+    error = Column(Text, nullable=True)
+    cancel_requested = Column(Boolean, default=False)
+    worker_id = Column(String(100), nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)  # 実行中のワーカーが定期的に更新
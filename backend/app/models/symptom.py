@@ -15,6 +15,7 @@ class Symptom(Base, BaseModel):
 
     # Relationships
     user_symptoms = relationship("UserSymptom", back_populates="symptom")
+    aliases = relationship("SymptomAlias", back_populates="symptom")
 
 class UserSymptom(Base, BaseModel):
     __tablename__ = "user_symptoms"
@@ -29,4 +30,14 @@ class UserSymptom(Base, BaseModel):
 
     # Relationships
     user = relationship("User", back_populates="user_symptoms")
-    symptom = relationship("Symptom", back_populates="user_symptoms")
\ No newline at end of file
+    symptom = relationship("Symptom", back_populates="user_symptoms")
+
+class SymptomAlias(Base, BaseModel):
+    __tablename__ = "symptom_aliases"
+
+    symptom_id = Column(Integer, ForeignKey("symptoms.id"), nullable=False, index=True)
+    alias = Column(String(255), nullable=False)
+    alias_type = Column(String(20), default="synonym")  # 'reading', 'synonym'
+
+    # Relationships
+    symptom = relationship("Symptom", back_populates="aliases")
@@ -0,0 +1,315 @@
+"""リクエスト単位のサンプリングプロファイラ
+
+X-Profile ヘッダー（ADMIN_TOKEN で署名した有効期限つきの値）を付けたリクエストと、
+PROFILE_SAMPLE_RATE の割合で選ばれたリクエストについて、処理中のスタックを
+一定間隔で採取し、PROFILE_OUTPUT_DIR/<メソッド>_<ルート>/<時刻>.<形式> に書き出す。
+対象外のリクエストはヘッダーの確認と乱数1回だけで素通りする。
+
+署名の作成例（backend ディレクトリで）:
+    python -m app.profiling sign /api/v1/hospitals/nearby --ttl 600
+"""
+import argparse
+import contextvars
+import hashlib
+import hmac
+import json
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import anyio
+from decouple import config
+
+from app.auth.dependencies import ADMIN_TOKEN
+from app.instrumentation import route_template
+
+# 署名なしでプロファイルするリクエストの割合（0〜1、0 なら無効）
+PROFILE_SAMPLE_RATE = config("PROFILE_SAMPLE_RATE", default=0.0, cast=float)
+# スタックを採取する間隔（ミリ秒）
+PROFILE_INTERVAL_MS = config("PROFILE_INTERVAL_MS", default=5.0, cast=float)
+# 1リクエストでスタックを採取する最長時間（秒）
+PROFILE_MAX_SECONDS = config("PROFILE_MAX_SECONDS", default=60.0, cast=float)
+# 出力先と形式（speedscope / collapsed）、残すファイル数の上限
+PROFILE_OUTPUT_DIR = config("PROFILE_OUTPUT_DIR", default="profiles")
+PROFILE_FORMAT = config("PROFILE_FORMAT", default="speedscope")
+PROFILE_MAX_FILES = config("PROFILE_MAX_FILES", default=200, cast=int)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_FORMATS = {"speedscope": ".speedscope.json", "collapsed": ".collapsed.txt"}
+
+# リクエストの処理がどのスレッドでも実行されていない（I/O 待ちなど）ときのスタック
+WAITING_FRAME = ("<waiting>", "", 0)
+
+# 処理中のリクエストのプロファイラ（スレッドプールで実行される処理にも引き継がれる）
+_active_profiler: contextvars.ContextVar[Optional["RequestProfiler"]] = contextvars.ContextVar(
+    "active_profiler", default=None
+)
+
+Frame = Tuple[str, str, int]
+
+
+def sign_profile_request(path: str, expires: int, token: str = ADMIN_TOKEN) -> str:
+    """path のプロファイルを expires（UNIX 時刻）まで許可する X-Profile ヘッダーの値"""
+    signature = hmac.new(token.encode("utf-8"), f"{path}:{expires}".encode("utf-8"), hashlib.sha256)
+    return f"{expires}.{signature.hexdigest()}"
+
+
+def verify_profile_request(path: str, value: str) -> bool:
+    if not ADMIN_TOKEN:
+        return False
+    expires, _, _ = value.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(value, sign_profile_request(path, int(expires)))
+
+
+class RequestProfiler:
+    """1リクエストの処理中のスタックを別スレッドで一定間隔ごとに採取する
+
+    イベントループのスレッドではこのリクエストのミドルウェアより上のフレームを、
+    スレッドプールではこのリクエストのコンテキストで実行中のフレームを採取する。
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000,
+                 max_seconds: float = PROFILE_MAX_SECONDS):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.samples: List[Tuple[Tuple[Frame, ...], float]] = []
+        self.started_at = 0.0
+        self.elapsed = 0.0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._labels: Dict[object, Frame] = {}
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started_at
+
+    def _run(self):
+        own = threading.get_ident()
+        previous = self.started_at
+        while not self._stopped.wait(self.interval):
+            now = time.perf_counter()
+            if now - self.started_at > self.max_seconds:
+                break
+            stacks = [
+                stack for thread_id, frame in sys._current_frames().items()
+                if thread_id != own and (stack := self._request_stack(frame))
+            ]
+            weight = now - previous
+            previous = now
+            for stack in stacks or [(WAITING_FRAME,)]:
+                self.samples.append((stack, weight))
+
+    def _request_stack(self, frame) -> Optional[Tuple[Frame, ...]]:
+        """このリクエストを処理中のフレーム（呼び出し元から順）。無関係なスレッドなら None"""
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            if code is _MIDDLEWARE_CODE and frame.f_locals.get("profiler") is self:
+                break
+            if "context" in code.co_varnames:
+                context = frame.f_locals.get("context")
+                if isinstance(context, contextvars.Context) and context.get(_active_profiler) is self:
+                    # 処理を終えたワーカースレッドは次の仕事を待つ間も直前のコンテキストを持っている
+                    if frames and frames[-1].f_code.co_filename == queue.__file__:
+                        return None
+                    break
+            frames.append(frame)
+            frame = frame.f_back
+        else:
+            return None
+        return tuple(self._label(item) for item in reversed(frames))
+
+    def _label(self, frame) -> Frame:
+        code = frame.f_code
+        label = self._labels.get(code)
+        if label is None:
+            label = (code.co_qualname, code.co_filename, code.co_firstlineno)
+            self._labels[code] = label
+        return label
+
+    def collapsed(self) -> str:
+        """flamegraph.pl などで読める折りたたみ形式（ミリ秒単位の重み）"""
+        totals: Counter = Counter()
+        for stack, weight in self.samples:
+            totals[";".join(_frame_name(frame) for frame in stack)] += weight
+        return "".join(f"{stack} {round(weight * 1000)}\n" for stack, weight in totals.items())
+
+    def speedscope(self, name: str) -> Dict:
+        """https://www.speedscope.app で開ける形式"""
+        indexes: Dict[Frame, int] = {}
+        frames = []
+        samples = []
+        for stack, _ in self.samples:
+            sample = []
+            for frame in stack:
+                index = indexes.get(frame)
+                if index is None:
+                    index = indexes[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                sample.append(index)
+            samples.append(sample)
+        weights = [round(weight * 1000, 3) for _, weight in self.samples]
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "symptom-checker-api",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+def _frame_name(frame: Frame) -> str:
+    name, filename, line = frame
+    if not filename:
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def profile_dir_name(method: str, route: str) -> str:
+    return f"{method}_{re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'}"
+
+
+def list_profiles(route: Optional[str] = None, limit: int = 50) -> List[Dict]:
+    """出力済みのプロファイル（新しい順）。route はディレクトリ名の部分一致"""
+    if not os.path.isdir(PROFILE_OUTPUT_DIR):
+        return []
+    profiles = []
+    for directory in os.listdir(PROFILE_OUTPUT_DIR):
+        if route and route not in directory:
+            continue
+        path = os.path.join(PROFILE_OUTPUT_DIR, directory)
+        if not os.path.isdir(path):
+            continue
+        for filename in os.listdir(path):
+            stat = os.stat(os.path.join(path, filename))
+            profiles.append({
+                "id": f"{directory}/{filename}",
+                "route": directory,
+                "size": stat.st_size,
+                "created_at": datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat(),
+            })
+    profiles.sort(key=lambda item: item["id"].split("/", 1)[1], reverse=True)
+    return profiles[:limit]
+
+
+def profile_path(profile_id: str) -> Optional[str]:
+    """プロファイルの ID から出力先のファイルのパス（出力先の外を指す ID は None）"""
+    root = os.path.realpath(PROFILE_OUTPUT_DIR)
+    path = os.path.realpath(os.path.join(root, profile_id))
+    if os.path.dirname(os.path.dirname(path)) != root or not os.path.isfile(path):
+        return None
+    return path
+
+
+def _prune_profiles():
+    profiles = list_profiles(limit=sys.maxsize)
+    for profile in profiles[max(0, PROFILE_MAX_FILES):]:
+        try:
+            os.remove(os.path.join(PROFILE_OUTPUT_DIR, profile["id"]))
+        except OSError:
+            pass
+
+
+def write_profile(profiler: RequestProfiler, profile_id: str, name: str):
+    path = os.path.join(PROFILE_OUTPUT_DIR, profile_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        if profile_id.endswith(PROFILE_FORMATS["collapsed"]):
+            f.write(profiler.collapsed())
+        else:
+            json.dump(profiler.speedscope(name), f, ensure_ascii=False)
+    _prune_profiles()
+
+
+class ProfilingMiddleware:
+    """対象のリクエストの処理中のスタックを採取してファイルに書き出す ASGI ミドルウェア
+
+    署名つきの X-Profile ヘッダーで要求された場合は、応答の X-Profile-Id に出力先の ID を返す。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        requested = False
+        for key, value in scope["headers"]:
+            if key == PROFILE_HEADER:
+                requested = verify_profile_request(scope["path"], value.decode("latin-1"))
+                break
+        if not requested and not (PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE):
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope["app"], scope)
+        now = datetime.now(timezone.utc)
+        extension = PROFILE_FORMATS.get(PROFILE_FORMAT, PROFILE_FORMATS["speedscope"])
+        profile_id = f"{profile_dir_name(method, route)}/{now.strftime('%Y%m%dT%H%M%S_%f')}Z{extension}"
+
+        async def send_wrapper(message):
+            if requested and message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        profiler = RequestProfiler()
+        token = _active_profiler.set(profiler)
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            _active_profiler.reset(token)
+            name = f"{method} {route} {now.isoformat()} ({profiler.elapsed * 1000:.1f}ms)"
+            try:
+                await anyio.to_thread.run_sync(write_profile, profiler, profile_id, name)
+            except Exception as e:
+                print(f"プロファイルの書き出しに失敗しました: {e}")
+
+
+# イベントループのスレッドで、このミドルウェアより上がリクエストの処理
+_MIDDLEWARE_CODE = ProfilingMiddleware.__call__.__code__
+
+
+def main():
+    parser = argparse.ArgumentParser(description="リクエストのプロファイル")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    sign = subparsers.add_parser("sign", help="X-Profile ヘッダーの値を作成")
+    sign.add_argument("path", help="プロファイルするパス（例: /api/v1/hospitals/nearby）")
+    sign.add_argument("--ttl", type=int, default=600, help="有効期間（秒）")
+    args = parser.parse_args()
+
+    if not ADMIN_TOKEN:
+        parser.error("ADMIN_TOKEN が設定されていません")
+    print(sign_profile_request(args.path, int(time.time()) + args.ttl))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import functools
+import hashlib
+import inspect
+import json
+import threading
+from typing import Callable, Dict, Iterable, Tuple
+
+from decouple import config
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+
+from app.cache import TTLCache
+
+# バージョンで無効化するため、TTL は他プロセスでの更新を反映するまでの上限
+RESPONSE_CACHE_TTL_SECONDS = config("RESPONSE_CACHE_TTL_SECONDS", default=300, cast=float)
+RESPONSE_CACHE_MAX_ENTRIES = config("RESPONSE_CACHE_MAX_ENTRIES", default=1024, cast=int)
+
+
+class CachedBody:
+    """シリアライズ済みの応答本文と ETag"""
+
+    __slots__ = ("body", "etag")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match に etag が含まれるか（304 の判定は弱い比較）"""
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def render_json(content) -> bytes:
+    """JSONResponse と同じ形式でシリアライズ"""
+    return json.dumps(
+        jsonable_encoder(content),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class ResponseCache:
+    """読み取り中心のエンドポイントの応答・クエリ結果のキャッシュ
+
+    キャッシュのキーにはデータの種類（"symptoms" や "news" など）ごとの
+    バージョンを含める。作成系のサービスメソッドが invalidate で
+    バージョンを進めると、以降は古いエントリが参照されなくなる
+    （古いエントリは LRU と TTL で自然に消える）。
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS):
+        self._entries = TTLCache("response", max_entries, ttl_seconds)
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def versions(self, namespaces: Iterable[str]) -> Tuple[int, ...]:
+        return tuple(self._versions.get(namespace, 0) for namespace in namespaces)
+
+    def invalidate(self, *namespaces: str):
+        """データの種類ごとのバージョンを進める"""
+        with self._lock:
+            for namespace in namespaces:
+                self._versions[namespace] = self._versions.get(namespace, 0) + 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def set(self, key, value):
+        self._entries.set(key, value)
+
+    def cached_response(self, *namespaces: str, max_age: int = 0):
+        """GET エンドポイントの応答本文をキャッシュし、ETag / 304 に対応するデコレータ
+
+        キーはパス・クエリ文字列・namespaces のバージョン。応答は response_model を
+        通さずに返すため、エンドポイントは応答モデルと同じ形の値を返すこと。
+        namespaces を指定しなければプロセスの実行中は変わらない応答として扱う。
+        """
+        cache_control = f"public, max-age={max_age}" if max_age else "no-cache"
+
+        def decorator(endpoint: Callable):
+            is_coroutine = inspect.iscoroutinefunction(endpoint)
+            signature = inspect.signature(endpoint)
+            request_param = next(
+                (name for name, param in signature.parameters.items() if param.annotation is Request),
+                None,
+            )
+            if request_param is None:
+                # Request を受け取らないエンドポイントには引数を追加する
+                parameters = list(signature.parameters.values())
+                parameters.append(inspect.Parameter(
+                    "_cache_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request
+                ))
+                signature = signature.replace(parameters=parameters)
+
+            @functools.wraps(endpoint)
+            async def wrapper(*args, **kwargs):
+                if request_param is None:
+                    request = kwargs.pop("_cache_request")
+                else:
+                    request = kwargs[request_param]
+
+                key = (
+                    request.url.path,
+                    tuple(sorted(request.query_params.multi_items())),
+                    namespaces,
+                    self.versions(namespaces),
+                )
+                cached = self.get(key)
+                if cached is None:
+                    if is_coroutine:
+                        content = await endpoint(*args, **kwargs)
+                    else:
+                        content = await run_in_threadpool(endpoint, *args, **kwargs)
+                    cached = CachedBody(render_json(content))
+                    self.set(key, cached)
+
+                headers = {"ETag": cached.etag, "Cache-Control": cache_control}
+                if_none_match = request.headers.get("if-none-match")
+                if if_none_match and _etag_matches(if_none_match, cached.etag):
+                    return Response(status_code=304, headers=headers)
+                return Response(content=cached.body, media_type="application/json", headers=headers)
+
+            wrapper.__signature__ = signature
+            return wrapper
+
+        return decorator
+
+    def cached_query(self, *namespaces: str):
+        """サービスメソッドの結果を namespaces のバージョンごとにキャッシュするデコレータ
+
+        結果はそのまま共有されるため、ORM オブジェクトではなく文字列や dict など
+        変更されない値を返すメソッドに使う。
+        """
+
+        def decorator(method: Callable):
+            @functools.wraps(method)
+            def wrapper(service, *args, **kwargs):
+                key = (
+                    method.__qualname__,
+                    args,
+                    tuple(sorted(kwargs.items())),
+                    self.versions(namespaces),
+                )
+                result = self.get(key)
+                if result is None:
+                    result = method(service, *args, **kwargs)
+                    self.set(key, result)
+                return result
+
+            return wrapper
+
+        return decorator
+
+
+response_cache = ResponseCache()
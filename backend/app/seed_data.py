@@ -1,7 +1,7 @@
 from sqlalchemy.orm import Session
 from app.database import SessionLocal
-from app.models.symptom import Symptom
-from app.models.diagnosis import Diagnosis
+from app.models.symptom import Symptom, SymptomAlias
+from app.models.diagnosis import Diagnosis, DiagnosisSymptom
 from app.models.hospital import Hospital, HospitalSpecialty
 from app.models.news import HealthNews, HealthAlert
 from datetime import datetime, time
@@ -13,8 +13,12 @@ def seed_database():
     try:
         # 症状データ
         seed_symptoms(db)
+        # 症状の読み・同義語
+        seed_symptom_aliases(db)
         # 診断データ
         seed_diagnoses(db)
+        # 診断と症状の関連（出現確率）
+        seed_diagnosis_symptoms(db)
         # 病院データ
         seed_hospitals(db)
         # ニュースデータ
@@ -55,6 +59,39 @@ def seed_symptoms(db: Session):
             symptom = Symptom(**symptom_data)
             db.add(symptom)
 
+def seed_symptom_aliases(db: Session):
+    """症状の読み（よみがな）と同義語を投入"""
+    aliases_data = {
+        "発熱": {"readings": ["はつねつ"], "synonyms": ["熱", "熱がある"]},
+        "頭痛": {"readings": ["ずつう"], "synonyms": ["頭が痛い"]},
+        "咳": {"readings": ["せき"], "synonyms": ["せきが出る"]},
+        "のどの痛み": {"readings": ["のどのいたみ"], "synonyms": ["喉の痛み", "咽頭痛"]},
+        "鼻水": {"readings": ["はなみず"], "synonyms": ["鼻汁"]},
+        "腹痛": {"readings": ["ふくつう"], "synonyms": ["お腹が痛い", "腹が痛い"]},
+        "吐き気": {"readings": ["はきけ"], "synonyms": ["悪心", "むかつき"]},
+        "下痢": {"readings": ["げり"], "synonyms": ["軟便"]},
+        "胸痛": {"readings": ["きょうつう"], "synonyms": ["胸の痛み"]},
+        "息切れ": {"readings": ["いきぎれ"], "synonyms": ["息苦しさ"]},
+        "めまい": {"readings": [], "synonyms": ["眩暈", "ふらつき"]},
+        "疲労感": {"readings": ["ひろうかん"], "synonyms": ["だるさ", "倦怠感"]},
+        "関節痛": {"readings": ["かんせつつう"], "synonyms": ["関節の痛み"]},
+        "皮疹": {"readings": ["ひしん"], "synonyms": ["発疹", "湿疹"]},
+        "視力低下": {"readings": ["しりょくていか"], "synonyms": ["目が見えにくい"]}
+    }
+    
+    db.flush()  # 追加した症状をクエリ対象にするため
+    for name, aliases in aliases_data.items():
+        symptom = db.query(Symptom).filter(Symptom.name == name).first()
+        if not symptom:
+            continue
+        if db.query(SymptomAlias).filter(SymptomAlias.symptom_id == symptom.id).first():
+            continue
+        
+        for reading in aliases["readings"]:
+            db.add(SymptomAlias(symptom_id=symptom.id, alias=reading, alias_type="reading"))
+        for synonym in aliases["synonyms"]:
+            db.add(SymptomAlias(symptom_id=symptom.id, alias=synonym, alias_type="synonym"))
+
 def seed_diagnoses(db: Session):
     """診断データを投入"""
     diagnoses_data = [
@@ -95,6 +132,39 @@ def seed_diagnoses(db: Session):
             diagnosis = Diagnosis(**diagnosis_data)
             db.add(diagnosis)
 
+def seed_diagnosis_symptoms(db: Session):
+    """診断ごとの症状の出現確率 P(症状|診断) を投入"""
+    likelihoods_data = {
+        "感冒": {
+            "鼻水": 0.8, "咳": 0.7, "のどの痛み": 0.7, "発熱": 0.6,
+            "疲労感": 0.5, "頭痛": 0.4, "関節痛": 0.2
+        },
+        "急性胃腸炎": {
+            "下痢": 0.85, "腹痛": 0.8, "吐き気": 0.7, "発熱": 0.4,
+            "疲労感": 0.4, "頭痛": 0.1
+        },
+        "緊張型頭痛": {
+            "頭痛": 0.95, "疲労感": 0.4, "めまい": 0.3, "吐き気": 0.1
+        }
+    }
+    
+    db.flush()  # 追加した症状・診断をクエリ対象にするため
+    symptom_ids = dict(db.query(Symptom.name, Symptom.id).all())
+    for diagnosis_name, likelihoods in likelihoods_data.items():
+        diagnosis = db.query(Diagnosis).filter(Diagnosis.name == diagnosis_name).first()
+        if not diagnosis:
+            continue
+        if db.query(DiagnosisSymptom).filter(DiagnosisSymptom.diagnosis_id == diagnosis.id).first():
+            continue
+        
+        for symptom_name, likelihood in likelihoods.items():
+            if symptom_name in symptom_ids:
+                db.add(DiagnosisSymptom(
+                    diagnosis_id=diagnosis.id,
+                    symptom_id=symptom_ids[symptom_name],
+                    likelihood=likelihood
+                ))
+
 def seed_hospitals(db: Session):
     """病院データを投入"""
     hospitals_data = [
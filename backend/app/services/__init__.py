@@ -3,11 +3,23 @@ from .symptom_service import SymptomService
 from .diagnosis_service import DiagnosisService
 from .hospital_service import HospitalService
 from .news_service import NewsService
+from .async_services import (
+    AsyncUserService,
+    AsyncSymptomService,
+    AsyncDiagnosisService,
+    AsyncHospitalService,
+    AsyncNewsService,
+)
 
 __all__ = [
     "UserService",
     "SymptomService", 
     "DiagnosisService",
     "HospitalService",
-    "NewsService"
+    "NewsService",
+    "AsyncUserService",
+    "AsyncSymptomService",
+    "AsyncDiagnosisService",
+    "AsyncHospitalService",
+    "AsyncNewsService"
 ]
\ No newline at end of file
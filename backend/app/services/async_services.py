@@ -0,0 +1,147 @@
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth.password import password_hasher
+from app.services.diagnosis_service import DiagnosisService
+from app.services.hospital_service import HospitalService
+from app.services.news_service import NewsService
+from app.services.symptom_service import SymptomService
+from app.services.user_service import UserService
+
+
+def _delegate(method_name: str):
+    """同期サービスのメソッドを AsyncSession 上で実行する非同期メソッドを作成"""
+
+    async def method(self, *args, **kwargs):
+        return await self._call(method_name, *args, **kwargs)
+
+    method.__name__ = method_name
+    method.__doc__ = f"{method_name} の非同期版"
+    return method
+
+
+class AsyncService:
+    """同期サービスを AsyncSession.run_sync で実行する非同期ラッパー
+
+    run_sync に渡した関数内では通常の Session として振る舞うが、SQL は
+    非同期ドライバ（asyncpg / aiosqlite）で実行されるため、DB の応答待ちの
+    間もイベントループは他のリクエストを処理できる。サービスの実装は
+    同期版と共通なので、挙動やクエリはそのまま変わらない。
+
+    戻り値の ORM オブジェクトは run_sync の外で遅延ロードできないため、
+    関連はサービス側で事前にロードしておくこと（各サービスは selectinload 済み）。
+    """
+
+    service_class = None
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _call(self, method_name: str, *args, **kwargs):
+        def call(session):
+            return getattr(self.service_class(session), method_name)(*args, **kwargs)
+        return await self.db.run_sync(call)
+
+
+class AsyncHospitalService(AsyncService):
+    service_class = HospitalService
+
+    search_hospitals = _delegate("search_hospitals")
+    get_nearby_hospitals = _delegate("get_nearby_hospitals")
+    get_nearest_hospitals = _delegate("get_nearest_hospitals")
+    get_hospital_detail = _delegate("get_hospital_detail")
+    create_hospital = _delegate("create_hospital")
+    add_hospital_specialty = _delegate("add_hospital_specialty")
+
+
+class AsyncSymptomService(AsyncService):
+    service_class = SymptomService
+
+    get_all_symptoms = _delegate("get_all_symptoms")
+    get_symptom_categories = _delegate("get_symptom_categories")
+    search_symptoms = _delegate("search_symptoms")
+    get_symptom_suggestions = _delegate("get_symptom_suggestions")
+    record_user_symptoms = _delegate("record_user_symptoms")
+    get_user_symptoms = _delegate("get_user_symptoms")
+    create_symptom = _delegate("create_symptom")
+
+
+class AsyncNewsService(AsyncService):
+    service_class = NewsService
+
+    get_health_news = _delegate("get_health_news")
+    get_news_by_id = _delegate("get_news_by_id")
+    get_health_alerts = _delegate("get_health_alerts")
+    get_hospital_news = _delegate("get_hospital_news")
+    search_news = _delegate("search_news")
+    get_news_categories = _delegate("get_news_categories")
+    create_news = _delegate("create_news")
+    create_health_alert = _delegate("create_health_alert")
+    get_trending_news = _delegate("get_trending_news")
+    get_emergency_alerts = _delegate("get_emergency_alerts")
+
+
+class AsyncDiagnosisService(AsyncService):
+    service_class = DiagnosisService
+
+    analyze_symptoms = _delegate("analyze_symptoms")
+    analyze_symptoms_batch = _delegate("analyze_symptoms_batch")
+    get_user_diagnosis_history = _delegate("get_user_diagnosis_history")
+    get_diagnosis_result = _delegate("get_diagnosis_result")
+    get_specialties_list = _delegate("get_specialties_list")
+
+
+class AsyncUserService(AsyncService):
+    """UserService の非同期版
+
+    bcrypt によるハッシュ化・照合は CPU を占有するため、イベントループ上では
+    実行せず password_hasher のワーカープールに回す（混雑時は 503）。
+    """
+
+    service_class = UserService
+
+    get_user_by_email = _delegate("get_user_by_email")
+    get_user_by_id = _delegate("get_user_by_id")
+    get_user_profile = _delegate("get_user_profile")
+    update_user = _delegate("update_user")
+    delete_user = _delegate("delete_user")
+
+    async def create_user(self, user_data: dict):
+        """新しいユーザーを作成"""
+        hashed_password = await password_hasher.hash(user_data["password"])
+        return await self._call("create_user", user_data, hashed_password=hashed_password)
+
+    async def authenticate_user(self, email: str, password: str):
+        """ユーザー認証"""
+        user = await self.get_user_by_email(email)
+        if not user:
+            return None
+        verified, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+        if not verified:
+            return None
+        if new_hash:
+            # bcrypt のコスト設定が変わっていれば新しいハッシュに置き換える
+            await self._call("set_password_hash", user, new_hash)
+        return user
+
+    async def login(self, email: str, password: str) -> dict:
+        """ユーザーログイン"""
+        user = await self.authenticate_user(email, password)
+        return UserService(self.db.sync_session).create_login_response(user)
+
+    async def change_password(self, user_id: int, current_password: str, new_password: str) -> bool:
+        """パスワードを変更"""
+        user = await self.get_user_by_id(user_id)
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+
+        if not await password_hasher.verify(current_password, user.hashed_password):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Incorrect current password"
+            )
+
+        hashed_password = await password_hasher.hash(new_password)
+        return await self._call("set_password_hash", user, hashed_password)
@@ -0,0 +1,101 @@
+import hashlib
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, TypeVar
+
+from decouple import config
+from sqlalchemy import Table, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+# スクレイピング結果を一括で書き込むときの1回あたりの件数
+INGEST_BATCH_SIZE = config("INGEST_BATCH_SIZE", default=1000, cast=int)
+
+T = TypeVar("T")
+
+# ON CONFLICT に対応した INSERT を作れる方言
+_DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def dialect_insert(db: Session, table: Table):
+    """接続先の方言の INSERT 文（on_conflict_do_update / do_nothing が使える）"""
+    dialect = db.get_bind().dialect.name
+    insert = _DIALECT_INSERTS.get(dialect)
+    if insert is None:
+        raise NotImplementedError(f"一括 upsert は {dialect} に対応していません")
+    return insert(table)
+
+
+def chunked(items: Sequence[T], size: int = INGEST_BATCH_SIZE) -> Iterator[List[T]]:
+    """items を size 件ずつに分ける"""
+    size = max(1, size)
+    for start in range(0, len(items), size):
+        yield list(items[start:start + size])
+
+
+def content_hash(*parts: Optional[str]) -> str:
+    """重複判定用のハッシュ（前後の空白と連続する空白は区別しない）"""
+    normalized = "\x1f".join(" ".join(str(part or "").split()) for part in parts)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def news_hash(source: Optional[str], title: str) -> str:
+    """ニュースの重複判定キー（ソース + タイトル）"""
+    return content_hash(source, title)
+
+
+def alert_hash(source_authority: str, title: str, affected_areas: Optional[str]) -> str:
+    """アラートの重複判定キー（発信元 + タイトル + 地域）"""
+    return content_hash(source_authority, title, affected_areas)
+
+
+class IngestResult:
+    """一括保存の件数（新規・重複・不正なデータ）"""
+
+    __slots__ = ("inserted", "duplicate", "rejected")
+
+    def __init__(self, inserted: int = 0, duplicate: int = 0, rejected: int = 0):
+        self.inserted = inserted
+        self.duplicate = duplicate
+        self.rejected = rejected
+
+    def add(self, other: "IngestResult"):
+        self.inserted += other.inserted
+        self.duplicate += other.duplicate
+        self.rejected += other.rejected
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"inserted": self.inserted, "duplicate": self.duplicate, "rejected": self.rejected}
+
+
+def add_missing_columns(bind, table: Table):
+    """モデルに追加した NULL 可の列を既存のテーブルに追加する（create_all は列を追加しない）"""
+    existing = {column["name"] for column in inspect(bind).get_columns(table.name)}
+    with bind.begin() as connection:
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=bind.dialect)
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+
+def create_unique_indexes(bind, tables: Iterable[Table]):
+    """既存のテーブルに、モデルで定義した一意インデックスを追加する
+
+    create_all は既にあるテーブルのインデックスを作らないため、一括 upsert の
+    ON CONFLICT で使うインデックスはここで作成する。インデックスが無いと upsert は
+    毎回失敗するため、作成できなければ例外を送出して起動を止める（重複した行は
+    呼び出し側が事前に解消しておく）。
+    """
+    for table in tables:
+        for index in table.indexes:
+            if not index.unique:
+                continue
+            try:
+                index.create(bind=bind, checkfirst=True)
+            except Exception as e:
+                raise RuntimeError(
+                    f"一意インデックス {index.name} を作成できません。"
+                    f"{table.name} の重複した行を解消してください: {e}"
+                ) from e
@@ -0,0 +1,112 @@
+from typing import Dict, List, Optional
+from app.services.keyword_matcher import KeywordAutomaton
+
+# 推奨診療科の定義（/diagnosis/analyze の応答に使う）
+SPECIALTIES: Dict[str, dict] = {
+    "neurology": {"name": "神経内科", "description": "脳神経に関する疾患を診療", "urgency": "medium"},
+    "neurosurgery": {"name": "脳神経外科", "description": "脳血管疾患や脳腫瘍の手術的治療", "urgency": "high"},
+    "internal_medicine": {"name": "内科", "description": "一般的な内科疾患の診療", "urgency": "medium"},
+    "respiratory": {"name": "呼吸器科", "description": "肺や気管支の疾患を専門的に診療", "urgency": "medium"},
+    "gastroenterology": {"name": "消化器科", "description": "胃腸や肝臓の疾患を診療", "urgency": "medium"},
+    "general": {"name": "一般内科", "description": "幅広い疾患に対応する総合診療", "urgency": "medium"},
+}
+
+# 症状キーワードから考えられる病気と診療科を導くルール（記載順に応答へ並ぶ）
+CONDITION_RULES: List[dict] = [
+    {
+        "condition": "頭部の疾患",
+        "keywords": ["頭痛", "めまい", "意識"],
+        "specialties": ["neurology", "neurosurgery"],
+    },
+    {
+        "condition": "呼吸器感染症",
+        "keywords": ["発熱", "咳", "喉"],
+        "specialties": ["internal_medicine", "respiratory"],
+    },
+    {
+        "condition": "消化器疾患",
+        "keywords": ["腹痛", "吐き気", "下痢"],
+        "specialties": ["gastroenterology"],
+    },
+]
+
+# 緊急度のルール（priority が大きいものを優先）
+URGENCY_RULES: List[dict] = [
+    {
+        "urgency_level": "high",
+        "priority": 10,
+        "keywords": ["激痛", "意識消失", "呼吸困難"],
+        "advice": "緊急性が高い可能性があります。すぐに医療機関を受診してください。",
+        "confidence": 0.9,
+    },
+]
+
+# どのルールにも一致しない場合の既定値
+DEFAULT_CONDITION = "一般的な疾患"
+DEFAULT_SPECIALTIES = ["general"]
+DEFAULT_URGENCY = {
+    "urgency_level": "medium",
+    "advice": "症状が続く場合は医療機関を受診してください。",
+    "confidence": 0.7,
+}
+
+
+class RuleMatch:
+    """ルール照合の結果"""
+
+    __slots__ = ("conditions", "specialty_ids", "urgency_level", "advice", "confidence")
+
+    def __init__(self, conditions: List[str], specialty_ids: List[str], urgency: dict):
+        self.conditions = conditions
+        self.specialty_ids = specialty_ids
+        self.urgency_level = urgency["urgency_level"]
+        self.advice = urgency["advice"]
+        self.confidence = urgency["confidence"]
+
+
+class DiagnosisRuleEngine:
+    """宣言的なルール表を Aho–Corasick オートマトンにコンパイルした照合器
+
+    病名・緊急度の全キーワードを1つのオートマトンにまとめるため、
+    1回の走査で全ルールを判定できる。
+    """
+
+    def __init__(self, condition_rules: List[dict], urgency_rules: List[dict]):
+        self.condition_rules = condition_rules
+        self.urgency_rules = sorted(urgency_rules, key=lambda rule: -rule["priority"])
+        self._automaton: KeywordAutomaton = KeywordAutomaton()
+
+        for index, rule in enumerate(self.condition_rules):
+            for keyword in rule["keywords"]:
+                self._automaton.add(keyword.lower(), ("condition", index))
+        for index, rule in enumerate(self.urgency_rules):
+            for keyword in rule["keywords"]:
+                self._automaton.add(keyword.lower(), ("urgency", index))
+        self._automaton.compile()
+
+    def match(self, text: str) -> RuleMatch:
+        """入力テキストを1回走査してルールを判定"""
+        found = self._automaton.find(text.lower())
+
+        conditions = []
+        specialty_ids = []
+        condition_indexes = sorted(index for kind, index in found if kind == "condition")
+        for index in condition_indexes:
+            rule = self.condition_rules[index]
+            conditions.append(rule["condition"])
+            specialty_ids.extend(rule["specialties"])
+
+        urgency: Optional[dict] = None
+        urgency_indexes = sorted(index for kind, index in found if kind == "urgency")
+        if urgency_indexes:
+            urgency = self.urgency_rules[urgency_indexes[0]]
+
+        if not specialty_ids:
+            specialty_ids = list(DEFAULT_SPECIALTIES)
+            conditions.append(DEFAULT_CONDITION)
+
+        return RuleMatch(conditions, specialty_ids, urgency or DEFAULT_URGENCY)
+
+
+# 起動時に一度だけコンパイルする
+diagnosis_rule_engine = DiagnosisRuleEngine(CONDITION_RULES, URGENCY_RULES)
@@ -0,0 +1,317 @@
+import heapq
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from decouple import config
+from app.models.diagnosis import Diagnosis, DiagnosisSymptom
+
+try:
+    import numpy as np
+except ImportError:  # NumPy が無い環境では純Pythonで計算する
+    np = None
+
+# 他プロセスでの更新を取り込むための有効期限（秒）
+ENGINE_TTL_SECONDS = config("DIAGNOSIS_ENGINE_TTL_SECONDS", default=300, cast=int)
+# 関連付けの無い症状がその診断で現れる確率（ゼロ確率を避けるための平滑化）
+BACKGROUND_LIKELIHOOD = config("DIAGNOSIS_BACKGROUND_LIKELIHOOD", default=0.02, cast=float)
+# 一括採点で一度に作るスコア行列の要素数の上限（件数×診断数）
+BATCH_SCORE_CELLS = config("DIAGNOSIS_BATCH_SCORE_CELLS", default=2_000_000, cast=int)
+# 事後確率を計算するときの温度（1より大きいと確信度がなだらかになる）
+CONFIDENCE_TEMPERATURE = config("DIAGNOSIS_CONFIDENCE_TEMPERATURE", default=1.0, cast=float)
+
+MIN_LIKELIHOOD = 1e-4
+MAX_LIKELIHOOD = 1 - 1e-4
+
+
+def _clamp_likelihood(value: float) -> float:
+    return min(MAX_LIKELIHOOD, max(MIN_LIKELIHOOD, float(value)))
+
+
+def _logit(p: float) -> float:
+    return math.log(p) - math.log1p(-p)
+
+
+class DiagnosisCandidate:
+    """スコアリング結果の1件"""
+
+    __slots__ = ("id", "name", "probability", "score")
+
+    def __init__(self, diagnosis_id: int, name: str, probability: float, score: float):
+        self.id = diagnosis_id
+        self.name = name
+        self.probability = probability
+        self.score = score
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "probability": round(self.probability, 4)
+        }
+
+
+class DiagnosisScoringEngine:
+    """症状×診断の重み行列による単純ベイズ（ベルヌーイ型）の診断スコアリング
+
+    診断 d の対数尤度は、関連付けのある症状 s の出現確率 p(s|d) と
+    背景確率 ε を使って
+        score(d) = base(d) + Σ_{s ∈ 入力} W[s, d]
+        base(d)  = Σ_{s ∈ 関連(d)} (log(1 - p) - log(1 - ε))
+        W[s, d]  = logit(p) - logit(ε)
+    と書ける（全診断に共通の定数項は省略）。W は関連付けのある要素だけを
+    症状ごとの行（CSR形式）で持つため、入力症状の行を足し合わせるだけで
+    全診断を一度に採点できる。信頼度は score の softmax（事後確率）。
+    """
+
+    def __init__(self, use_numpy: Optional[bool] = None):
+        if use_numpy is None:
+            use_numpy = np is not None
+        self.use_numpy = use_numpy and np is not None
+
+        self._diagnosis_ids: List[int] = []
+        self._names: List[str] = []
+        self._rows: Dict[int, Tuple[int, int]] = {}  # 症状ID -> 列配列の [start, end)
+        self._columns = []
+        self._weights = []
+        self._base = []
+        self._built_at: Optional[float] = None
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._diagnosis_ids)
+
+    def build(self, diagnoses: Sequence[Tuple[int, str]],
+              associations: Iterable[Tuple[int, int, float]]):
+        """(診断ID, 名前) と (診断ID, 症状ID, 出現確率) から重み行列を構築"""
+        diagnosis_ids = [diagnosis_id for diagnosis_id, _ in diagnoses]
+        names = [name for _, name in diagnoses]
+        position = {diagnosis_id: i for i, diagnosis_id in enumerate(diagnosis_ids)}
+
+        background = _clamp_likelihood(BACKGROUND_LIKELIHOOD)
+        background_logit = _logit(background)
+        background_absent = math.log1p(-background)
+
+        base = [0.0] * len(diagnosis_ids)
+        entries: Dict[int, List[Tuple[int, float]]] = {}
+        for diagnosis_id, symptom_id, likelihood in associations:
+            column = position.get(diagnosis_id)
+            if column is None or likelihood is None:
+                continue
+            p = _clamp_likelihood(likelihood)
+            base[column] += math.log1p(-p) - background_absent
+            entries.setdefault(symptom_id, []).append((column, _logit(p) - background_logit))
+
+        rows = {}
+        columns: List[int] = []
+        weights: List[float] = []
+        for symptom_id in sorted(entries):
+            start = len(columns)
+            for column, weight in entries[symptom_id]:
+                columns.append(column)
+                weights.append(weight)
+            rows[symptom_id] = (start, len(columns))
+
+        if self.use_numpy:
+            columns = np.asarray(columns, dtype=np.int64)
+            weights = np.asarray(weights, dtype=np.float64)
+            base = np.asarray(base, dtype=np.float64)
+
+        with self._lock:
+            self._diagnosis_ids = diagnosis_ids
+            self._names = names
+            self._rows = rows
+            self._columns = columns
+            self._weights = weights
+            self._base = base
+            self._built_at = time.monotonic()
+            self._stale = False
+
+    def rebuild(self, db: Session):
+        """有効な診断と DiagnosisSymptom から重み行列を再構築"""
+        diagnoses = db.query(Diagnosis.id, Diagnosis.name).filter(
+            Diagnosis.is_active == True
+        ).order_by(Diagnosis.id).all()
+        associations = db.query(
+            DiagnosisSymptom.diagnosis_id,
+            DiagnosisSymptom.symptom_id,
+            DiagnosisSymptom.likelihood
+        ).all()
+        self.build(diagnoses, associations)
+
+    def invalidate(self):
+        """次回採点時に再構築させる"""
+        self._stale = True
+
+    def ensure_built(self, db: Session):
+        """未構築・無効化済み・期限切れの場合に再構築"""
+        expired = (
+            self._built_at is None
+            or time.monotonic() - self._built_at > ENGINE_TTL_SECONDS
+        )
+        if self._stale or expired:
+            self.rebuild(db)
+
+    def known_symptoms(self, symptom_ids: Iterable[int]) -> List[int]:
+        """重み行列に行がある症状IDだけを重複なく返す"""
+        rows = self._rows
+        return sorted({symptom_id for symptom_id in symptom_ids if symptom_id in rows})
+
+    def rank(self, symptom_ids: Iterable[int], limit: int = 5) -> List[DiagnosisCandidate]:
+        """入力症状から全診断を採点し、事後確率の高い順に上位 limit 件を返す
+
+        既知の症状が1つも無い場合は判断材料が無いため空リストを返す。
+        """
+        # 参照を取得してから計算し、途中で再構築されても整合性を保つ
+        rows, columns, weights, base = self._rows, self._columns, self._weights, self._base
+        diagnosis_ids, names = self._diagnosis_ids, self._names
+
+        spans = [rows[symptom_id] for symptom_id in set(symptom_ids) if symptom_id in rows]
+        if not spans or not diagnosis_ids or limit <= 0:
+            return []
+
+        if self.use_numpy:
+            top, probabilities, scores = self._rank_numpy(spans, columns, weights, base, limit)
+        else:
+            top, probabilities, scores = self._rank_python(spans, columns, weights, base, limit)
+
+        return [
+            DiagnosisCandidate(diagnosis_ids[i], names[i], probabilities[n], scores[n])
+            for n, i in enumerate(top)
+        ]
+
+    def rank_batch(self, symptom_id_sets: Sequence[Iterable[int]],
+                   limit: int = 5) -> List[List[DiagnosisCandidate]]:
+        """複数の症状セットをまとめて採点（結果は入力と同じ順）
+
+        NumPy がある場合は、全件の入力症状の行要素を (件番号, 診断列) の
+        平坦な位置に集めて1回の bincount で件数×診断数のスコア行列を作る。
+        行列が大きくなりすぎないよう BATCH_SCORE_CELLS ごとに分割する。
+        """
+        if not self.use_numpy:
+            return [self.rank(symptom_ids, limit) for symptom_ids in symptom_id_sets]
+
+        rows, columns, weights, base = self._rows, self._columns, self._weights, self._base
+        diagnosis_ids, names = self._diagnosis_ids, self._names
+        count = len(diagnosis_ids)
+
+        span_sets = [
+            [rows[symptom_id] for symptom_id in set(symptom_ids) if symptom_id in rows]
+            for symptom_ids in symptom_id_sets
+        ]
+        results: List[List[DiagnosisCandidate]] = [[] for _ in span_sets]
+        if not count or limit <= 0:
+            return results
+
+        # 既知の症状がある件だけを採点する
+        scored_items = [i for i, spans in enumerate(span_sets) if spans]
+        chunk_size = max(1, BATCH_SCORE_CELLS // count)
+        k = min(limit, count)
+
+        for chunk_start in range(0, len(scored_items), chunk_size):
+            chunk = scored_items[chunk_start:chunk_start + chunk_size]
+            chunk_spans = [(n, start, end) for n, item in enumerate(chunk) for start, end in span_sets[item]]
+            span_items, starts, ends = np.asarray(chunk_spans, dtype=np.int64).T
+            lengths = ends - starts
+            # 各区間 [start, end) を連結した位置配列を作る
+            offsets = np.cumsum(lengths) - lengths
+            item_positions = np.repeat(span_items, lengths)
+            entry_positions = np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+
+            flat = item_positions * count + columns[entry_positions]
+            scores = np.bincount(
+                flat, weights=weights[entry_positions], minlength=len(chunk) * count
+            ).reshape(len(chunk), count)
+            scores += base
+
+            scaled = scores / CONFIDENCE_TEMPERATURE
+            scaled -= scaled.max(axis=1, keepdims=True)
+            probabilities = np.exp(scaled)
+            probabilities /= probabilities.sum(axis=1, keepdims=True)
+
+            if k < count:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(count), (len(chunk), count))
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.lexsort((top, -top_scores), axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            top_probabilities = np.take_along_axis(probabilities, top, axis=1)
+
+            for n, item in enumerate(chunk):
+                results[item] = [
+                    DiagnosisCandidate(diagnosis_ids[i], names[i], probability, score)
+                    for i, probability, score in zip(
+                        top[n].tolist(), top_probabilities[n].tolist(), top_scores[n].tolist()
+                    )
+                ]
+        return results
+
+    def _rank_numpy(self, spans, columns, weights, base, limit):
+        count = len(base)
+        if len(spans) == 1:
+            start, end = spans[0]
+            selected = np.arange(start, end)
+        else:
+            selected = np.concatenate([np.arange(start, end) for start, end in spans])
+        # 疎ベクトル×行列の積：入力症状の行の要素を診断列ごとに合計する
+        scores = base + np.bincount(columns[selected], weights=weights[selected], minlength=count)
+
+        scaled = scores / CONFIDENCE_TEMPERATURE
+        exp_scores = np.exp(scaled - scaled.max())
+        probabilities = exp_scores / exp_scores.sum()
+
+        k = min(limit, count)
+        if k < count:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(count)
+        top = top[np.lexsort((top, -scores[top]))]
+        return top.tolist(), probabilities[top].tolist(), scores[top].tolist()
+
+    def _rank_python(self, spans, columns, weights, base, limit):
+        scores = list(base)
+        for start, end in spans:
+            for position in range(start, end):
+                scores[columns[position]] += weights[position]
+
+        highest = max(scores) / CONFIDENCE_TEMPERATURE
+        exp_scores = [math.exp(score / CONFIDENCE_TEMPERATURE - highest) for score in scores]
+        total = sum(exp_scores)
+
+        top = heapq.nsmallest(limit, range(len(scores)), key=lambda i: (-scores[i], i))
+        return top, [exp_scores[i] / total for i in top], [scores[i] for i in top]
+
+
+# プロセス内で共有する診断スコアリングエンジン
+diagnosis_scoring_engine = DiagnosisScoringEngine()
+
+
+# 診断・関連付けの変更がコミットされたら重み行列を無効化する
+_SESSION_DIRTY_KEY = "diagnosis_scoring_dirty"
+
+
+def _mark_session_dirty(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info[_SESSION_DIRTY_KEY] = True
+
+
+def _invalidate_after_commit(session):
+    if session.info.pop(_SESSION_DIRTY_KEY, False):
+        diagnosis_scoring_engine.invalidate()
+
+
+def _discard_after_rollback(session):
+    session.info.pop(_SESSION_DIRTY_KEY, None)
+
+
+for _model in (Diagnosis, DiagnosisSymptom):
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _mark_session_dirty)
+event.listen(Session, "after_commit", _invalidate_after_commit)
+event.listen(Session, "after_rollback", _discard_after_rollback)
@@ -1,10 +1,16 @@
 from typing import List, Optional, Dict, Any
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 import json
 from app.models.diagnosis import Diagnosis, DiagnosisResult
 from app.models.symptom import UserSymptom, Symptom
 from app.models.user import User
+from app.services.diagnosis_scoring import DiagnosisCandidate, diagnosis_scoring_engine
+from app.services.symptom_search import symptom_search_index
+
+# 応答に含める鑑別診断の件数
+DIFFERENTIAL_LIMIT = 5
 
 class DiagnosisService:
     def __init__(self, db: Session):
@@ -15,12 +21,16 @@ class DiagnosisService:
         # 症状データを分析
         analysis_result = self._perform_ai_analysis(symptoms_data)
         
+        # 全診断を採点し、事後確率の高い順に候補を取得
+        candidates = self._rank_diagnoses(symptoms_data)
+        
         # 最も可能性の高い診断を取得
-        top_diagnosis = self._find_matching_diagnosis(analysis_result)
+        top_diagnosis = self._find_matching_diagnosis(candidates)
         
         # 診断結果を保存
+        confidence_score = candidates[0].probability if candidates else None
         diagnosis_result = self._save_diagnosis_result(
-            user_id, top_diagnosis, symptoms_data, analysis_result
+            user_id, top_diagnosis, symptoms_data, analysis_result, confidence_score
         )
         
         return {
@@ -32,6 +42,7 @@ class DiagnosisService:
                 "category": top_diagnosis.category
             },
             "confidence_score": diagnosis_result.confidence_score,
+            "differential_diagnoses": [candidate.to_dict() for candidate in candidates],
             "urgency_level": diagnosis_result.urgency_level,
             "ai_analysis": diagnosis_result.ai_analysis,
             "recommended_actions": json.loads(diagnosis_result.recommended_actions or "[]"),
@@ -39,6 +50,23 @@ class DiagnosisService:
             "follow_up_days": diagnosis_result.follow_up_date
         }
 
+    def _rank_diagnoses(self, symptoms_data: List[dict],
+                        limit: int = DIFFERENTIAL_LIMIT) -> List[DiagnosisCandidate]:
+        """メモリ上の重み行列で全診断を採点（症状が1つも特定できなければ空）"""
+        diagnosis_scoring_engine.ensure_built(self.db)
+        return diagnosis_scoring_engine.rank(self._resolve_symptom_ids(symptoms_data), limit)
+
+    def _resolve_symptom_ids(self, symptoms_data: List[dict]) -> List[int]:
+        """症状データから症状IDを取得（IDが無い場合は名前から特定）"""
+        symptom_ids = []
+        for symptom in symptoms_data:
+            if symptom.get("symptom_id"):
+                symptom_ids.append(int(symptom["symptom_id"]))
+            elif symptom.get("name"):
+                symptom_search_index.ensure_built(self.db)
+                symptom_ids.extend(symptom_search_index.find_mentions(symptom["name"]))
+        return symptom_ids
+
     def _perform_ai_analysis(self, symptoms_data: List[dict]) -> dict:
         """AI分析を実行（シンプルなルールベース実装）"""
         total_severity = sum(symptom["severity"] for symptom in symptoms_data)
@@ -71,12 +99,19 @@ class DiagnosisService:
             "analysis_text": f"入力された症状の平均重要度は {avg_severity:.1f}/10 です。"
         }
 
-    def _find_matching_diagnosis(self, analysis_result: dict) -> Diagnosis:
+    def _find_matching_diagnosis(self, candidates: List[DiagnosisCandidate]) -> Diagnosis:
         """症状に最も適合する診断を検索"""
-        # シンプルな実装：一般的な診断を返す
-        diagnosis = self.db.query(Diagnosis).filter(
-            Diagnosis.is_active == True
-        ).first()
+        diagnosis = None
+        if candidates:
+            diagnosis = self.db.query(Diagnosis).filter(
+                Diagnosis.id == candidates[0].id
+            ).first()
+        
+        if not diagnosis:
+            # 採点できない場合は一般的な診断を返す
+            diagnosis = self.db.query(Diagnosis).filter(
+                Diagnosis.is_active == True
+            ).first()
         
         if not diagnosis:
             # デフォルト診断を作成
@@ -96,10 +131,25 @@ class DiagnosisService:
         return diagnosis
 
     def _save_diagnosis_result(self, user_id: int, diagnosis: Diagnosis, 
-                             symptoms_data: List[dict], analysis_result: dict) -> DiagnosisResult:
+                             symptoms_data: List[dict], analysis_result: dict,
+                             confidence_score: Optional[float] = None) -> DiagnosisResult:
         """診断結果をデータベースに保存"""
-        # 信頼度スコアを計算（シンプルな実装）
-        confidence_score = min(0.85, 0.5 + (analysis_result["avg_severity"] / 20))
+        diagnosis_result = DiagnosisResult(**self._build_result_values(
+            user_id, diagnosis, symptoms_data, analysis_result, confidence_score
+        ))
+        
+        self.db.add(diagnosis_result)
+        self.db.commit()
+        self.db.refresh(diagnosis_result)
+        return diagnosis_result
+
+    def _build_result_values(self, user_id: int, diagnosis: Diagnosis,
+                             symptoms_data: List[dict], analysis_result: dict,
+                             confidence_score: Optional[float] = None) -> dict:
+        """DiagnosisResult の列の値を作成"""
+        if confidence_score is None:
+            # 採点できなかった場合は重要度から概算する
+            confidence_score = min(0.85, 0.5 + (analysis_result["avg_severity"] / 20))
         
         # フォローアップ日数を決定
         follow_up_days = 7
@@ -108,21 +158,93 @@ class DiagnosisService:
         elif analysis_result["urgency_level"] == "emergency":
             follow_up_days = 1
         
-        diagnosis_result = DiagnosisResult(
-            user_id=user_id,
-            diagnosis_id=diagnosis.id,
-            confidence_score=confidence_score,
-            symptoms_data=symptoms_data,
-            ai_analysis=analysis_result["analysis_text"],
-            recommended_actions=json.dumps(analysis_result["recommended_actions"]),
-            urgency_level=analysis_result["urgency_level"],
-            follow_up_date=follow_up_days
+        return {
+            "user_id": user_id,
+            "diagnosis_id": diagnosis.id,
+            "confidence_score": confidence_score,
+            "symptoms_data": symptoms_data,
+            "ai_analysis": analysis_result["analysis_text"],
+            "recommended_actions": json.dumps(analysis_result["recommended_actions"]),
+            "urgency_level": analysis_result["urgency_level"],
+            "follow_up_date": follow_up_days
+        }
+
+    def analyze_symptoms_batch(self, user_id: int, symptom_sets: List[List[dict]]) -> List[dict]:
+        """複数の症状セットをまとめて分析し、診断結果を一括で保存
+        
+        採点は重み行列でまとめて行い、診断結果は1回の INSERT（executemany）で
+        保存してコミットも1回にする。結果は入力と同じ順のリスト。
+        """
+        if not symptom_sets:
+            return []
+        
+        diagnosis_scoring_engine.ensure_built(self.db)
+        candidate_sets = diagnosis_scoring_engine.rank_batch(
+            [self._resolve_symptom_ids(symptoms_data) for symptoms_data in symptom_sets],
+            DIFFERENTIAL_LIMIT
         )
         
-        self.db.add(diagnosis_result)
+        # 上位の診断をまとめて取得
+        top_ids = {candidates[0].id for candidates in candidate_sets if candidates}
+        diagnoses = {}
+        if top_ids:
+            diagnoses = {
+                diagnosis.id: diagnosis
+                for diagnosis in self.db.query(Diagnosis).filter(Diagnosis.id.in_(top_ids)).all()
+            }
+        fallback = None
+        if any(not candidates or candidates[0].id not in diagnoses for candidates in candidate_sets):
+            fallback = self._find_matching_diagnosis([])
+        
+        # コミットで属性が失効する前に応答用の値を取得しておく
+        summaries = {}
+        items = []
+        values = []
+        for symptoms_data, candidates in zip(symptom_sets, candidate_sets):
+            analysis_result = self._perform_ai_analysis(symptoms_data)
+            diagnosis = diagnoses.get(candidates[0].id) if candidates else None
+            confidence_score = candidates[0].probability if diagnosis else None
+            diagnosis = diagnosis or fallback
+            
+            if diagnosis.id not in summaries:
+                summaries[diagnosis.id] = self._diagnosis_summary(diagnosis)
+            items.append((summaries[diagnosis.id], candidates, analysis_result))
+            values.append(self._build_result_values(
+                user_id, diagnosis, symptoms_data, analysis_result, confidence_score
+            ))
+        
+        result_ids = self.db.scalars(
+            insert(DiagnosisResult).returning(DiagnosisResult.id, sort_by_parameter_order=True),
+            values
+        ).all()
         self.db.commit()
-        self.db.refresh(diagnosis_result)
-        return diagnosis_result
+        
+        return [
+            {
+                "diagnosis_result_id": result_id,
+                "diagnosis": summary["diagnosis"],
+                "confidence_score": row["confidence_score"],
+                "differential_diagnoses": [candidate.to_dict() for candidate in candidates],
+                "urgency_level": row["urgency_level"],
+                "ai_analysis": row["ai_analysis"],
+                "recommended_actions": analysis_result["recommended_actions"],
+                "recommended_specialties": summary["recommended_specialties"],
+                "follow_up_days": row["follow_up_date"]
+            }
+            for result_id, row, (summary, candidates, analysis_result) in zip(result_ids, values, items)
+        ]
+
+    def _diagnosis_summary(self, diagnosis: Diagnosis) -> dict:
+        """応答に含める診断の情報"""
+        return {
+            "diagnosis": {
+                "name": diagnosis.name,
+                "description": diagnosis.description,
+                "icd_10_code": diagnosis.icd_10_code,
+                "category": diagnosis.category
+            },
+            "recommended_specialties": json.loads(diagnosis.recommended_specialties or "[]")
+        }
 
     def get_user_diagnosis_history(self, user_id: int) -> List[DiagnosisResult]:
         """ユーザーの診断履歴を取得"""
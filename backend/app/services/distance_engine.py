@@ -0,0 +1,130 @@
+import math
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy が無い環境では純Pythonで計算する
+    np = None
+
+EARTH_RADIUS_KM = 6371  # 地球の半径（km）
+
+
+def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """2点間の距離を計算（ハーバサイン公式）"""
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    delta_lat = math.radians(lat2 - lat1)
+    delta_lon = math.radians(lon2 - lon1)
+
+    a = (math.sin(delta_lat / 2) ** 2 +
+         math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon / 2) ** 2)
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+    return EARTH_RADIUS_KM * c
+
+
+class DistanceEngine:
+    """病院座標を連続した float64 配列で保持し、距離を一括計算する
+
+    NumPy がある場合は候補全体を1回のベクトル演算で計算し、無い場合は
+    haversine_distance によるループにフォールバックする。計算式は
+    haversine_distance と同じで、差は浮動小数点の丸め程度に収まる。
+    """
+
+    def __init__(self, ids: Sequence[int], latitudes: Sequence[float],
+                 longitudes: Sequence[float], use_numpy: Optional[bool] = None):
+        if use_numpy is None:
+            use_numpy = np is not None
+        self.use_numpy = use_numpy and np is not None
+
+        if self.use_numpy:
+            self.ids = np.ascontiguousarray(ids, dtype=np.int64)
+            self.latitudes = np.ascontiguousarray(latitudes, dtype=np.float64)
+            self.longitudes = np.ascontiguousarray(longitudes, dtype=np.float64)
+            self._cos_lat = np.cos(np.radians(self.latitudes))
+        else:
+            self.ids = list(ids)
+            self.latitudes = [float(lat) for lat in latitudes]
+            self.longitudes = [float(lon) for lon in longitudes]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def positions_from_ranges(self, ranges: Sequence[Tuple[int, int]]):
+        """[start, end) の区間リストを位置配列に変換"""
+        if self.use_numpy:
+            if not ranges:
+                return np.empty(0, dtype=np.int64)
+            return np.concatenate([np.arange(start, end, dtype=np.int64) for start, end in ranges])
+        return [position for start, end in ranges for position in range(start, end)]
+
+    def distances_from(self, latitude: float, longitude: float, positions=None):
+        """1地点から候補（省略時は全件）までの距離を計算"""
+        if not self.use_numpy:
+            if positions is None:
+                positions = range(len(self.ids))
+            return [
+                haversine_distance(latitude, longitude, self.latitudes[i], self.longitudes[i])
+                for i in positions
+            ]
+
+        if positions is None:
+            latitudes, longitudes, cos_lat = self.latitudes, self.longitudes, self._cos_lat
+        else:
+            latitudes = self.latitudes[positions]
+            longitudes = self.longitudes[positions]
+            cos_lat = self._cos_lat[positions]
+
+        delta_lat = np.radians(latitudes - latitude)
+        delta_lon = np.radians(longitudes - longitude)
+        a = (np.sin(delta_lat / 2) ** 2 +
+             math.cos(math.radians(latitude)) * cos_lat * np.sin(delta_lon / 2) ** 2)
+        return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    def distance_matrix(self, origins: Sequence[Tuple[float, float]], positions=None):
+        """複数地点×候補の距離行列を計算（バッチ処理用）
+
+        戻り値は origins の件数 × 候補件数の行列。
+        """
+        if not self.use_numpy:
+            return [self.distances_from(lat, lon, positions) for lat, lon in origins]
+
+        if positions is None:
+            latitudes, longitudes, cos_lat = self.latitudes, self.longitudes, self._cos_lat
+        else:
+            latitudes = self.latitudes[positions]
+            longitudes = self.longitudes[positions]
+            cos_lat = self._cos_lat[positions]
+
+        origin_array = np.asarray(origins, dtype=np.float64).reshape(-1, 2)
+        origin_lat = origin_array[:, 0:1]
+        origin_lon = origin_array[:, 1:2]
+
+        delta_lat = np.radians(latitudes[np.newaxis, :] - origin_lat)
+        delta_lon = np.radians(longitudes[np.newaxis, :] - origin_lon)
+        a = (np.sin(delta_lat / 2) ** 2 +
+             np.cos(np.radians(origin_lat)) * cos_lat[np.newaxis, :] * np.sin(delta_lon / 2) ** 2)
+        return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    def within(self, latitude: float, longitude: float, distance_km: float,
+               positions=None) -> List[Tuple[int, float]]:
+        """指定半径内の (id, 距離) を距離順で返す"""
+        distances = self.distances_from(latitude, longitude, positions)
+
+        if not self.use_numpy:
+            if positions is None:
+                positions = range(len(self.ids))
+            results = [
+                (self.ids[position], distance)
+                for position, distance in zip(positions, distances)
+                if distance <= distance_km
+            ]
+            results.sort(key=lambda x: (x[1], x[0]))
+            return results
+
+        mask = distances <= distance_km
+        selected = np.nonzero(mask)[0] if positions is None else positions[mask]
+        selected_ids = self.ids[selected]
+        selected_distances = distances[mask]
+        order = np.lexsort((selected_ids, selected_distances))
+        return list(zip(selected_ids[order].tolist(), selected_distances[order].tolist()))
@@ -1,7 +1,9 @@
-import requests
+import asyncio
+import copy
 from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
 import re
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple
 from urllib.parse import urljoin, urlparse
 import time
 from selenium import webdriver
@@ -12,16 +14,112 @@ from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 import json
 from datetime import datetime
+from decouple import config
+import httpx
+from sqlalchemy import delete, func, select, tuple_, update
 from sqlalchemy.orm import Session
 from app.models.hospital import Hospital, HospitalSpecialty
+from app.services.bulk_ingest import chunked, dialect_insert
+from app.services.spatial_index import hospital_index
+from app.services.scraping_http import (
+    SCRAPER_HOST_RATE, SCRAPER_HTTP_CACHE_PATH, HostRateLimiter, HttpCache, ScrapingClient,
+    cache_key
+)
+
+# 1回のスクレイピングで取得する Carely の最大ページ数
+CARELY_MAX_PAGES = 5
+# HTML / JSON を解析する並行数（解析はスレッドで実行）
+SCRAPER_PARSE_WORKERS = config("SCRAPER_PARSE_WORKERS", default=2, cast=int)
+
+
+def merge_duplicate_hospitals(bind) -> Dict[str, int]:
+    """一意インデックスの作成前に、(name, address) が同じ病院を1件にまとめる
+
+    残すのは有効な行のうち ID が最小のもので、他の行を参照している列はその行へ
+    付け替えてから削除する。その後 (hospital_id, specialty_name) が同じ診療科も
+    提供中の行のうち ID が最小のものだけを残す。
+    """
+    hospitals = Hospital.__table__
+    specialties = HospitalSpecialty.__table__
+    references = [
+        foreign_key.parent
+        for table in hospitals.metadata.tables.values()
+        for foreign_key in table.foreign_keys
+        if foreign_key.column.table is hospitals
+    ]
+    merged = {'hospitals': 0, 'specialties': 0}
+    with Session(bind=bind) as db:
+        groups = db.execute(
+            select(hospitals.c.name, hospitals.c.address)
+            .group_by(hospitals.c.name, hospitals.c.address)
+            .having(func.count() > 1)
+        ).all()
+        for name, address in groups:
+            ids = db.execute(
+                select(hospitals.c.id)
+                .where(hospitals.c.name == name, hospitals.c.address == address)
+                .order_by(hospitals.c.is_active.desc(), hospitals.c.id)
+            ).scalars().all()
+            kept, duplicates = ids[0], ids[1:]
+            for column in references:
+                db.execute(update(column.table).where(column.in_(duplicates)).values({column.name: kept}))
+            db.execute(delete(hospitals).where(hospitals.c.id.in_(duplicates)))
+            merged['hospitals'] += len(duplicates)
+
+        groups = db.execute(
+            select(specialties.c.hospital_id, specialties.c.specialty_name)
+            .group_by(specialties.c.hospital_id, specialties.c.specialty_name)
+            .having(func.count() > 1)
+        ).all()
+        for hospital_id, specialty_name in groups:
+            ids = db.execute(
+                select(specialties.c.id)
+                .where(specialties.c.hospital_id == hospital_id,
+                       specialties.c.specialty_name == specialty_name)
+                .order_by(specialties.c.is_available.desc(), specialties.c.id)
+            ).scalars().all()
+            db.execute(delete(specialties).where(specialties.c.id.in_(ids[1:])))
+            merged['specialties'] += len(ids) - 1
+        db.commit()
+
+    if merged['hospitals'] or merged['specialties']:
+        print(f"重複した病院 {merged['hospitals']} 件・診療科 {merged['specialties']} 件をまとめました")
+    return merged
+
+
+class ScrapedPage:
+    """取得段から解析段へ渡すレスポンス本文"""
+
+    __slots__ = ("source", "prefecture", "response", "parsed")
+
+    def __init__(self, source: str, prefecture: str, response: httpx.Response,
+                 parsed: asyncio.Future):
+        self.source = source
+        self.prefecture = prefecture
+        self.response = response
+        self.parsed = parsed  # 解析した件数（次のページを取得するかの判断に使う）
+
 
 class HospitalScraper:
-    def __init__(self, db: Session):
+    """病院情報のスクレイパー
+
+    取得・解析・保存を asyncio のキューでつないだパイプラインとして実行する。
+    取得はソース・都道府県ごとに並行し、送信先ホストごとのトークンバケットで
+    間隔を空ける（全体で sleep はしない）。解析はスレッドで、DB への保存は
+    専用の1スレッドで順に行う。
+
+    run_full_scraping では前回の ETag / Last-Modified を送り、304（変更なし）の
+    ページは解析も保存も行わない。検証子は保存まで終わったページについてだけ記録する。
+    """
+
+    CARELY_URL = "https://carely.jp/hospital/search"
+    MEDLEY_URL = "https://medley.life/api/hospitals/search"
+
+    def __init__(self, db: Session, host_rate: float = SCRAPER_HOST_RATE,
+                 cache_path: str = SCRAPER_HTTP_CACHE_PATH):
         self.db = db
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self.host_rate = host_rate  # 1ホストあたり毎秒のリクエスト数
+        self.cache_path = cache_path  # 条件付きリクエストの検証子の保存先（空で無効）
         
     def get_chrome_driver(self):
         """Chrome WebDriverを取得"""
@@ -41,52 +139,146 @@ class HospitalScraper:
         )
         
     def scrape_hospital_info(self, prefecture: str = "東京都", city: str = "") -> List[Dict]:
-        """病院情報をスクレイピング"""
+        """病院情報をスクレイピング（保存はしないため条件付きリクエストも使わない）"""
         scraped_hospitals = []
-        
-        # 複数のソースから病院情報を取得
-        scraped_hospitals.extend(self._scrape_from_carely(prefecture, city))
-        scraped_hospitals.extend(self._scrape_from_medley(prefecture, city))
-        scraped_hospitals.extend(self._scrape_from_jmap(prefecture, city))
-        
+
+        async def collect(prefecture: str, hospitals: List[Dict]):
+            scraped_hospitals.extend(hospitals)
+
+        asyncio.run(self._run_pipeline([prefecture], city, collect))
         return scraped_hospitals
-        
-    def _scrape_from_carely(self, prefecture: str, city: str) -> List[Dict]:
-        """Carelyから病院情報を取得"""
-        hospitals = []
-        
+
+    async def _run_pipeline(self, prefectures: List[str], city: str, sink,
+                            cache: Optional[HttpCache] = None):
+        """取得 → 解析 → sink(prefecture, hospitals) のパイプラインを実行"""
+        parse_queue: asyncio.Queue = asyncio.Queue(maxsize=SCRAPER_PARSE_WORKERS * 4)
+        sink_queue: asyncio.Queue = asyncio.Queue()
+
+        async def sink_stage():
+            while True:
+                batch = await sink_queue.get()
+                if batch is None:
+                    return
+                prefecture, hospitals, page = batch
+                await sink(prefecture, hospitals)
+                if page is not None:
+                    self._remember(cache, page, len(hospitals))
+
+        # レート制限の状態はイベントループに結びつくため実行ごとに作る
+        async with ScrapingClient(HostRateLimiter(self.host_rate), cache=cache) as client:
+            parsers = [
+                asyncio.create_task(self._parse_stage(parse_queue, sink_queue, cache))
+                for _ in range(max(1, SCRAPER_PARSE_WORKERS))
+            ]
+            sinker = asyncio.create_task(sink_stage())
+
+            fetchers = []
+            for prefecture in prefectures:
+                fetchers.append(self._fetch_carely(client, prefecture, city, parse_queue))
+                fetchers.append(self._fetch_medley(client, prefecture, city, parse_queue))
+                sink_queue.put_nowait((prefecture, self._scrape_from_jmap(prefecture, city), None))
+            fetching = asyncio.gather(*fetchers)
+            await asyncio.wait({fetching, sinker}, return_when=asyncio.FIRST_COMPLETED)
+            if sinker.done():
+                # sink で例外（ジョブの取り消しなど）が起きたら取得を打ち切る
+                fetching.cancel()
+                for parser in parsers:
+                    parser.cancel()
+                await asyncio.gather(fetching, *parsers, return_exceptions=True)
+                sinker.result()
+
+            await parse_queue.join()
+            for parser in parsers:
+                parser.cancel()
+            await sink_queue.put(None)
+            await sinker
+
+    def _remember(self, cache: Optional[HttpCache], page: ScrapedPage, item_count: int):
+        """処理を終えたページの検証子を保存（Carely の次ページ判定のため件数も残す）"""
+        if cache is not None:
+            cache.store(cache_key(page.response), page.response.headers, {'items': item_count})
+
+    async def _parse_stage(self, parse_queue: asyncio.Queue, sink_queue: asyncio.Queue,
+                           cache: Optional[HttpCache]):
+        """解析段: 本文をスレッドで解析し、病院データを次の段へ渡す"""
+        loop = asyncio.get_running_loop()
+        parsers = {
+            'carely': self._parse_carely_page,
+            'medley': self._parse_medley_response,
+        }
+        while True:
+            page = await parse_queue.get()
+            hospitals = []
+            try:
+                hospitals = await loop.run_in_executor(None, parsers[page.source], page.response.text)
+                if hospitals:
+                    sink_queue.put_nowait((page.prefecture, hospitals, page))
+                else:
+                    self._remember(cache, page, 0)
+            except Exception as e:
+                print(f"Parse error ({page.source}): {e}")
+            finally:
+                page.parsed.set_result(len(hospitals))
+                parse_queue.task_done()
+
+    async def _fetch_carely(self, client: ScrapingClient, prefecture: str, city: str,
+                            parse_queue: asyncio.Queue):
+        """Carelyの検索結果ページを取得（病院が無いページまで）"""
+        loop = asyncio.get_running_loop()
         try:
-            # Carelyの検索URL
-            base_url = "https://carely.jp/hospital/search"
-            params = {
-                'prefecture': prefecture,
-                'city': city,
-                'page': 1
-            }
-            
-            for page in range(1, 6):  # 最大5ページまで
-                params['page'] = page
-                response = self.session.get(base_url, params=params)
+            for page in range(1, CARELY_MAX_PAGES + 1):
+                params = {
+                    'prefecture': prefecture,
+                    'city': city,
+                    'page': page
+                }
+                response = await client.get(self.CARELY_URL, params=params)
                 
+                if response.status_code == 304:
+                    # 変更なし。前回病院があったページなら次のページへ
+                    meta = client.cache.meta(cache_key(response)) or {}
+                    if not meta.get('items'):
+                        break
+                    continue
                 if response.status_code != 200:
                     break
-                    
-                soup = BeautifulSoup(response.text, 'html.parser')
-                hospital_items = soup.find_all('div', class_='hospital-item')
                 
-                if not hospital_items:
+                parsed = loop.create_future()
+                await parse_queue.put(ScrapedPage('carely', prefecture, response, parsed))
+                if not await parsed:
                     break
                 
-                for item in hospital_items:
-                    hospital_data = self._parse_carely_hospital(item)
-                    if hospital_data:
-                        hospitals.append(hospital_data)
-                        
-                time.sleep(1)  # レート制限
-                
         except Exception as e:
             print(f"Carely scraping error: {e}")
+
+    async def _fetch_medley(self, client: ScrapingClient, prefecture: str, city: str,
+                            parse_queue: asyncio.Queue):
+        """Medleyの検索API（公開情報）を取得"""
+        loop = asyncio.get_running_loop()
+        try:
+            params = {
+                'prefecture': prefecture,
+                'city': city,
+                'limit': 50
+            }
+            response = await client.get(self.MEDLEY_URL, params=params)
             
+            if response.status_code == 200:
+                await parse_queue.put(
+                    ScrapedPage('medley', prefecture, response, loop.create_future())
+                )
+                
+        except Exception as e:
+            print(f"Medley scraping error: {e}")
+
+    def _parse_carely_page(self, html: str) -> List[Dict]:
+        """Carelyの検索結果ページを解析"""
+        soup = BeautifulSoup(html, 'html.parser')
+        hospitals = []
+        for item in soup.find_all('div', class_='hospital-item'):
+            hospital_data = self._parse_carely_hospital(item)
+            if hospital_data:
+                hospitals.append(hospital_data)
         return hospitals
         
     def _parse_carely_hospital(self, item) -> Optional[Dict]:
@@ -134,45 +326,29 @@ class HospitalScraper:
             print(f"Parse error: {e}")
             return None
             
-    def _scrape_from_medley(self, prefecture: str, city: str) -> List[Dict]:
-        """Medleyから病院情報を取得"""
+    def _parse_medley_response(self, body: str) -> List[Dict]:
+        """Medleyの検索APIの応答を解析"""
         hospitals = []
+        data = json.loads(body)
         
-        try:
-            # Medleyの検索API（公開情報）
-            base_url = "https://medley.life/api/hospitals/search"
-            params = {
-                'prefecture': prefecture,
-                'city': city,
-                'limit': 50
+        for hospital_data in data.get('hospitals', []):
+            hospital = {
+                'name': hospital_data.get('name', ''),
+                'address': hospital_data.get('address', ''),
+                'phone_number': hospital_data.get('phone', ''),
+                'specialties': hospital_data.get('departments', []),
+                'rating': hospital_data.get('rating'),
+                'website': hospital_data.get('website'),
+                'emergency_services': hospital_data.get('emergency', False),
+                'source': 'medley'
             }
             
-            response = self.session.get(base_url, params=params)
+            # 座標情報
+            if 'location' in hospital_data:
+                hospital['latitude'] = hospital_data['location'].get('lat')
+                hospital['longitude'] = hospital_data['location'].get('lng')
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                for hospital_data in data.get('hospitals', []):
-                    hospital = {
-                        'name': hospital_data.get('name', ''),
-                        'address': hospital_data.get('address', ''),
-                        'phone_number': hospital_data.get('phone', ''),
-                        'specialties': hospital_data.get('departments', []),
-                        'rating': hospital_data.get('rating'),
-                        'website': hospital_data.get('website'),
-                        'emergency_services': hospital_data.get('emergency', False),
-                        'source': 'medley'
-                    }
-                    
-                    # 座標情報
-                    if 'location' in hospital_data:
-                        hospital['latitude'] = hospital_data['location'].get('lat')
-                        hospital['longitude'] = hospital_data['location'].get('lng')
-                    
-                    hospitals.append(hospital)
-                    
-        except Exception as e:
-            print(f"Medley scraping error: {e}")
+            hospitals.append(hospital)
             
         return hospitals
         
@@ -217,114 +393,189 @@ class HospitalScraper:
             
         return hospitals
         
-    def save_scraped_hospitals(self, hospitals_data: List[Dict]) -> int:
-        """スクレイピングした病院データを保存"""
+    def save_scraped_hospitals(self, hospitals_data: List[Dict], rebuild_index: bool = True) -> int:
+        """スクレイピングした病院データを一括で保存
+
+        病院名と住所を自然キーとして、INGEST_BATCH_SIZE 件ずつ
+        INSERT ... ON CONFLICT DO UPDATE でまとめて書き込む。診療科は
+        既存のものを残して新しいものだけ追加する。戻り値は保存した病院の件数。
+        """
+        staged = self._stage_hospitals(hospitals_data)
         saved_count = 0
-        
-        for hospital_data in hospitals_data:
+
+        for batch in chunked(list(staged.values())):
             try:
-                # 重複チェック
-                existing_hospital = self.db.query(Hospital).filter(
-                    Hospital.name == hospital_data['name'],
-                    Hospital.address == hospital_data['address']
-                ).first()
-                
-                if existing_hospital:
-                    # 既存データの更新
-                    self._update_hospital(existing_hospital, hospital_data)
-                else:
-                    # 新規作成
-                    self._create_hospital(hospital_data)
-                    
-                saved_count += 1
-                
+                self._upsert_hospital_batch(batch)
+                self.db.commit()
+                saved_count += len(batch)
             except Exception as e:
+                self.db.rollback()
                 print(f"Hospital save error: {e}")
-                continue
-                
-        self.db.commit()
+
+        # 新しい座標を近隣検索に反映
+        if saved_count and rebuild_index:
+            hospital_index.rebuild(self.db)
         return saved_count
-        
-    def _create_hospital(self, hospital_data: Dict) -> Hospital:
-        """新しい病院を作成"""
-        hospital = Hospital(
-            name=hospital_data['name'],
-            address=hospital_data['address'],
-            phone_number=hospital_data.get('phone_number', ''),
-            website=hospital_data.get('website'),
-            latitude=hospital_data.get('latitude'),
-            longitude=hospital_data.get('longitude'),
-            rating=hospital_data.get('rating'),
-            emergency_services=hospital_data.get('emergency_services', False),
-            accepts_insurance=True,
-            parking_available=True,
-            wheelchair_accessible=True,
-            data_source=hospital_data.get('source', 'scraped'),
-            last_updated=datetime.now()
-        )
-        
-        self.db.add(hospital)
-        self.db.flush()  # IDを取得するため
-        
-        # 診療科を追加
-        for specialty_name in hospital_data.get('specialties', []):
-            specialty = HospitalSpecialty(
-                hospital_id=hospital.id,
-                specialty_name=specialty_name,
-                is_available=True
+
+    def _stage_hospitals(self, hospitals_data: List[Dict]) -> Dict[Tuple[str, str], Dict]:
+        """自然キーごとにまとめる（同じ病院が複数回あれば後の値と診療科の和を使う）
+
+        同じ文の中で同じキーを2回更新できないため、書き込む前に重複を除く。
+        値が無い項目は None のままにし、既存の行では元の値を残す。
+        """
+        staged: Dict[Tuple[str, str], Dict] = {}
+        for hospital_data in hospitals_data:
+            name = (hospital_data.get('name') or '').strip()
+            address = (hospital_data.get('address') or '').strip()
+            if not name or not address:
+                continue
+
+            row = {
+                'name': name,
+                'address': address,
+                'phone_number': hospital_data.get('phone_number') or None,
+                'website': hospital_data.get('website'),
+                'latitude': hospital_data.get('latitude'),
+                'longitude': hospital_data.get('longitude'),
+                'rating': hospital_data.get('rating'),
+                'emergency_services': hospital_data.get('emergency_services'),
+                'data_source': hospital_data.get('source'),
+                'specialties': set(hospital_data.get('specialties') or []),
+            }
+            previous = staged.get((name, address))
+            if previous is not None:
+                for field, value in row.items():
+                    if field == 'specialties':
+                        previous['specialties'] |= value
+                    elif value is not None:
+                        previous[field] = value
+            else:
+                staged[(name, address)] = row
+        return staged
+
+    def _upsert_hospital_batch(self, batch: List[Dict]):
+        """1バッチ分の病院と診療科を書き込む（キーの解決1回 + upsert 2文）"""
+        hospitals = Hospital.__table__
+        keys = [(row['name'], row['address']) for row in batch]
+        existing = self._resolve_hospital_ids(keys)
+
+        now = datetime.now()
+        utcnow = datetime.utcnow()
+        rows = []
+        for row in batch:
+            values = {field: value for field, value in row.items() if field != 'specialties'}
+            # NOT NULL の列は空文字で渡し、既存の行では更新しない
+            values['phone_number'] = values['phone_number'] or ''
+            values['data_source'] = values['data_source'] or 'scraped'
+            if (row['name'], row['address']) not in existing and values['emergency_services'] is None:
+                values['emergency_services'] = False
+            values.update(
+                accepts_insurance=True,
+                parking_available=True,
+                wheelchair_accessible=True,
+                last_updated=now,
+                created_at=utcnow,
+                updated_at=utcnow,
             )
-            self.db.add(specialty)
-            
-        return hospital
-        
-    def _update_hospital(self, hospital: Hospital, hospital_data: Dict):
-        """既存病院の情報を更新"""
-        hospital.phone_number = hospital_data.get('phone_number', hospital.phone_number)
-        hospital.website = hospital_data.get('website', hospital.website)
-        hospital.latitude = hospital_data.get('latitude', hospital.latitude)
-        hospital.longitude = hospital_data.get('longitude', hospital.longitude)
-        hospital.rating = hospital_data.get('rating', hospital.rating)
-        hospital.emergency_services = hospital_data.get('emergency_services', hospital.emergency_services)
-        hospital.last_updated = datetime.now()
-        
-        # 診療科の更新
-        existing_specialties = {spec.specialty_name for spec in hospital.specialties}
-        new_specialties = set(hospital_data.get('specialties', []))
-        
-        # 新しい診療科を追加
-        for specialty_name in new_specialties - existing_specialties:
-            specialty = HospitalSpecialty(
-                hospital_id=hospital.id,
-                specialty_name=specialty_name,
-                is_available=True
+            rows.append(values)
+
+        insert = dialect_insert(self.db, hospitals)
+        excluded = insert.excluded
+        # 値が無い（None / 空文字）項目は既存の値を残す
+        kept_if_missing = ('website', 'latitude', 'longitude', 'rating', 'emergency_services')
+        update = {
+            column: func.coalesce(excluded[column], hospitals.c[column])
+            for column in kept_if_missing
+        }
+        update['phone_number'] = func.coalesce(
+            func.nullif(excluded.phone_number, ''), hospitals.c.phone_number
+        )
+        update.update(last_updated=excluded.last_updated, updated_at=excluded.updated_at)
+        self.db.execute(
+            insert.on_conflict_do_update(index_elements=['name', 'address'], set_=update),
+            rows,
+        )
+
+        # 新しく作った病院の ID を取得
+        created = [key for key in keys if key not in existing]
+        if created:
+            existing.update(self._resolve_hospital_ids(created))
+
+        specialty_rows = [
+            {
+                'hospital_id': existing[(row['name'], row['address'])],
+                'specialty_name': specialty_name,
+                'is_available': True,
+                'created_at': utcnow,
+                'updated_at': utcnow,
+            }
+            for row in batch
+            for specialty_name in sorted(row['specialties'])
+        ]
+        if specialty_rows:
+            self.db.execute(
+                dialect_insert(self.db, HospitalSpecialty.__table__).on_conflict_do_nothing(
+                    index_elements=['hospital_id', 'specialty_name']
+                ),
+                specialty_rows,
             )
-            self.db.add(specialty)
-            
-    def run_full_scraping(self, prefectures: List[str] = None) -> Dict:
+
+    def _resolve_hospital_ids(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], int]:
+        """(病院名, 住所) -> 病院ID を1回のクエリで取得"""
+        rows = self.db.query(Hospital.id, Hospital.name, Hospital.address).filter(
+            tuple_(Hospital.name, Hospital.address).in_(keys)
+        ).all()
+        return {(name, address): hospital_id for hospital_id, name, address in rows}
+
+    def run_full_scraping(self, prefectures: List[str] = None,
+                          progress: Optional[Callable[[Dict], None]] = None) -> Dict:
         """全面的なスクレイピングを実行"""
+        return asyncio.run(self.run_full_scraping_async(prefectures, progress))
+
+    async def run_full_scraping_async(self, prefectures: List[str] = None,
+                                      progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """全面的なスクレイピングを実行（都道府県・ソースを並行して取得）
+
+        progress を渡すと保存のたびにその時点の集計を渡して呼ぶ。progress が
+        例外を送出すると（ジョブの取り消しなど）残りの取得を打ち切ってそのまま送出する。
+        """
         if prefectures is None:
             prefectures = ['東京都', '神奈川県', '埼玉県', '千葉県']
             
         results = {
             'total_scraped': 0,
             'total_saved': 0,
-            'prefectures': {}
+            'prefectures': {
+                prefecture: {'scraped': 0, 'saved': 0} for prefecture in prefectures
+            }
         }
-        
-        for prefecture in prefectures:
-            print(f"Scraping hospitals in {prefecture}...")
-            
-            scraped_hospitals = self.scrape_hospital_info(prefecture)
-            saved_count = self.save_scraped_hospitals(scraped_hospitals)
-            
-            results['total_scraped'] += len(scraped_hospitals)
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        cache = HttpCache(self.cache_path)
+        # Session はスレッドセーフではないため、保存は専用の1スレッドで順に行う
+        writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hospital-writer")
+
+        async def save(prefecture: str, hospitals: List[Dict]):
+            print(f"Saving {len(hospitals)} hospitals in {prefecture}...")
+            saved_count = await loop.run_in_executor(
+                writer, self.save_scraped_hospitals, hospitals, False
+            )
+            results['total_scraped'] += len(hospitals)
             results['total_saved'] += saved_count
-            results['prefectures'][prefecture] = {
-                'scraped': len(scraped_hospitals),
-                'saved': saved_count
-            }
-            
-            # レート制限
-            time.sleep(2)
+            results['prefectures'][prefecture]['scraped'] += len(hospitals)
+            results['prefectures'][prefecture]['saved'] += saved_count
+            if progress is not None:
+                await loop.run_in_executor(writer, progress, copy.deepcopy(results))
+
+        try:
+            await self._run_pipeline(prefectures, "", save, cache)
+            # 近隣検索の索引は最後に1回だけ作り直す
+            if results['total_saved']:
+                await loop.run_in_executor(writer, hospital_index.rebuild, self.db)
+        finally:
+            writer.shutdown(wait=True)
+            cache.close()
             
-        return results
\ No newline at end of file
+        results['http_cache'] = cache.stats()
+        results['elapsed_seconds'] = round(time.perf_counter() - started, 2)
+        return results
@@ -1,19 +1,24 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from typing import Iterable, List, Optional, Tuple
+from itertools import islice
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import func
 from fastapi import HTTPException, status
-import math
 from datetime import datetime, time
 from app.models.hospital import Hospital, HospitalSpecialty
+from app.services.distance_engine import haversine_distance
+from app.services.opening_hours import DAY_NAMES, schedule_cache
+from app.services.spatial_index import hospital_index
 
 class HospitalService:
     def __init__(self, db: Session):
         self.db = db
 
     def search_hospitals(self, query: str, specialty: Optional[str] = None, 
-                        limit: int = 20) -> List[Hospital]:
-        """病院を検索"""
-        hospital_query = self.db.query(Hospital).filter(Hospital.is_active == True)
+                        limit: int = 20, open_at: Optional[datetime] = None) -> List[Hospital]:
+        """病院を検索（open_at 指定時はその日時に営業中の病院のみ）"""
+        hospital_query = self.db.query(Hospital).options(
+            selectinload(Hospital.specialties)
+        ).filter(Hospital.is_active == True)
         
         # テキスト検索
         if query:
@@ -28,40 +33,85 @@ class HospitalService:
                 HospitalSpecialty.is_available == True
             )
         
-        return hospital_query.limit(limit).all()
+        if open_at is None:
+            return hospital_query.limit(limit).all()
+        
+        # 営業時間ビットマップで絞り込みながら必要件数まで読み込む
+        open_hospitals = []
+        seen_ids = set()
+        for hospital in hospital_query.yield_per(max(limit * 2, 50)):
+            if hospital.id in seen_ids or not self._is_hospital_open(hospital, open_at):
+                continue
+            seen_ids.add(hospital.id)
+            open_hospitals.append(hospital)
+            if len(open_hospitals) >= limit:
+                break
+        return open_hospitals
 
     def get_nearby_hospitals(self, latitude: float, longitude: float, 
                            distance_km: float = 10, specialty: Optional[str] = None,
-                           emergency_only: bool = False, limit: int = 20) -> List[dict]:
-        """近くの病院を取得"""
-        hospitals = self.db.query(Hospital).filter(
-            Hospital.is_active == True,
-            Hospital.latitude.isnot(None),
-            Hospital.longitude.isnot(None)
-        )
-        
-        # 救急対応フィルター
-        if emergency_only:
-            hospitals = hospitals.filter(Hospital.emergency_services == True)
-        
-        # 診療科フィルター
-        if specialty:
-            hospitals = hospitals.join(HospitalSpecialty).filter(
-                HospitalSpecialty.specialty_name.ilike(f"%{specialty}%"),
-                HospitalSpecialty.is_available == True
-            )
-        
-        all_hospitals = hospitals.all()
-        
-        # 距離計算とフィルタリング
+                           emergency_only: bool = False, limit: int = 20,
+                           open_at: Optional[datetime] = None) -> List[dict]:
+        """近くの病院を取得（open_at 指定時はその日時に営業中の病院のみ）"""
+        # 空間インデックスで半径内の候補を距離順に取得
+        hospital_index.ensure_built(self.db)
+        candidates = hospital_index.query_radius(latitude, longitude, distance_km)
+        if open_at is not None:
+            candidates = hospital_index.filter_open(candidates, open_at)
+        return self._load_nearby_hospitals(candidates, specialty, emergency_only, limit)
+
+    def get_nearest_hospitals(self, latitude: float, longitude: float, count: int = 5,
+                              specialty: Optional[str] = None, emergency_only: bool = False,
+                              open_at: Optional[datetime] = None) -> List[dict]:
+        """最寄りの病院を距離に関係なく指定件数取得"""
+        hospital_index.ensure_built(self.db)
+        candidates = hospital_index.iter_nearest(latitude, longitude)
+        if open_at is not None:
+            candidates = hospital_index.filter_open(candidates, open_at)
+        return self._load_nearby_hospitals(candidates, specialty, emergency_only, count)
+
+    def _load_nearby_hospitals(self, candidates: Iterable[Tuple[int, float]],
+                               specialty: Optional[str], emergency_only: bool,
+                               limit: int) -> List[dict]:
+        """距離順の候補から条件に合う病院を limit 件まで読み込む"""
         nearby_hospitals = []
-        for hospital in all_hospitals:
-            distance = self._calculate_distance(
-                latitude, longitude, hospital.latitude, hospital.longitude
+        candidates = iter(candidates)
+        batch_size = max(limit * 2, 50)
+
+        while len(nearby_hospitals) < limit:
+            batch = list(islice(candidates, batch_size))
+            if not batch:
+                break
+            distances = dict(batch)
+
+            hospitals = self.db.query(Hospital).options(
+                selectinload(Hospital.specialties)
+            ).filter(
+                Hospital.id.in_(distances.keys()),
+                Hospital.is_active == True,
+                Hospital.latitude.isnot(None),
+                Hospital.longitude.isnot(None)
             )
             
-            if distance <= distance_km:
-                hospital_data = {
+            # 救急対応フィルター
+            if emergency_only:
+                hospitals = hospitals.filter(Hospital.emergency_services == True)
+            
+            # 診療科フィルター
+            if specialty:
+                hospitals = hospitals.join(HospitalSpecialty).filter(
+                    HospitalSpecialty.specialty_name.ilike(f"%{specialty}%"),
+                    HospitalSpecialty.is_available == True
+                )
+            
+            hospitals_by_id = {hospital.id: hospital for hospital in hospitals.all()}
+
+            # 候補の距離順を保ったまま結果に追加
+            for hospital_id, distance in batch:
+                hospital = hospitals_by_id.get(hospital_id)
+                if hospital is None:
+                    continue
+                nearby_hospitals.append({
                     "id": hospital.id,
                     "name": hospital.name,
                     "address": hospital.address,
@@ -75,16 +125,17 @@ class HospitalService:
                         {"name": spec.specialty_name, "wait_time": spec.wait_time_avg}
                         for spec in hospital.specialties if spec.is_available
                     ]
-                }
-                nearby_hospitals.append(hospital_data)
+                })
+                if len(nearby_hospitals) >= limit:
+                    break
         
-        # 距離順でソート
-        nearby_hospitals.sort(key=lambda x: x["distance"])
-        return nearby_hospitals[:limit]
+        return nearby_hospitals
 
     def get_hospital_detail(self, hospital_id: int) -> Optional[Hospital]:
         """病院詳細情報を取得"""
-        hospital = self.db.query(Hospital).filter(
+        hospital = self.db.query(Hospital).options(
+            selectinload(Hospital.specialties)
+        ).filter(
             Hospital.id == hospital_id,
             Hospital.is_active == True
         ).first()
@@ -99,45 +150,15 @@ class HospitalService:
 
     def _calculate_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """2点間の距離を計算（ハーバサイン公式）"""
-        R = 6371  # 地球の半径（km）
-        
-        lat1_rad = math.radians(lat1)
-        lat2_rad = math.radians(lat2)
-        delta_lat = math.radians(lat2 - lat1)
-        delta_lon = math.radians(lon2 - lon1)
-        
-        a = (math.sin(delta_lat / 2) ** 2 + 
-             math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon / 2) ** 2)
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-        
-        return R * c
+        return haversine_distance(lat1, lon1, lat2, lon2)
 
-    def _is_hospital_open(self, hospital: Hospital) -> bool:
-        """病院が現在営業中かチェック"""
-        now = datetime.now()
-        current_time = now.time()
-        weekday = now.weekday()  # 0=月曜日, 6=日曜日
-        
-        # 曜日に応じた営業時間を取得
-        open_time, close_time = self._get_hospital_hours_for_day(hospital, weekday)
-        
-        if open_time and close_time:
-            return open_time <= current_time <= close_time
-        
-        return False
+    def _is_hospital_open(self, hospital: Hospital, at: Optional[datetime] = None) -> bool:
+        """病院が営業中かチェック（省略時は現在時刻）"""
+        return schedule_cache.get(hospital).is_open_at(at or datetime.now())
 
     def _get_hospital_hours_for_day(self, hospital: Hospital, weekday: int) -> tuple:
         """指定された曜日の営業時間を取得"""
-        hours_map = {
-            0: (hospital.monday_open, hospital.monday_close),
-            1: (hospital.tuesday_open, hospital.tuesday_close),
-            2: (hospital.wednesday_open, hospital.wednesday_close),
-            3: (hospital.thursday_open, hospital.thursday_close),
-            4: (hospital.friday_open, hospital.friday_close),
-            5: (hospital.saturday_open, hospital.saturday_close),
-            6: (hospital.sunday_open, hospital.sunday_close),
-        }
-        return hours_map.get(weekday, (None, None))
+        return schedule_cache.get(hospital).hours_for_day(weekday)
 
     def _get_today_hours(self, hospital: Hospital) -> Optional[str]:
         """今日の営業時間を取得"""
@@ -151,21 +172,31 @@ class HospitalService:
 
     def _get_next_open_time(self, hospital: Hospital) -> Optional[str]:
         """次回営業開始時間を取得"""
-        if self._is_hospital_open(hospital):
+        now = datetime.now()
+        schedule = schedule_cache.get(hospital)
+        if schedule.is_open_at(now):
             return None
         
-        # 簡略化実装：翌日の営業時間を返す
-        tomorrow = (datetime.now().weekday() + 1) % 7
-        open_time, close_time = self._get_hospital_hours_for_day(hospital, tomorrow)
-        
-        if open_time:
-            days = ["月", "火", "水", "木", "金", "土", "日"]
-            return f"{days[tomorrow]}曜日 {open_time.strftime('%H:%M')}から"
+        # 1週間先までのビットマップから次の営業開始を探す
+        opens_at = schedule.next_open_at(now)
+        if opens_at:
+            return f"{DAY_NAMES[opens_at.weekday()]}曜日 {opens_at.strftime('%H:%M')}から"
         
         return "営業時間情報なし"
 
     def create_hospital(self, hospital_data: dict) -> Hospital:
         """新しい病院を作成（管理者用）"""
+        # スクレイピングの upsert と同じ自然キー（名称 + 住所）で重複を防ぐ
+        existing = self.db.query(Hospital.id).filter(
+            Hospital.name == hospital_data["name"],
+            Hospital.address == hospital_data["address"]
+        ).first()
+        if existing:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Hospital already exists"
+            )
+
         hospital = Hospital(
             name=hospital_data["name"],
             description=hospital_data.get("description"),
@@ -184,10 +215,21 @@ class HospitalService:
         self.db.add(hospital)
         self.db.commit()
         self.db.refresh(hospital)
+        hospital_index.invalidate()
         return hospital
 
     def add_hospital_specialty(self, hospital_id: int, specialty_data: dict) -> HospitalSpecialty:
         """病院に診療科を追加"""
+        existing = self.db.query(HospitalSpecialty.id).filter(
+            HospitalSpecialty.hospital_id == hospital_id,
+            HospitalSpecialty.specialty_name == specialty_data["specialty_name"]
+        ).first()
+        if existing:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Specialty already exists"
+            )
+
         specialty = HospitalSpecialty(
             hospital_id=hospital_id,
             specialty_name=specialty_data["specialty_name"],
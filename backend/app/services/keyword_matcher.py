@@ -0,0 +1,72 @@
+from collections import deque
+from typing import Dict, Generic, Hashable, List, Set, TypeVar
+
+T = TypeVar("T", bound=Hashable)
+
+
+class KeywordAutomaton(Generic[T]):
+    """Aho–Corasick 法による複数キーワードの一括照合
+
+    キーワードごとに任意の値（ルールIDなど）を登録して compile() すると、
+    入力文字列を1回走査するだけで一致した全キーワードの値を取得できる。
+    照合コストはキーワード数ではなく入力長に比例する。
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[Set[T]] = [set()]
+        self._compiled = False
+
+    def add(self, keyword: str, value: T):
+        """キーワードと一致時に返す値を登録"""
+        if not keyword:
+            return
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append(set())
+                self._goto[state][char] = next_state
+            state = next_state
+        self._outputs[state].add(value)
+        self._compiled = False
+
+    def compile(self):
+        """失敗遷移を幅優先で計算し、出力を失敗先から引き継ぐ"""
+        queue = deque()
+        for next_state in self._goto[0].values():
+            self._fail[next_state] = 0
+            queue.append(next_state)
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._outputs[next_state] |= self._outputs[self._fail[next_state]]
+
+        self._compiled = True
+
+    def find(self, text: str) -> Set[T]:
+        """入力中に現れたキーワードの値を集合で返す"""
+        if not self._compiled:
+            self.compile()
+
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found: Set[T] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                found |= outputs[state]
+        return found
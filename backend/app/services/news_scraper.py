@@ -1,22 +1,174 @@
+import asyncio
 import requests
 from bs4 import BeautifulSoup
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 import re
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 from urllib.parse import urljoin, urlparse
 import time
+from decouple import config
 from datetime import datetime, timedelta
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 from app.models.news import HealthNews, HealthAlert
+from app.response_cache import response_cache
+from app.services.bulk_ingest import IngestResult, alert_hash, chunked, dialect_insert, news_hash
+from app.services.scraping_http import (
+    SCRAPER_HTTP_CACHE_PATH, SCRAPER_TIMEOUT_SECONDS, USER_AGENT, HttpCache, ScrapingClient
+)
 import json
 import feedparser
 
+# 記事本文を並行して取得する件数（ホストごとの上限は SCRAPER_HOST_CONNECTIONS）
+NEWS_CONTENT_CONCURRENCY = config("NEWS_CONTENT_CONCURRENCY", default=16, cast=int)
+# 記事 HTML の解析に使うワーカー（thread / process）と数
+NEWS_PARSE_EXECUTOR = config("NEWS_PARSE_EXECUTOR", default="thread")
+NEWS_PARSE_WORKERS = config("NEWS_PARSE_WORKERS", default=2, cast=int)
+
+# 本文を取得できなかった記事の content
+CONTENT_FALLBACK = "詳細は元記事をご確認ください。"
+
+# 本文とみなす要素（先に見つかったものを使う）
+CONTENT_SELECTORS = [
+    'article',
+    '.content',
+    '.main-content',
+    '.post-content',
+    '.entry-content',
+    'main',
+    '#content'
+]
+
+
+def extract_article_text(html: str) -> Optional[str]:
+    """記事ページの HTML から本文の先頭を抽出（ワーカープロセスからも呼べるようモジュール関数）"""
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    for selector in CONTENT_SELECTORS:
+        content_elem = soup.select_one(selector)
+        if content_elem:
+            # テキストを抽出し、改行を整理
+            text = content_elem.get_text(strip=True)
+            return text[:500] + '...' if len(text) > 500 else text
+            
+    # フォールバック：bodyから抽出
+    body = soup.find('body')
+    if body:
+        text = body.get_text(strip=True)
+        return text[:500] + '...' if len(text) > 500 else text
+    return None
+
+# アラートの重要度（スクレイピング結果の severity） -> (alert_type, severity_level)
+ALERT_SEVERITIES = {
+    'info': ('info', 1),
+    'warning': ('warning', 3),
+    'danger': ('emergency', 5),
+    'emergency': ('emergency', 5),
+}
+
+
+def _required(item: Dict, field: str, max_length: Optional[int] = None) -> str:
+    value = (item.get(field) or '').strip()
+    if not value:
+        raise ValueError(f"{field} がありません")
+    if max_length is not None and len(value) > max_length:
+        raise ValueError(f"{field} が {max_length} 文字を超えています")
+    return value
+
+
+def news_row(item: Dict) -> Dict:
+    """スクレイピングしたニュースを health_news の行に変換（不正なら ValueError）"""
+    title = _required(item, 'title', 500)
+    source = _required(item, 'source', 255)
+    published_date = item.get('published_at')
+    if not isinstance(published_date, datetime):
+        published_date = datetime.now()
+    now = datetime.utcnow()
+    return {
+        'title': title,
+        'content': item.get('content') or CONTENT_FALLBACK,
+        'category': item.get('category') or 'general',
+        'source': source,
+        'source_url': item.get('url'),
+        'tags': json.dumps(item.get('tags') or [], ensure_ascii=False),
+        'published_date': published_date,
+        'is_featured': item.get('priority') == 'high',
+        'is_published': True,
+        'view_count': 0,
+        'content_hash': news_hash(source, title),
+        'created_at': now,
+        'updated_at': now,
+    }
+
+
+def alert_row(item: Dict) -> Dict:
+    """スクレイピングしたアラートを health_alerts の行に変換（不正なら ValueError）"""
+    title = _required(item, 'title', 500)
+    message = _required(item, 'message')
+    source_authority = _required(item, 'source', 255)
+    severity = item.get('severity', 'info')
+    if severity not in ALERT_SEVERITIES:
+        raise ValueError(f"不明な severity です: {severity}")
+    alert_type, severity_level = ALERT_SEVERITIES[severity]
+    area = item.get('area')
+    affected_areas = json.dumps([area], ensure_ascii=False) if area else None
+    now = datetime.utcnow()
+    return {
+        'title': title,
+        'message': message,
+        'alert_type': alert_type,
+        'severity_level': severity_level,
+        'affected_areas': affected_areas,
+        'start_date': item.get('start_date') or datetime.now(),
+        'end_date': item.get('valid_until'),
+        'source_authority': source_authority,
+        'source_url': item.get('url'),
+        'is_active': True,
+        'is_public': True,
+        'content_hash': alert_hash(source_authority, title, affected_areas),
+        'created_at': now,
+        'updated_at': now,
+    }
+
+
+def backfill_content_hashes(bind):
+    """content_hash が無い既存の行にハッシュを設定（同じハッシュの2件目以降は空のまま）"""
+    with Session(bind=bind) as db:
+        for model, key in (
+            (HealthNews, lambda row: news_hash(row.source, row.title)),
+            (HealthAlert, lambda row: alert_hash(row.source_authority, row.title, row.affected_areas)),
+        ):
+            seen = {
+                content_hash for (content_hash,) in
+                db.query(model.content_hash).filter(model.content_hash.isnot(None))
+            }
+            updates = []
+            for row in db.query(model).filter(model.content_hash.is_(None)).order_by(model.id):
+                row_hash = key(row)
+                if row_hash not in seen:
+                    seen.add(row_hash)
+                    updates.append({'id': row.id, 'content_hash': row_hash})
+            if updates:
+                db.execute(update(model), updates)
+        db.commit()
+
+
 class HealthNewsScraper:
-    def __init__(self, db: Session):
+    """健康ニュース・アラートのスクレイパー
+
+    RSS と一覧ページは前回の ETag / Last-Modified を送って取得し、304（変更なし）の
+    ソースは解析も保存も行わない。検証子は保存まで終わった後に記録する。
+    """
+
+    def __init__(self, db: Session, cache_path: str = SCRAPER_HTTP_CACHE_PATH):
         self.db = db
         self.session = requests.Session()
         self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+            'User-Agent': USER_AGENT
         })
+        self.cache = HttpCache(cache_path)
+        self._pending_validators = []  # 保存後に記録する (URL, 応答ヘッダー)
+        self._save_failed = False  # 保存に失敗したバッチがあれば検証子を記録しない
         
     def scrape_health_news(self) -> List[Dict]:
         """健康ニュースをスクレイピング"""
@@ -29,6 +181,8 @@ class HealthNewsScraper:
         all_news.extend(self._scrape_from_who())   # WHO（日本語版）
         all_news.extend(self._scrape_from_cdc())   # CDC
         
+        # 一覧から集めた記事の本文をまとめて並行取得
+        self._fill_contents(all_news)
         return all_news
         
     def _scrape_from_mhlw(self) -> List[Dict]:
@@ -38,7 +192,19 @@ class HealthNewsScraper:
         try:
             # 厚生労働省のプレスリリース RSS
             rss_url = "https://www.mhlw.go.jp/stf/news/rss.xml"
-            feed = feedparser.parse(rss_url)
+            validators = self.cache.validators(rss_url)
+            feed = feedparser.parse(
+                rss_url, etag=validators["etag"], modified=validators["modified"], agent=USER_AGENT
+            )
+            # 通信エラーでは status が無いため、キャッシュの統計に含めない
+            if feed.get('status') is not None:
+                self.cache.record(feed['status'])
+            if feed.get('status') == 304:
+                return news_items
+            self._pending_validators.append((rss_url, {
+                'etag': feed.get('etag'),
+                'last-modified': feed.get('modified')
+            }))
             
             for entry in feed.entries[:10]:  # 最新10件
                 # 健康関連のキーワードでフィルタリング
@@ -47,7 +213,7 @@ class HealthNewsScraper:
                 if any(keyword in entry.title for keyword in health_keywords):
                     news_item = {
                         'title': entry.title,
-                        'content': self._extract_content_from_url(entry.link),
+                        'content': None,  # 本文は _fill_contents で取得
                         'url': entry.link,
                         'published_at': self._parse_date(entry.published),
                         'category': self._categorize_health_news(entry.title),
@@ -69,7 +235,7 @@ class HealthNewsScraper:
         try:
             # 感染症発生動向調査
             url = "https://www.niid.go.jp/niid/ja/surveillance.html"
-            response = self.session.get(url)
+            response = self._get_listing(url)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.text, 'html.parser')
@@ -84,7 +250,7 @@ class HealthNewsScraper:
                         
                         news_item = {
                             'title': title,
-                            'content': self._extract_content_from_url(full_url),
+                            'content': None,
                             'url': full_url,
                             'published_at': datetime.now(),
                             'category': '感染症',
@@ -106,7 +272,7 @@ class HealthNewsScraper:
         try:
             # 日本医師会のお知らせ
             url = "https://www.med.or.jp/news/"
-            response = self.session.get(url)
+            response = self._get_listing(url)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.text, 'html.parser')
@@ -128,7 +294,7 @@ class HealthNewsScraper:
                             
                             news_item = {
                                 'title': title,
-                                'content': self._extract_content_from_url(full_url),
+                                'content': None,
                                 'url': full_url,
                                 'published_at': published_date,
                                 'category': '医療',
@@ -206,41 +372,66 @@ class HealthNewsScraper:
             
         return news_items
         
-    def _extract_content_from_url(self, url: str) -> str:
-        """URLからコンテンツを抽出"""
-        try:
-            response = self.session.get(url, timeout=10)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # メインコンテンツを抽出
-                content_selectors = [
-                    'article',
-                    '.content',
-                    '.main-content',
-                    '.post-content',
-                    '.entry-content',
-                    'main',
-                    '#content'
-                ]
-                
-                for selector in content_selectors:
-                    content_elem = soup.select_one(selector)
-                    if content_elem:
-                        # テキストを抽出し、改行を整理
-                        text = content_elem.get_text(strip=True)
-                        return text[:500] + '...' if len(text) > 500 else text
-                        
-                # フォールバック：bodyから抽出
-                body = soup.find('body')
-                if body:
-                    text = body.get_text(strip=True)
-                    return text[:500] + '...' if len(text) > 500 else text
-                    
-        except Exception as e:
-            print(f"Content extraction error: {e}")
-            
-        return "詳細は元記事をご確認ください。"
+    def _get_listing(self, url: str) -> requests.Response:
+        """一覧ページを条件付きで取得（304 なら呼び出し側は何もしない）"""
+        response = self.session.get(
+            url, headers=self.cache.conditional_headers(url), timeout=SCRAPER_TIMEOUT_SECONDS
+        )
+        self.cache.record(response.status_code)
+        if response.status_code == 200:
+            self._pending_validators.append((url, response.headers))
+        return response
+
+    def _remember_validators(self):
+        """保存まで終わったソースの検証子を記録"""
+        for url, headers in self._pending_validators:
+            self.cache.store(url, {key.lower(): value for key, value in headers.items() if value})
+        self._pending_validators = []
+
+    def _fill_contents(self, news_items: List[Dict]):
+        """content が未取得の記事について、元記事から本文を取得して埋める"""
+        urls = list(dict.fromkeys(
+            item['url'] for item in news_items if item.get('content') is None
+        ))
+        contents = asyncio.run(self.fetch_contents(urls)) if urls else {}
+        for item in news_items:
+            if item.get('content') is None:
+                item['content'] = contents.get(item['url']) or CONTENT_FALLBACK
+
+    async def fetch_contents(self, urls: List[str]) -> Dict[str, Optional[str]]:
+        """複数の記事ページを並行して取得し、URL -> 本文 を返す
+
+        取得は keep-alive 接続を使い回し、全体で NEWS_CONTENT_CONCURRENCY 件、
+        ホストごとに SCRAPER_HOST_CONNECTIONS 件まで同時に行う。HTML の解析は
+        イベントループを塞がないようワーカープールで実行する。
+        """
+        contents: Dict[str, Optional[str]] = {}
+        limit = asyncio.Semaphore(max(1, NEWS_CONTENT_CONCURRENCY))
+        loop = asyncio.get_running_loop()
+
+        with self._parse_executor() as parse_executor:
+            async with ScrapingClient(max_connections=NEWS_CONTENT_CONCURRENCY) as client:
+
+                async def fetch(url: str):
+                    async with limit:
+                        try:
+                            response = await client.get(url)
+                            if response.status_code != 200:
+                                return
+                            contents[url] = await loop.run_in_executor(
+                                parse_executor, extract_article_text, response.text
+                            )
+                        except Exception as e:
+                            print(f"Content extraction error: {e}")
+
+                await asyncio.gather(*(fetch(url) for url in urls))
+
+        return contents
+
+    def _parse_executor(self) -> Executor:
+        if NEWS_PARSE_EXECUTOR == "process":
+            return ProcessPoolExecutor(max_workers=NEWS_PARSE_WORKERS)
+        return ThreadPoolExecutor(max_workers=NEWS_PARSE_WORKERS, thread_name_prefix="news-parse")
         
     def _categorize_health_news(self, title: str) -> str:
         """ニュースタイトルからカテゴリを判定"""
@@ -346,79 +537,85 @@ class HealthNewsScraper:
             
         return alerts
         
-    def save_scraped_news(self, news_data: List[Dict]) -> int:
-        """スクレイピングしたニュースデータを保存"""
-        saved_count = 0
-        
-        for news_item in news_data:
+    def save_scraped_news(self, news_data: List[Dict]) -> Dict[str, int]:
+        """スクレイピングしたニュースデータを一括で保存
+
+        ソースとタイトルから content_hash を計算し、既存のハッシュを1回の IN クエリで
+        調べてから新しいものだけをまとめて INSERT する（同時実行で入れ違った分は
+        一意インデックスの ON CONFLICT DO NOTHING で捨てる）。
+        戻り値は inserted / duplicate / rejected の件数。
+        """
+        return self._ingest(HealthNews.__table__, news_data, news_row, "News")
+
+    def save_scraped_alerts(self, alerts_data: List[Dict]) -> Dict[str, int]:
+        """スクレイピングしたアラートデータを一括で保存（方式は save_scraped_news と同じ）"""
+        return self._ingest(HealthAlert.__table__, alerts_data, alert_row, "Alert")
+
+    def _ingest(self, table, items: List[Dict], to_row, label: str) -> Dict[str, int]:
+        result = IngestResult()
+        staged: Dict[str, Dict] = {}
+        for item in items:
             try:
-                # 重複チェック
-                existing_news = self.db.query(HealthNews).filter(
-                    HealthNews.title == news_item['title'],
-                    HealthNews.source == news_item['source']
-                ).first()
-                
-                if not existing_news:
-                    health_news = HealthNews(
-                        title=news_item['title'],
-                        content=news_item['content'],
-                        category=news_item['category'],
-                        source=news_item['source'],
-                        source_url=news_item['url'],
-                        published_at=news_item['published_at'],
-                        priority=news_item['priority'],
-                        tags=news_item['tags']
-                    )
-                    
-                    self.db.add(health_news)
-                    saved_count += 1
-                    
-            except Exception as e:
-                print(f"News save error: {e}")
+                row = to_row(item)
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"{label} rejected: {e}")
+                result.rejected += 1
                 continue
-                
-        self.db.commit()
-        return saved_count
-        
-    def save_scraped_alerts(self, alerts_data: List[Dict]) -> int:
-        """スクレイピングしたアラートデータを保存"""
-        saved_count = 0
-        
-        for alert_item in alerts_data:
+            if row['content_hash'] in staged:
+                result.duplicate += 1
+            else:
+                staged[row['content_hash']] = row
+
+        for batch in chunked(list(staged.values())):
             try:
-                # 重複チェック
-                existing_alert = self.db.query(HealthAlert).filter(
-                    HealthAlert.title == alert_item['title'],
-                    HealthAlert.area == alert_item['area']
-                ).first()
-                
-                if not existing_alert:
-                    health_alert = HealthAlert(
-                        title=alert_item['title'],
-                        message=alert_item['message'],
-                        severity=alert_item['severity'],
-                        area=alert_item['area'],
-                        valid_until=alert_item['valid_until'],
-                        source=alert_item['source']
+                existing = {
+                    content_hash for (content_hash,) in self.db.execute(
+                        select(table.c.content_hash).where(
+                            table.c.content_hash.in_([row['content_hash'] for row in batch])
+                        )
                     )
-                    
-                    self.db.add(health_alert)
-                    saved_count += 1
-                    
+                }
+                new_rows = [row for row in batch if row['content_hash'] not in existing]
+                if new_rows:
+                    self.db.execute(
+                        dialect_insert(self.db, table).on_conflict_do_nothing(
+                            index_elements=['content_hash']
+                        ),
+                        new_rows,
+                    )
+                self.db.commit()
+                result.add(IngestResult(len(new_rows), len(batch) - len(new_rows)))
             except Exception as e:
-                print(f"Alert save error: {e}")
-                continue
-                
-        self.db.commit()
-        return saved_count
-        
-    def run_full_scraping(self) -> Dict:
-        """全面的なニュース・アラートスクレイピングを実行"""
+                self.db.rollback()
+                print(f"{label} save error: {e}")
+                result.rejected += len(batch)
+                self._save_failed = True
+
+        if result.inserted:
+            response_cache.invalidate("news")
+        return result.as_dict()
+
+    def run_full_scraping(self, progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """全面的なニュース・アラートスクレイピングを実行
+
+        progress を渡すとニュースの保存後にその時点の件数を渡して呼ぶ
+        （例外を送出すればアラートの取得は行わない）。
+        """
         print("Starting health news scraping...")
+        self.cache.reset_stats()
+        self._save_failed = False
         
         # ニュースをスクレイピング
         news_data = self.scrape_health_news()
         news_saved = self.save_scraped_news(news_data)
+        if self._save_failed:
+            # 次回 304 で読み飛ばされないよう、保存できなかった回の検証子は記録しない
+            print("News save failed; conditional request validators were not stored")
+            self._pending_validators = []
+        else:
+            self._remember_validators()
+        if progress is not None:
+            progress({'news': {'scraped': len(news_data), **news_saved}})
         
         # アラートをスクレイピング
         alerts_data = self.scrape_health_alerts()
@@ -427,12 +624,15 @@ class HealthNewsScraper:
         results = {
             'news': {
                 'scraped': len(news_data),
-                'saved': news_saved
+                'saved': news_saved['inserted'],
+                **news_saved
             },
             'alerts': {
                 'scraped': len(alerts_data),
-                'saved': alerts_saved
+                'saved': alerts_saved['inserted'],
+                **alerts_saved
             },
+            'http_cache': self.cache.stats(),
             'timestamp': datetime.now().isoformat()
         }
         
@@ -4,6 +4,8 @@ from sqlalchemy import desc
 from fastapi import HTTPException, status
 from datetime import datetime, timedelta
 from app.models.news import HealthNews, HealthAlert
+from app.response_cache import response_cache
+from app.services.bulk_ingest import news_hash
 
 class NewsService:
     def __init__(self, db: Session):
@@ -69,6 +71,7 @@ class NewsService:
              HealthNews.content.ilike(f"%{query}%"))
         ).order_by(desc(HealthNews.published_date)).limit(limit).all()
 
+    @response_cache.cached_query("news")
     def get_news_categories(self) -> List[str]:
         """ニュースカテゴリ一覧を取得"""
         categories = self.db.query(HealthNews.category).filter(
@@ -78,6 +81,14 @@ class NewsService:
 
     def create_news(self, news_data: dict) -> HealthNews:
         """新しいニュースを作成（管理者用）"""
+        # スクレイピングと同じ重複判定キー（ソース + タイトル）を設定する
+        digest = news_hash(news_data.get("source"), news_data["title"])
+        if self.db.query(HealthNews.id).filter(HealthNews.content_hash == digest).first():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="News already exists"
+            )
+
         news = HealthNews(
             title=news_data["title"],
             content=news_data["content"],
@@ -89,12 +100,14 @@ class NewsService:
             category=news_data["category"],
             tags=news_data.get("tags"),
             published_date=news_data.get("published_date", datetime.utcnow()),
-            is_featured=news_data.get("is_featured", False)
+            is_featured=news_data.get("is_featured", False),
+            content_hash=digest
         )
         
         self.db.add(news)
         self.db.commit()
         self.db.refresh(news)
+        response_cache.invalidate("news")
         return news
 
     def create_health_alert(self, alert_data: dict) -> HealthAlert:
@@ -114,6 +127,7 @@ class NewsService:
         self.db.add(alert)
         self.db.commit()
         self.db.refresh(alert)
+        response_cache.invalidate("news")
         return alert
 
     def get_trending_news(self, days: int = 7, limit: int = 10) -> List[HealthNews]:
@@ -0,0 +1,170 @@
+import threading
+from datetime import datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES  # 96
+SLOTS_PER_WEEK = SLOTS_PER_DAY * 7  # 672
+FULL_WEEK_MASK = (1 << SLOTS_PER_WEEK) - 1
+
+# 曜日順（0=月曜日）の営業時間カラム
+DAY_COLUMNS = [
+    ("monday_open", "monday_close"),
+    ("tuesday_open", "tuesday_close"),
+    ("wednesday_open", "wednesday_close"),
+    ("thursday_open", "thursday_close"),
+    ("friday_open", "friday_close"),
+    ("saturday_open", "saturday_close"),
+    ("sunday_open", "sunday_close"),
+]
+HOURS_COLUMN_NAMES = [name for pair in DAY_COLUMNS for name in pair]
+DAY_NAMES = ["月", "火", "水", "木", "金", "土", "日"]
+
+DayHours = Tuple[Optional[time], Optional[time]]
+
+
+def _local(at: datetime) -> datetime:
+    """タイムゾーン付きの日時はローカル時刻に揃える"""
+    if at.tzinfo is not None:
+        return at.astimezone().replace(tzinfo=None)
+    return at
+
+
+def week_slot(at: datetime) -> int:
+    """日時を週内の15分スロット番号に変換"""
+    at = _local(at)
+    return at.weekday() * SLOTS_PER_DAY + (at.hour * 60 + at.minute) // SLOT_MINUTES
+
+
+def _minutes(value) -> float:
+    """時刻を0時からの分に変換"""
+    return value.hour * 60 + value.minute + value.second / 60
+
+
+def _close_minutes(close_time: time) -> float:
+    """終了時刻を0時からの分に変換（23:59 は 24:00、つまり日の終わりまでとみなす）"""
+    if close_time >= time(23, 59):
+        return 24 * 60
+    return _minutes(close_time)
+
+
+def build_week_mask(hours: List[DayHours]) -> int:
+    """曜日ごとの営業時間から 7×96 スロットのビットマップを作成
+
+    営業時間と一部でも重なるスロットを立てる（開始時刻は切り捨て、終了時刻は
+    切り上げ）。ビットは絞り込みの候補で、正確な判定は WeeklySchedule.is_open_at が
+    営業時間と比べて行う。終了時刻が開始時刻より前の場合は翌日にまたがる営業とみなす。
+    """
+    mask = 0
+    for weekday, (open_time, close_time) in enumerate(hours):
+        if not open_time or not close_time or open_time == close_time:
+            continue
+
+        start = int(_minutes(open_time) // SLOT_MINUTES)
+        end = int(-(-_close_minutes(close_time) // SLOT_MINUTES))
+        if close_time < open_time:
+            end += SLOTS_PER_DAY
+        if end <= start:
+            continue
+
+        offset = weekday * SLOTS_PER_DAY
+        bits = ((1 << (end - start)) - 1) << (offset + start)
+        # 日曜深夜から月曜にまたがる分は週の先頭へ回す
+        mask |= (bits | (bits >> SLOTS_PER_WEEK)) & FULL_WEEK_MASK
+    return mask
+
+
+class WeeklySchedule:
+    """病院の1週間の営業時間（15分単位のビットマップ）"""
+
+    __slots__ = ("hours", "mask")
+
+    def __init__(self, hours: List[DayHours]):
+        self.hours = hours
+        self.mask = build_week_mask(hours)
+
+    @classmethod
+    def from_hospital(cls, hospital) -> "WeeklySchedule":
+        """Hospital（または同名属性を持つ行）から作成"""
+        return cls([
+            (getattr(hospital, open_column), getattr(hospital, close_column))
+            for open_column, close_column in DAY_COLUMNS
+        ])
+
+    def is_open_at(self, at: datetime) -> bool:
+        """指定日時に営業中か（ビットマップで絞り込み、境界のスロットは営業時間で確認）"""
+        if not (self.mask >> week_slot(at)) & 1:
+            return False
+        return self.is_open_exactly(at)
+
+    def is_open_exactly(self, at: datetime) -> bool:
+        """営業時間と直接比べて営業中か判定（開始時刻を含み、終了時刻を含まない）"""
+        at = _local(at)
+        weekday = at.weekday()
+        minutes = _minutes(at)
+
+        open_time, close_time = self.hours[weekday]
+        if open_time and close_time and open_time != close_time:
+            if close_time > open_time:
+                if _minutes(open_time) <= minutes < _close_minutes(close_time):
+                    return True
+            elif minutes >= _minutes(open_time):
+                return True
+
+        # 前日から日をまたいだ営業
+        open_time, close_time = self.hours[(weekday - 1) % 7]
+        if open_time and close_time and close_time < open_time:
+            return minutes < _close_minutes(close_time)
+        return False
+
+    def hours_for_day(self, weekday: int) -> DayHours:
+        """指定された曜日の営業時間を取得"""
+        return self.hours[weekday]
+
+    def next_open_at(self, at: datetime) -> Optional[datetime]:
+        """指定日時より後で最初に営業を開始する日時（週内に営業が無ければ None）"""
+        if not self.mask:
+            return None
+
+        at = _local(at)
+        # 当日から翌週の同じ曜日までの開始時刻を順に見る
+        for days in range(8):
+            day = at.date() + timedelta(days=days)
+            open_time, close_time = self.hours[day.weekday()]
+            if not open_time or not close_time or open_time == close_time:
+                continue
+            opens_at = datetime.combine(day, open_time)
+            if opens_at > at:
+                return opens_at
+        return None
+
+
+class ScheduleCache:
+    """病院IDごとの WeeklySchedule キャッシュ（updated_at が変わると作り直す）"""
+
+    def __init__(self):
+        self._schedules: Dict[int, Tuple[Optional[datetime], WeeklySchedule]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, hospital) -> WeeklySchedule:
+        """病院の営業時間ビットマップを取得"""
+        cached = self._schedules.get(hospital.id)
+        updated_at = getattr(hospital, "updated_at", None)
+        if cached is not None and cached[0] == updated_at:
+            return cached[1]
+
+        schedule = WeeklySchedule.from_hospital(hospital)
+        with self._lock:
+            self._schedules[hospital.id] = (updated_at, schedule)
+        return schedule
+
+    def put(self, hospital_id: int, updated_at: Optional[datetime], schedule: WeeklySchedule):
+        with self._lock:
+            self._schedules[hospital_id] = (updated_at, schedule)
+
+    def clear(self):
+        with self._lock:
+            self._schedules = {}
+
+
+schedule_cache = ScheduleCache()
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Mapping, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from decouple import config
+
+from app.metrics import registry
+
+# スクレイピング先ごとの既定のリクエスト間隔（1ホストあたり毎秒のリクエスト数と瞬間的に許す件数）
+SCRAPER_HOST_RATE = config("SCRAPER_HOST_RATE", default=1.0, cast=float)
+SCRAPER_HOST_BURST = config("SCRAPER_HOST_BURST", default=1, cast=int)
+SCRAPER_TIMEOUT_SECONDS = config("SCRAPER_TIMEOUT_SECONDS", default=10.0, cast=float)
+# 1ホストあたりの同時接続数と、クライアント全体の接続数の上限
+SCRAPER_HOST_CONNECTIONS = config("SCRAPER_HOST_CONNECTIONS", default=4, cast=int)
+SCRAPER_MAX_CONNECTIONS = config("SCRAPER_MAX_CONNECTIONS", default=32, cast=int)
+
+# 条件付きリクエストの検証子（ETag / Last-Modified）を保存する SQLite ファイル（空で無効）
+SCRAPER_HTTP_CACHE_PATH = config("SCRAPER_HTTP_CACHE_PATH", default="scraper_http_cache.db")
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+class TokenBucket:
+    """トークンバケットによるレート制限（asyncio 用）
+
+    rate 件/秒でトークンが貯まり、最大 burst 件まで連続して取得できる。
+    待っている間はイベントループを塞がないため、別ホストへのリクエストは
+    並行して進む。
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # 待機中も Lock を保持し、取得の順番を到着順に保つ
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class HostRateLimiter:
+    """ホストごとの TokenBucket"""
+
+    def __init__(self, rate: float = SCRAPER_HOST_RATE, burst: int = SCRAPER_HOST_BURST,
+                 overrides: Optional[Dict[str, float]] = None):
+        self.rate = rate
+        self.burst = burst
+        self.overrides = overrides or {}
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, host: str) -> TokenBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(self.overrides.get(host, self.rate), self.burst)
+            self._buckets[host] = bucket
+        return bucket
+
+    async def acquire(self, url: str):
+        await self.bucket(urlsplit(url).netloc).acquire()
+
+
+def cache_key(response: httpx.Response) -> str:
+    """HttpCache のキー（リダイレクトされた場合も最初に要求した URL）"""
+    first = response.history[0] if response.history else response
+    return str(first.request.url)
+
+
+class HttpCache:
+    """スクレイパー用の条件付きリクエストのキャッシュ
+
+    URL ごとに前回の ETag / Last-Modified を SQLite に保存し、次回の取得で
+    If-None-Match / If-Modified-Since を送る。304 が返れば前回から変わって
+    いないため、呼び出し側は解析と DB への保存を省略できる。本文は保存しない。
+
+    検証子は呼び出し側が処理を終えてから store で保存する（途中で失敗した
+    ページを次回 304 で読み飛ばさないため）。hits / misses は実行ごとの件数。
+    """
+
+    def __init__(self, path: str = SCRAPER_HTTP_CACHE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._hits_total = registry.counter(
+            "scraper_http_cache_hits_total", "スクレイピングで 304（変更なし）だった件数"
+        )
+        self._misses_total = registry.counter(
+            "scraper_http_cache_misses_total", "スクレイピングで本文を取得した件数"
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS http_cache ("
+                " url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT,"
+                " meta TEXT, stored_at REAL NOT NULL)"
+            )
+        return self._connection
+
+    def _entry(self, url: str) -> Optional[tuple]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            return self._connect().execute(
+                "SELECT etag, last_modified, meta FROM http_cache WHERE url = ?", (url,)
+            ).fetchone()
+
+    def validators(self, url: str) -> Dict[str, Optional[str]]:
+        """前回の ETag と Last-Modified（feedparser の etag / modified に渡す用）"""
+        entry = self._entry(url)
+        return {"etag": entry[0], "modified": entry[1]} if entry else {"etag": None, "modified": None}
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """条件付きリクエストのヘッダー"""
+        entry = self._entry(url)
+        headers = {}
+        if entry:
+            if entry[0]:
+                headers["If-None-Match"] = entry[0]
+            if entry[1]:
+                headers["If-Modified-Since"] = entry[1]
+        return headers
+
+    def meta(self, url: str) -> Optional[dict]:
+        """store で一緒に保存した情報（解析した件数など）"""
+        entry = self._entry(url)
+        return json.loads(entry[2]) if entry and entry[2] else None
+
+    def record(self, status_code: int):
+        """取得結果を hits / misses に数える"""
+        if status_code == 304:
+            self.hits += 1
+            self._hits_total.inc()
+        elif status_code == 200:
+            self.misses += 1
+            self._misses_total.inc()
+
+    def store(self, url: str, headers: Mapping[str, str], meta: Optional[dict] = None):
+        """応答の検証子を保存（ETag も Last-Modified も無ければ何もしない）"""
+        etag = headers.get("etag")
+        last_modified = headers.get("last-modified")
+        if not self.enabled or not (etag or last_modified):
+            return
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO http_cache (url, etag, last_modified, meta, stored_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, json.dumps(meta) if meta else None, time.time()),
+            )
+            connection.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class ScrapingClient:
+    """スクレイパー用の非同期 HTTP クライアント
+
+    httpx.AsyncClient の keep-alive 接続を使い回す。リクエストごとに
+    送信先ホストの同時接続数の上限と、rate_limiter があればレート制限を待つ。
+    cache があれば条件付きリクエストを送る（304 の応答もそのまま返す）。
+    async with で使う。
+    """
+
+    def __init__(self, rate_limiter: Optional[HostRateLimiter] = None,
+                 timeout: float = SCRAPER_TIMEOUT_SECONDS,
+                 host_connections: int = SCRAPER_HOST_CONNECTIONS,
+                 max_connections: int = SCRAPER_MAX_CONNECTIONS,
+                 cache: Optional[HttpCache] = None):
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.timeout = timeout
+        self.host_connections = max(1, host_connections)
+        self.max_connections = max(1, max_connections)
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def __aenter__(self) -> "ScrapingClient":
+        self._client = httpx.AsyncClient(
+            headers={'User-Agent': USER_AGENT},
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+            follow_redirects=True,
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._client.aclose()
+        self._client = None
+
+    def _host_semaphore(self, host: str) -> asyncio.Semaphore:
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.host_connections)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    async def get(self, url: str, params: Optional[dict] = None, **kwargs) -> httpx.Response:
+        if self.cache is not None:
+            full_url = str(httpx.URL(url, params=params))
+            kwargs["headers"] = {**self.cache.conditional_headers(full_url), **kwargs.get("headers", {})}
+        async with self._host_semaphore(urlsplit(url).netloc):
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(url)
+            response = await self._client.get(url, params=params, **kwargs)
+        if self.cache is not None:
+            self.cache.record(response.status_code)
+        return response
@@ -0,0 +1,212 @@
+import json
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from decouple import config
+from sqlalchemy import func, select, text, update
+from sqlalchemy.orm import Session
+
+from app.models.scraping_job import ScrapingJob
+
+# ソースごとに同時に実行するジョブ数の上限（全ワーカープロセスの合計）
+SCRAPING_JOB_CONCURRENCY = {
+    'hospitals': config("SCRAPING_HOSPITAL_JOB_CONCURRENCY", default=1, cast=int),
+    'news': config("SCRAPING_NEWS_JOB_CONCURRENCY", default=1, cast=int),
+}
+# 実行中のジョブの生存確認の間隔と、応答が途絶えたとみなすまでの時間（秒）
+SCRAPING_JOB_HEARTBEAT_SECONDS = config("SCRAPING_JOB_HEARTBEAT_SECONDS", default=10.0, cast=float)
+SCRAPING_JOB_STALE_SECONDS = config("SCRAPING_JOB_STALE_SECONDS", default=300.0, cast=float)
+
+JOB_STATUSES = ('queued', 'running', 'succeeded', 'failed', 'cancelled')
+FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled')
+
+# PostgreSQL で取得処理を直列化する advisory lock のキー
+_CLAIM_LOCK_KEY = 7311
+
+
+class JobCancelled(Exception):
+    """実行中のジョブが取り消された（進捗の報告時に送出）"""
+
+
+def _loads(value: Optional[str]):
+    return json.loads(value) if value else None
+
+
+def job_to_dict(job: ScrapingJob) -> Dict:
+    return {
+        'id': job.id,
+        'source': job.source,
+        'status': job.status,
+        'params': _loads(job.params) or {},
+        'progress': _loads(job.progress),
+        'result': _loads(job.result),
+        'error': job.error,
+        'cancel_requested': bool(job.cancel_requested),
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+class ScrapingJobService:
+    """スクレイピングジョブの登録・参照・取り消し（実行は app.worker が行う）"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def enqueue(self, source: str, params: Optional[Dict] = None) -> ScrapingJob:
+        """ジョブを実行待ちとして登録"""
+        if source not in SCRAPING_JOB_CONCURRENCY:
+            raise ValueError(f"不明なソースです: {source}")
+        job = ScrapingJob(
+            source=source,
+            status='queued',
+            params=json.dumps(params or {}, ensure_ascii=False),
+            cancel_requested=False,
+        )
+        self.db.add(job)
+        self.db.commit()
+        self.db.refresh(job)
+        return job
+
+    def get_job(self, job_id: int) -> Optional[ScrapingJob]:
+        return self.db.query(ScrapingJob).filter(ScrapingJob.id == job_id).first()
+
+    def list_jobs(self, status: Optional[str] = None, source: Optional[str] = None,
+                  limit: int = 50) -> List[ScrapingJob]:
+        query = self.db.query(ScrapingJob)
+        if status:
+            query = query.filter(ScrapingJob.status == status)
+        if source:
+            query = query.filter(ScrapingJob.source == source)
+        return query.order_by(ScrapingJob.id.desc()).limit(limit).all()
+
+    def cancel_job(self, job_id: int) -> Optional[ScrapingJob]:
+        """実行待ちなら即座に取り消し、実行中ならワーカーに取り消しを要求"""
+        now = datetime.utcnow()
+        self.db.execute(
+            update(ScrapingJob)
+            .where(ScrapingJob.id == job_id, ScrapingJob.status == 'queued')
+            .values(status='cancelled', cancel_requested=True, finished_at=now, updated_at=now)
+        )
+        self.db.execute(
+            update(ScrapingJob)
+            .where(ScrapingJob.id == job_id, ScrapingJob.status == 'running')
+            .values(cancel_requested=True, updated_at=now)
+        )
+        self.db.commit()
+        return self.get_job(job_id)
+
+
+# 以下はワーカープロセスから使う
+
+def claim_next_job(db: Session, worker_id: str) -> Optional[int]:
+    """実行できる最も古いジョブを running にして ID を返す（無ければ None）
+
+    ソースごとの実行中の件数は UPDATE の条件で数えるため、複数のワーカーが
+    同時に取得しても上限を超えない（PostgreSQL では advisory lock で直列化する）。
+    """
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _CLAIM_LOCK_KEY})
+
+        running_counts = dict(
+            db.query(ScrapingJob.source, func.count(ScrapingJob.id))
+            .filter(ScrapingJob.status == 'running')
+            .group_by(ScrapingJob.source)
+            .all()
+        )
+        available = [
+            source for source, limit in SCRAPING_JOB_CONCURRENCY.items()
+            if running_counts.get(source, 0) < limit
+        ]
+        if not available:
+            db.rollback()
+            return None
+
+        candidate = db.query(ScrapingJob.id, ScrapingJob.source).filter(
+            ScrapingJob.status == 'queued',
+            ScrapingJob.source.in_(available)
+        ).order_by(ScrapingJob.id).first()
+        if candidate is None:
+            db.rollback()
+            return None
+
+        job_id, source = candidate
+        running = select(func.count(ScrapingJob.id)).where(
+            ScrapingJob.status == 'running', ScrapingJob.source == source
+        ).scalar_subquery()
+        now = datetime.utcnow()
+        claimed = db.execute(
+            update(ScrapingJob)
+            .where(
+                ScrapingJob.id == job_id,
+                ScrapingJob.status == 'queued',
+                running < SCRAPING_JOB_CONCURRENCY[source]
+            )
+            .values(status='running', worker_id=worker_id, started_at=now,
+                    heartbeat_at=now, updated_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        return job_id if claimed else None
+    except Exception:
+        db.rollback()
+        raise
+
+
+def record_heartbeat(db: Session, job_id: int, progress: Optional[Dict] = None) -> bool:
+    """生存確認（と進捗）を記録し、取り消しが要求されていれば True を返す"""
+    now = datetime.utcnow()
+    values = {'heartbeat_at': now, 'updated_at': now}
+    if progress is not None:
+        values['progress'] = json.dumps(progress, ensure_ascii=False, default=str)
+    db.execute(
+        update(ScrapingJob)
+        .where(ScrapingJob.id == job_id, ScrapingJob.status == 'running')
+        .values(**values)
+    )
+    cancel_requested = db.query(ScrapingJob.cancel_requested).filter(
+        ScrapingJob.id == job_id
+    ).scalar()
+    db.commit()
+    return bool(cancel_requested)
+
+
+def finish_job(db: Session, job_id: int, worker_id: str, status: str,
+               result: Optional[Dict] = None, error: Optional[str] = None):
+    """実行を終えたジョブの状態を記録（別のワーカーに引き継がれていれば何もしない）"""
+    now = datetime.utcnow()
+    db.execute(
+        update(ScrapingJob)
+        .where(
+            ScrapingJob.id == job_id,
+            ScrapingJob.status == 'running',
+            ScrapingJob.worker_id == worker_id
+        )
+        .values(
+            status=status,
+            result=json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+            error=error,
+            finished_at=now,
+            updated_at=now,
+        )
+    )
+    db.commit()
+
+
+def fail_stale_jobs(db: Session) -> int:
+    """生存確認が SCRAPING_JOB_STALE_SECONDS 以上途絶えた実行中のジョブを失敗にする"""
+    now = datetime.utcnow()
+    failed = db.execute(
+        update(ScrapingJob)
+        .where(
+            ScrapingJob.status == 'running',
+            ScrapingJob.heartbeat_at < now - timedelta(seconds=SCRAPING_JOB_STALE_SECONDS)
+        )
+        .values(status='failed', error='ワーカーからの応答が途絶えました',
+                finished_at=now, updated_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return failed
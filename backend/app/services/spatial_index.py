@@ -0,0 +1,254 @@
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from decouple import config
+from app.models.hospital import Hospital
+from app.services.distance_engine import DistanceEngine, EARTH_RADIUS_KM
+from app.services.opening_hours import (
+    HOURS_COLUMN_NAMES, WeeklySchedule, schedule_cache, week_slot
+)
+
+HALF_CIRCUMFERENCE_KM = math.pi * EARTH_RADIUS_KM
+
+# 他プロセスでの更新を取り込むためのインデックス有効期限（秒）
+INDEX_TTL_SECONDS = config("HOSPITAL_INDEX_TTL_SECONDS", default=300, cast=int)
+# 他プロセス（スクレイピングのワーカーなど）での更新を確認する間隔（秒）
+INDEX_CHECK_SECONDS = config("HOSPITAL_INDEX_CHECK_SECONDS", default=5, cast=float)
+
+
+class HospitalSpatialIndex:
+    """病院座標のグリッド型空間インデックス
+
+    緯度経度を cell_size_deg 度四方のセルに分割し、検索時は検索円を
+    包含するバウンディングボックス内のセルだけを走査する。座標はセル順に
+    並べて DistanceEngine に格納し、候補セルの区間をまとめて距離計算する。
+    営業時間（WeeklySchedule）も構築時に作成し、営業中フィルターに使う。
+    """
+
+    def __init__(self, cell_size_deg: float = 0.1):
+        self.cell_size_deg = cell_size_deg
+        self._lat_cells = int(math.ceil(180 / cell_size_deg))
+        self._lon_cells = int(math.ceil(360 / cell_size_deg))
+        self._cells: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        self._engine = DistanceEngine([], [], [])
+        self._schedules: Dict[int, WeeklySchedule] = {}
+        self._built_at: Optional[float] = None
+        self._checked_at: Optional[float] = None
+        self._signature: Optional[Tuple] = None
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._engine)
+
+    def build(self, points: List[Tuple[int, float, float]],
+              schedules: Optional[Dict[int, WeeklySchedule]] = None,
+              signature: Optional[Tuple] = None):
+        """(id, 緯度, 経度) のリストと病院ごとの営業時間からインデックスを構築
+
+        signature は構築元の病院テーブルの状態（data_signature）で、
+        ensure_built で他プロセスによる更新を検出するのに使う。
+        """
+        keyed_points = sorted(
+            (self._cell_key(latitude, longitude), hospital_id, latitude, longitude)
+            for hospital_id, latitude, longitude in points
+        )
+
+        # 同じセルの病院が連続する区間 [start, end) を記録
+        cells: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        for position, (key, _, _, _) in enumerate(keyed_points):
+            start, _ = cells.get(key, (position, position))
+            cells[key] = (start, position + 1)
+
+        engine = DistanceEngine(
+            [point[1] for point in keyed_points],
+            [point[2] for point in keyed_points],
+            [point[3] for point in keyed_points]
+        )
+
+        with self._lock:
+            self._cells = cells
+            self._engine = engine
+            self._schedules = schedules or {}
+            self._built_at = time.monotonic()
+            self._checked_at = self._built_at
+            self._signature = signature
+            self._stale = False
+
+    def rebuild(self, db: Session):
+        """データベースの病院座標からインデックスを再構築"""
+        # 読み込み中の更新を取りこぼさないよう、状態は座標より先に取得する
+        signature = self.data_signature(db)
+        hours_columns = [getattr(Hospital, name) for name in HOURS_COLUMN_NAMES]
+        rows = db.query(
+            Hospital.id, Hospital.latitude, Hospital.longitude, Hospital.updated_at,
+            *hours_columns
+        ).filter(
+            Hospital.is_active == True,
+            Hospital.latitude.isnot(None),
+            Hospital.longitude.isnot(None)
+        ).all()
+
+        schedules = {}
+        for row in rows:
+            schedule = WeeklySchedule.from_hospital(row)
+            schedule_cache.put(row.id, row.updated_at, schedule)
+            schedules[row.id] = schedule
+
+        self.build([(row.id, row.latitude, row.longitude) for row in rows], schedules, signature)
+
+    @staticmethod
+    def data_signature(db: Session) -> Tuple:
+        """病院テーブルの件数と最終更新日時（追加・更新・削除の検出用）"""
+        count, updated_at = db.query(func.count(Hospital.id), func.max(Hospital.updated_at)).one()
+        return count, updated_at
+
+    def invalidate(self):
+        """次回検索時に再構築させる"""
+        self._stale = True
+
+    def ensure_built(self, db: Session):
+        """未構築・無効化済み・期限切れ・他プロセスで更新済みの場合に再構築
+
+        インデックスはプロセスごとに持つため、スクレイピングのワーカーが
+        病院を更新しても API プロセスには通知されない。INDEX_CHECK_SECONDS
+        ごとに病院テーブルの件数と最終更新日時を確認し、変わっていれば再構築する。
+        """
+        now = time.monotonic()
+        expired = self._built_at is None or now - self._built_at > INDEX_TTL_SECONDS
+        if self._stale or expired:
+            self.rebuild(db)
+            return
+        if self._signature is None or now - self._checked_at < INDEX_CHECK_SECONDS:
+            return
+        self._checked_at = now
+        if self.data_signature(db) != self._signature:
+            self.rebuild(db)
+
+    def query_radius(self, latitude: float, longitude: float,
+                     distance_km: float) -> List[Tuple[int, float]]:
+        """指定半径内の病院を (id, 距離) の距離順リストで返す"""
+        with self._lock:
+            cells, engine = self._cells, self._engine
+        ranges = self._candidate_ranges(cells, latitude, longitude, distance_km)
+        positions = engine.positions_from_ranges(ranges)
+        return engine.within(latitude, longitude, distance_km, positions)
+
+    def filter_open(self, candidates: Iterable[Tuple[int, float]],
+                    at: datetime) -> Iterator[Tuple[int, float]]:
+        """候補のうち指定日時に営業中の病院だけを返す
+
+        ビット演算で絞り込み、ビットの立っている病院だけ営業時間と比べて確認する。
+        """
+        slot = week_slot(at)
+        schedules = self._schedules
+        for hospital_id, distance in candidates:
+            schedule = schedules.get(hospital_id)
+            if schedule is not None and (schedule.mask >> slot) & 1 and schedule.is_open_exactly(at):
+                yield hospital_id, distance
+
+    def iter_nearest(self, latitude: float, longitude: float) -> Iterator[Tuple[int, float]]:
+        """近い順に (id, 距離) を返すイテレータ
+
+        検索半径を倍々に広げ、各段階で新たに半径内に入った病院だけを返す。
+        """
+        radius = max(self.cell_size_deg * 111.0, 1.0)
+        previous_radius = -1.0
+        while True:
+            for hospital_id, distance in self.query_radius(latitude, longitude, radius):
+                if distance > previous_radius:
+                    yield hospital_id, distance
+            if radius >= HALF_CIRCUMFERENCE_KM:
+                return
+            previous_radius = radius
+            radius = min(radius * 2, HALF_CIRCUMFERENCE_KM)
+
+    def query_nearest(self, latitude: float, longitude: float, k: int,
+                      max_distance_km: Optional[float] = None) -> List[Tuple[int, float]]:
+        """最も近い k 件の病院を (id, 距離) の距離順リストで返す"""
+        results = []
+        for hospital_id, distance in self.iter_nearest(latitude, longitude):
+            if len(results) >= k or (max_distance_km is not None and distance > max_distance_km):
+                break
+            results.append((hospital_id, distance))
+        return results
+
+    def _cell_key(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        """座標が属するセルのキーを取得"""
+        lat_index = min(int((latitude + 90) // self.cell_size_deg), self._lat_cells - 1)
+        lon_index = int((longitude + 180) // self.cell_size_deg) % self._lon_cells
+        return lat_index, lon_index
+
+    def _candidate_ranges(self, cells: Dict[Tuple[int, int], Tuple[int, int]],
+                          latitude: float, longitude: float,
+                          distance_km: float) -> List[Tuple[int, int]]:
+        """検索円を包含するセルの位置区間を列挙"""
+        lat_range, lon_ranges = self._bounding_cells(latitude, longitude, distance_km)
+        lat_count = lat_range[1] - lat_range[0] + 1
+        lon_count = sum(end - start + 1 for start, end in lon_ranges)
+
+        if lat_count * lon_count > len(cells):
+            # 走査範囲が広い場合は空でないセルだけを確認する
+            return sorted(
+                span for (lat_index, lon_index), span in cells.items()
+                if lat_range[0] <= lat_index <= lat_range[1]
+                and any(start <= lon_index <= end for start, end in lon_ranges)
+            )
+
+        ranges = []
+        for lat_index in range(lat_range[0], lat_range[1] + 1):
+            for start, end in lon_ranges:
+                for lon_index in range(start, end + 1):
+                    span = cells.get((lat_index, lon_index))
+                    if span:
+                        ranges.append(span)
+        return ranges
+
+    def _bounding_cells(self, latitude: float, longitude: float,
+                        distance_km: float) -> Tuple[Tuple[int, int], List[Tuple[int, int]]]:
+        """検索円のバウンディングボックスをセル番号の範囲に変換
+
+        球面上のバウンディングボックスは Matuschek の方法で求める。
+        極を含む場合は経度方向を全周とする。
+        """
+        angular_radius = distance_km / EARTH_RADIUS_KM + 1e-9
+        lat_rad = math.radians(latitude)
+        min_lat = lat_rad - angular_radius
+        max_lat = lat_rad + angular_radius
+
+        full_lon = [(0, self._lon_cells - 1)]
+        if min_lat > -math.pi / 2 and max_lat < math.pi / 2:
+            ratio = min(1.0, math.sin(angular_radius) / math.cos(lat_rad))
+            delta_lon = math.degrees(math.asin(ratio)) + 1e-9
+            if delta_lon >= 180:
+                lon_ranges = full_lon
+            else:
+                start = int((longitude - delta_lon + 180) // self.cell_size_deg)
+                end = int((longitude + delta_lon + 180) // self.cell_size_deg)
+                if end - start + 1 >= self._lon_cells:
+                    lon_ranges = full_lon
+                elif start < 0:
+                    # 日付変更線をまたぐ場合は2区間に分割
+                    lon_ranges = [(0, end), (start % self._lon_cells, self._lon_cells - 1)]
+                elif end >= self._lon_cells:
+                    lon_ranges = [(start, self._lon_cells - 1), (0, end % self._lon_cells)]
+                else:
+                    lon_ranges = [(start, end)]
+        else:
+            lon_ranges = full_lon
+
+        min_lat_deg = max(math.degrees(min_lat), -90.0)
+        max_lat_deg = min(math.degrees(max_lat), 90.0)
+        lat_range = (
+            max(int((min_lat_deg + 90) // self.cell_size_deg), 0),
+            min(int((max_lat_deg + 90) // self.cell_size_deg), self._lat_cells - 1)
+        )
+        return lat_range, lon_ranges
+
+
+# プロセス内で共有する病院インデックス
+hospital_index = HospitalSpatialIndex()
@@ -0,0 +1,240 @@
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
+from decouple import config
+from app.models.symptom import Symptom, UserSymptom
+from app.services.symptom_search import normalize_text
+
+# 他プロセスでの更新（人気度を含む）を取り込むための有効期限（秒）
+AUTOCOMPLETE_TTL_SECONDS = config("SYMPTOM_AUTOCOMPLETE_TTL_SECONDS", default=300, cast=int)
+
+NODE_TOP_K = 20  # 各ノードに保持する上位候補数
+COMMON_TOP_N = 10  # 人気上位何件を「よくある症状」とするか
+
+
+class SuggestionEntry:
+    """候補として返す症状の情報"""
+
+    __slots__ = ("id", "name", "category", "description", "popularity")
+
+    def __init__(self, symptom_id: int, name: str, category: str,
+                 description: Optional[str], popularity: int = 0):
+        self.id = symptom_id
+        self.name = name
+        self.category = category
+        self.description = description
+        self.popularity = popularity
+
+    def rank_key(self) -> Tuple[int, int, int]:
+        """人気度が高い順、同率なら名前が短い順"""
+        return (-self.popularity, len(self.name), self.id)
+
+
+class TrieNode:
+    __slots__ = ("children", "symptom_ids", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "TrieNode"] = {}
+        self.symptom_ids = set()  # このノードで終わるキーを持つ症状
+        self.top: List[int] = []  # 部分木の上位候補（rank_key 順）
+
+
+class SymptomAutocomplete:
+    """症状名・読み・同義語の前方一致トライ
+
+    各ノードに部分木内の人気上位 NODE_TOP_K 件を保持しておき、
+    入力された接頭辞のノードまで辿るだけで候補を返す。
+    """
+
+    def __init__(self):
+        self._root = TrieNode()
+        self._entries: Dict[int, SuggestionEntry] = {}
+        self._keys: Dict[int, List[str]] = {}
+        self._built_at: Optional[float] = None
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def build(self, entries: List[Tuple[SuggestionEntry, List[str]]]):
+        """(候補, 検索キーのリスト) からトライを構築"""
+        root = TrieNode()
+        entry_map = {entry.id: entry for entry, _ in entries}
+        key_map = {}
+        for entry, keys in entries:
+            key_map[entry.id] = self._normalize_keys(entry.name, keys)
+            for key in key_map[entry.id]:
+                self._insert_key(root, key, entry.id)
+
+        self._fill_top(root, entry_map)
+
+        with self._lock:
+            self._root = root
+            self._entries = entry_map
+            self._keys = key_map
+            self._built_at = time.monotonic()
+            self._stale = False
+
+    def rebuild(self, db: Session):
+        """有効な症状と別名、UserSymptom の件数からトライを再構築"""
+        symptoms = db.query(Symptom).options(
+            selectinload(Symptom.aliases)
+        ).filter(Symptom.is_active == True).all()
+
+        popularity = dict(
+            db.query(UserSymptom.symptom_id, func.count(UserSymptom.id))
+            .group_by(UserSymptom.symptom_id)
+            .all()
+        )
+
+        self.build([
+            (
+                SuggestionEntry(
+                    symptom.id, symptom.name, symptom.category,
+                    symptom.description, popularity.get(symptom.id, 0)
+                ),
+                [alias.alias for alias in symptom.aliases]
+            )
+            for symptom in symptoms
+        ])
+
+    def invalidate(self):
+        """次回検索時に再構築させる"""
+        self._stale = True
+
+    def ensure_built(self, db: Session):
+        """未構築・無効化済み・期限切れの場合に再構築"""
+        expired = (
+            self._built_at is None
+            or time.monotonic() - self._built_at > AUTOCOMPLETE_TTL_SECONDS
+        )
+        if self._stale or expired:
+            self.rebuild(db)
+
+    def add_symptom(self, symptom: Symptom, aliases: List[str]):
+        """症状を1件追加（create_symptom 用の差分更新）"""
+        if symptom.is_active is False:
+            return
+        entry = SuggestionEntry(symptom.id, symptom.name, symptom.category, symptom.description)
+        keys = self._normalize_keys(symptom.name, aliases)
+
+        with self._lock:
+            self._entries[entry.id] = entry
+            self._keys[entry.id] = keys
+            for key in keys:
+                for node in self._insert_key(self._root, key, entry.id):
+                    self._promote(node, entry.id)
+
+    def record_usage(self, symptom_ids: Iterable[int], removed_ids: Iterable[int] = ()):
+        """症状の記録に合わせて人気度を増減し、経路上の上位候補を更新
+
+        removed_ids は記録し直しで削除された UserSymptom の症状（人気度を減らす）。
+        """
+        changes = Counter(symptom_ids)
+        changes.subtract(removed_ids)
+        with self._lock:
+            for symptom_id, change in changes.items():
+                entry = self._entries.get(symptom_id)
+                if entry is None or change == 0:
+                    continue
+                entry.popularity = max(0, entry.popularity + change)
+                for key in self._keys.get(symptom_id, []):
+                    for node in self._path(key):
+                        self._promote(node, symptom_id, decreased=change < 0)
+
+    def suggest(self, prefix: str, limit: int = 10,
+                category: Optional[str] = None) -> List[SuggestionEntry]:
+        """接頭辞に一致する症状を人気順に返す"""
+        node = self._root
+        for char in normalize_text(prefix):
+            node = node.children.get(char)
+            if node is None:
+                return []
+
+        entries = self._entries
+        candidates = [entries[symptom_id] for symptom_id in node.top if symptom_id in entries]
+        if category:
+            candidates = [entry for entry in candidates if entry.category == category]
+            if len(candidates) < limit and len(node.top) >= NODE_TOP_K:
+                # 上位候補だけでは足りない場合は部分木を走査する
+                candidates = sorted(
+                    (entries[symptom_id] for symptom_id in self._collect(node)
+                     if symptom_id in entries and entries[symptom_id].category == category),
+                    key=lambda entry: entry.rank_key()
+                )
+        return candidates[:limit]
+
+    def is_common(self, symptom_id: int) -> bool:
+        """人気上位の症状か"""
+        entry = self._entries.get(symptom_id)
+        if entry is None or entry.popularity <= 0:
+            return False
+        return symptom_id in self._root.top[:COMMON_TOP_N]
+
+    def _normalize_keys(self, name: str, aliases: List[str]) -> List[str]:
+        keys = {normalize_text(name)}
+        keys.update(normalize_text(alias) for alias in aliases)
+        keys.discard("")
+        return sorted(keys)
+
+    def _insert_key(self, root: TrieNode, key: str, symptom_id: int) -> List[TrieNode]:
+        """キーを挿入し、経路上のノード（根を含む）を返す"""
+        node = root
+        path = [node]
+        for char in key:
+            node = node.children.setdefault(char, TrieNode())
+            path.append(node)
+        node.symptom_ids.add(symptom_id)
+        return path
+
+    def _path(self, key: str) -> List[TrieNode]:
+        node = self._root
+        path = [node]
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                break
+            path.append(node)
+        return path
+
+    def _promote(self, node: TrieNode, symptom_id: int, decreased: bool = False):
+        """人気度が変わった（または追加された）症状をノードの上位候補に反映
+
+        suggest はロックを取らずに node.top を読むため、新しいリストを作ってから
+        1回の代入で差し替える。
+        """
+        entries = self._entries
+        top = node.top
+        if decreased:
+            if symptom_id not in top:
+                return
+            if len(top) >= NODE_TOP_K:
+                # 下がった症状の代わりに上位外の症状が入りうるため部分木から数え直す
+                top = self._collect(node)
+        candidates = set(top)
+        candidates.add(symptom_id)
+        node.top = sorted(
+            (i for i in candidates if i in entries), key=lambda i: entries[i].rank_key()
+        )[:NODE_TOP_K]
+
+    def _fill_top(self, node: TrieNode, entries: Dict[int, SuggestionEntry]) -> List[int]:
+        """部分木の上位候補を帰りがけ順に計算"""
+        candidates = set(node.symptom_ids)
+        for child in node.children.values():
+            candidates.update(self._fill_top(child, entries))
+        node.top = sorted(candidates, key=lambda i: entries[i].rank_key())[:NODE_TOP_K]
+        return node.top
+
+    def _collect(self, node: TrieNode) -> set:
+        symptom_ids = set(node.symptom_ids)
+        for child in node.children.values():
+            symptom_ids.update(self._collect(child))
+        return symptom_ids
+
+
+# プロセス内で共有する症状オートコンプリート
+symptom_autocomplete = SymptomAutocomplete()
@@ -0,0 +1,276 @@
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session, selectinload
+from decouple import config
+from app.models.symptom import Symptom
+from app.services.keyword_matcher import KeywordAutomaton
+
+# 他プロセスでの更新を取り込むためのインデックス有効期限（秒）
+INDEX_TTL_SECONDS = config("SYMPTOM_INDEX_TTL_SECONDS", default=300, cast=int)
+
+# 検索対象フィールドと一致時の基礎スコア（名前 > 読み・同義語 > 説明 > 主な原因）
+FIELD_WEIGHTS = {
+    "name": 60,
+    "aliases": 50,
+    "description": 30,
+    "common_causes": 20,
+}
+EXACT_MATCH_BONUS = 40
+PREFIX_MATCH_BONUS = 20
+
+KATAKANA_START = ord("ァ")
+KATAKANA_END = ord("ヶ")
+KANA_OFFSET = ord("ァ") - ord("ぁ")
+
+
+def normalize_text(value: Optional[str]) -> str:
+    """検索用に文字列を正規化
+
+    NFKC 正規化（全角英数・半角カナの統一）、小文字化、カタカナのひらがな化を
+    行い、空白を取り除く。
+    """
+    if not value:
+        return ""
+    normalized = unicodedata.normalize("NFKC", value).lower()
+    chars = []
+    for char in normalized:
+        code = ord(char)
+        if KATAKANA_START <= code <= KATAKANA_END:
+            chars.append(chr(code - KANA_OFFSET))
+        elif not char.isspace():
+            chars.append(char)
+    return "".join(chars)
+
+
+def text_grams(value: str) -> Set[str]:
+    """正規化済み文字列の1文字・2文字 n-gram を取得"""
+    grams = set(value)
+    grams.update(value[i:i + 2] for i in range(len(value) - 1))
+    return grams
+
+
+def query_grams(value: str) -> Set[str]:
+    """検索語の n-gram を取得（2文字以上なら bigram のみ）"""
+    if len(value) <= 1:
+        return set(value)
+    return {value[i:i + 2] for i in range(len(value) - 1)}
+
+
+class SymptomDocument:
+    """インデックスに格納する症状の情報"""
+
+    __slots__ = ("id", "name", "category", "description", "fields")
+
+    def __init__(self, symptom_id: int, name: str, category: str,
+                 description: Optional[str], common_causes: Optional[str],
+                 aliases: Optional[List[str]] = None):
+        self.id = symptom_id
+        self.name = name
+        self.category = category
+        self.description = description
+        self.fields = {
+            "name": normalize_text(name),
+            # 別名同士が連結して誤一致しないよう区切り文字を挟む
+            "aliases": "\n".join(normalize_text(alias) for alias in aliases or []),
+            "description": normalize_text(description),
+            "common_causes": normalize_text(common_causes),
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "category": self.category,
+            "description": self.description
+        }
+
+
+class SymptomSearchIndex:
+    """症状の名前・説明・主な原因に対する n-gram 転置インデックス
+
+    検索語の全 bigram を含む症状を転置リストの積集合で絞り込み、
+    正規化済みテキストでの部分一致を確認してから一致の質で順位付けする。
+    """
+
+    def __init__(self):
+        self._documents: Dict[int, SymptomDocument] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._mentions: Optional[KeywordAutomaton] = None
+        self._built_at: Optional[float] = None
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def build(self, documents: List[SymptomDocument]):
+        """症状ドキュメントからインデックスを構築"""
+        postings: Dict[str, Set[int]] = {}
+        for document in documents:
+            for gram in self._document_grams(document):
+                postings.setdefault(gram, set()).add(document.id)
+
+        with self._lock:
+            self._documents = {document.id: document for document in documents}
+            self._postings = postings
+            self._mentions = None
+            self._built_at = time.monotonic()
+            self._stale = False
+
+    def rebuild(self, db: Session):
+        """データベースの有効な症状からインデックスを再構築"""
+        symptoms = db.query(Symptom).options(
+            selectinload(Symptom.aliases)
+        ).filter(Symptom.is_active == True).all()
+        self.build([
+            self._to_document(symptom, [alias.alias for alias in symptom.aliases])
+            for symptom in symptoms
+        ])
+
+    def invalidate(self):
+        """次回検索時に再構築させる"""
+        self._stale = True
+
+    def ensure_built(self, db: Session):
+        """未構築・無効化済み・期限切れの場合に再構築"""
+        expired = (
+            self._built_at is None
+            or time.monotonic() - self._built_at > INDEX_TTL_SECONDS
+        )
+        if self._stale or expired:
+            self.rebuild(db)
+
+    def add(self, symptom: Symptom, aliases: Optional[List[str]] = None):
+        """症状を1件追加（create_symptom 用の差分更新）"""
+        if symptom.is_active is False:
+            return
+        document = self._to_document(symptom, aliases)
+        with self._lock:
+            self._documents[document.id] = document
+            for gram in self._document_grams(document):
+                self._postings.setdefault(gram, set()).add(document.id)
+            self._mentions = None
+
+    def get(self, symptom_id: int) -> Optional[SymptomDocument]:
+        return self._documents.get(symptom_id)
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[SymptomDocument, int]]:
+        """検索語に一致する症状を (ドキュメント, スコア) のスコア順リストで返す"""
+        normalized = normalize_text(query)
+        documents = self._documents
+
+        if not normalized:
+            results = [(document, 0) for document in documents.values()]
+            results.sort(key=lambda x: x[0].id)
+            return results[:limit] if limit else results
+
+        # 転置リストの短い順に積集合を取り候補を絞り込む
+        postings = self._postings
+        gram_postings = sorted(
+            (postings.get(gram, set()) for gram in query_grams(normalized)),
+            key=len
+        )
+        candidates = set(gram_postings[0]) if gram_postings else set()
+        for posting in gram_postings[1:]:
+            candidates &= posting
+            if not candidates:
+                break
+
+        results = []
+        for symptom_id in candidates:
+            document = documents.get(symptom_id)
+            if document is None:
+                continue
+            score = self._score(document, normalized)
+            if score:
+                results.append((document, score))
+
+        results.sort(key=lambda x: (-x[1], len(x[0].name), x[0].id))
+        return results[:limit] if limit else results
+
+    def find_mentions(self, text: str) -> Set[int]:
+        """自由記述の中に名前・読み・同義語が現れる症状のIDを返す"""
+        automaton = self._mentions
+        if automaton is None:
+            automaton = self._build_mentions()
+        return automaton.find(normalize_text(text))
+
+    def _build_mentions(self) -> KeywordAutomaton:
+        """症状名と別名のオートマトンを作成（構築・追加後の初回照合時）"""
+        automaton = KeywordAutomaton()
+        for document in list(self._documents.values()):
+            automaton.add(document.fields["name"], document.id)
+            for alias in document.fields["aliases"].split("\n"):
+                automaton.add(alias, document.id)
+        automaton.compile()
+        self._mentions = automaton
+        return automaton
+
+    def _score(self, document: SymptomDocument, normalized_query: str) -> int:
+        """一致したフィールドと位置からスコアを計算（不一致は 0）"""
+        best = 0
+        for field, weight in FIELD_WEIGHTS.items():
+            value = document.fields[field]
+            position = value.find(normalized_query)
+            if position < 0:
+                continue
+            score = weight
+            if field == "aliases":
+                # 別名は行単位で完全一致・前方一致を判定する
+                lines = value.split("\n")
+                exact = normalized_query in lines
+                prefix = any(line.startswith(normalized_query) for line in lines)
+            else:
+                exact = value == normalized_query
+                prefix = position == 0
+            if exact:
+                score += EXACT_MATCH_BONUS
+            elif prefix:
+                score += PREFIX_MATCH_BONUS
+            else:
+                score -= min(position, weight // 2)
+            best = max(best, score)
+        return best
+
+    def _document_grams(self, document: SymptomDocument) -> Set[str]:
+        grams = set()
+        for value in document.fields.values():
+            grams.update(text_grams(value))
+        return grams
+
+    def _to_document(self, symptom: Symptom,
+                     aliases: Optional[List[str]] = None) -> SymptomDocument:
+        return SymptomDocument(
+            symptom.id, symptom.name, symptom.category,
+            symptom.description, symptom.common_causes, aliases
+        )
+
+
+def create_trigram_indexes(bind):
+    """PostgreSQL の場合に pg_trgm の GIN インデックスを作成（任意）
+
+    アプリ内の検索はメモリ上のインデックスで行うが、SQL から直接 ILIKE
+    検索する場合に備えて作成しておく。
+    """
+    if bind.dialect.name != "postgresql":
+        return
+
+    statements = [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS ix_symptoms_name_trgm "
+        "ON symptoms USING gin (name gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_symptoms_description_trgm "
+        "ON symptoms USING gin (description gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_symptoms_common_causes_trgm "
+        "ON symptoms USING gin (common_causes gin_trgm_ops)",
+    ]
+    with bind.begin() as connection:
+        for statement in statements:
+            connection.execute(text(statement))
+
+
+# プロセス内で共有する症状検索インデックス
+symptom_search_index = SymptomSearchIndex()
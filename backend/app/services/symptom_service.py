@@ -1,8 +1,11 @@
 from typing import List, Optional
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
-from app.models.symptom import Symptom, UserSymptom
+from app.models.symptom import Symptom, UserSymptom, SymptomAlias
 from app.models.user import User
+from app.services.symptom_search import symptom_search_index
+from app.services.symptom_autocomplete import symptom_autocomplete
+from app.response_cache import response_cache
 
 class SymptomService:
     def __init__(self, db: Session):
@@ -15,6 +18,7 @@ class SymptomService:
             query = query.filter(Symptom.category == category)
         return query.all()
 
+    @response_cache.cached_query("symptoms")
     def get_symptom_categories(self) -> List[str]:
         """症状カテゴリ一覧を取得"""
         categories = self.db.query(Symptom.category).filter(
@@ -23,32 +27,58 @@ class SymptomService:
         return [category[0] for category in categories]
 
     def search_symptoms(self, query: str) -> List[Symptom]:
-        """症状を検索"""
-        return self.db.query(Symptom).filter(
-            Symptom.is_active == True,
-            Symptom.name.ilike(f"%{query}%")
+        """症状を検索（一致の質が高い順）"""
+        symptom_search_index.ensure_built(self.db)
+        ranked_ids = [document.id for document, _ in symptom_search_index.search(query)]
+        if not ranked_ids:
+            return []
+        
+        symptoms = self.db.query(Symptom).filter(
+            Symptom.id.in_(ranked_ids),
+            Symptom.is_active == True
         ).all()
+        rank = {symptom_id: i for i, symptom_id in enumerate(ranked_ids)}
+        return sorted(symptoms, key=lambda symptom: rank[symptom.id])
 
-    def get_symptom_suggestions(self, partial_name: str) -> List[dict]:
-        """症状候補を取得"""
-        symptoms = self.db.query(Symptom).filter(
-            Symptom.is_active == True,
-            Symptom.name.ilike(f"%{partial_name}%")
-        ).limit(10).all()
+    def get_symptom_suggestions(self, partial_name: str, category: Optional[str] = None,
+                                limit: int = 10) -> List[dict]:
+        """症状候補を取得（メモリ上のトライと検索インデックスから返す）"""
+        symptom_autocomplete.ensure_built(self.db)
         
-        return [
+        # 名前・読み・同義語の前方一致を人気順に
+        suggestions = [
             {
-                "id": symptom.id,
-                "name": symptom.name,
-                "category": symptom.category,
-                "description": symptom.description
+                "id": entry.id,
+                "name": entry.name,
+                "category": entry.category,
+                "description": entry.description,
+                "common": symptom_autocomplete.is_common(entry.id)
             }
-            for symptom in symptoms
+            for entry in symptom_autocomplete.suggest(partial_name, limit, category)
         ]
+        
+        # 足りない分は部分一致で補う
+        if len(suggestions) < limit and partial_name:
+            symptom_search_index.ensure_built(self.db)
+            seen_ids = {suggestion["id"] for suggestion in suggestions}
+            for document, _ in symptom_search_index.search(partial_name):
+                if len(suggestions) >= limit:
+                    break
+                if document.id in seen_ids or (category and document.category != category):
+                    continue
+                suggestion = document.to_dict()
+                suggestion["common"] = symptom_autocomplete.is_common(document.id)
+                suggestions.append(suggestion)
+        
+        return suggestions
 
     def record_user_symptoms(self, user_id: int, symptoms_data: List[dict]) -> List[UserSymptom]:
         """ユーザーの症状を記録"""
-        # 既存のユーザー症状をクリア
+        # 既存のユーザー症状をクリア（人気度から差し引くため症状IDを控える）
+        removed_ids = [
+            symptom_id for (symptom_id,) in
+            self.db.query(UserSymptom.symptom_id).filter(UserSymptom.user_id == user_id)
+        ]
         self.db.query(UserSymptom).filter(UserSymptom.user_id == user_id).delete()
         
         user_symptoms = []
@@ -66,6 +96,13 @@ class SymptomService:
             user_symptoms.append(user_symptom)
         
         self.db.commit()
+        
+        # 候補の人気順に反映（件数の再集計はトライの再構築時に行う）
+        symptom_autocomplete.record_usage(
+            [data["symptom_id"] for data in symptoms_data], removed_ids
+        )
+        # 症状の一覧・カテゴリは変わらないため応答キャッシュは無効化しない
+        # （キャッシュ済みの候補の人気順は RESPONSE_CACHE_TTL_SECONDS 以内に反映）
         return user_symptoms
 
     def get_user_symptoms(self, user_id: int) -> List[UserSymptom]:
@@ -86,6 +123,18 @@ class SymptomService:
         )
         
         self.db.add(symptom)
+        self.db.flush()
+        
+        # 読み（よみがな）と同義語
+        aliases = []
+        for alias_type, key in (("reading", "readings"), ("synonym", "synonyms")):
+            for alias in symptom_data.get(key, []):
+                self.db.add(SymptomAlias(symptom_id=symptom.id, alias=alias, alias_type=alias_type))
+                aliases.append(alias)
+        
         self.db.commit()
         self.db.refresh(symptom)
+        symptom_search_index.add(symptom, aliases)
+        symptom_autocomplete.add_symptom(symptom, aliases)
+        response_cache.invalidate("symptoms")
         return symptom
\ No newline at end of file
@@ -2,15 +2,23 @@ from typing import Optional
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from app.models.user import User
-from app.auth.password import hash_password, verify_password
+from app.auth.password import hash_password, verify_and_update, verify_password
 from app.auth.jwt_handler import create_access_token
+from app.auth.principal import cache_profile, current_generation, get_cached_profile, invalidate_user
+
+# get_user_profile が返す項目
+PROFILE_FIELDS = (
+    "id", "email", "full_name", "phone_number", "birth_date", "gender", "address",
+    "emergency_contact_name", "emergency_contact_phone", "medical_history",
+    "allergies", "medications", "is_verified", "created_at", "updated_at"
+)
 
 class UserService:
     def __init__(self, db: Session):
         self.db = db
 
-    def create_user(self, user_data: dict) -> User:
-        """新しいユーザーを作成"""
+    def create_user(self, user_data: dict, hashed_password: Optional[str] = None) -> User:
+        """新しいユーザーを作成（ハッシュ化済みのパスワードがあればそれを使う）"""
         # メールアドレスの重複チェック
         existing_user = self.db.query(User).filter(User.email == user_data["email"]).first()
         if existing_user:
@@ -20,7 +28,8 @@ class UserService:
             )
         
         # パスワードをハッシュ化
-        hashed_password = hash_password(user_data["password"])
+        if hashed_password is None:
+            hashed_password = hash_password(user_data["password"])
         
         # ユーザーオブジェクトを作成
         user = User(
@@ -46,13 +55,23 @@ class UserService:
     def authenticate_user(self, email: str, password: str) -> Optional[User]:
         """ユーザー認証"""
         user = self.db.query(User).filter(User.email == email).first()
-        if not user or not verify_password(password, user.hashed_password):
+        if not user:
+            return None
+        verified, new_hash = verify_and_update(password, user.hashed_password)
+        if not verified:
             return None
+        if new_hash:
+            # bcrypt のコスト設定が変わっていれば新しいハッシュに置き換える
+            self.set_password_hash(user, new_hash)
         return user
 
     def login(self, email: str, password: str) -> dict:
         """ユーザーログイン"""
         user = self.authenticate_user(email, password)
+        return self.create_login_response(user)
+
+    def create_login_response(self, user: Optional[User]) -> dict:
+        """認証済みユーザーのアクセストークンを発行（user が None なら 401）"""
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -86,6 +105,20 @@ class UserService:
         """IDでユーザーを取得"""
         return self.db.query(User).filter(User.id == user_id).first()
 
+    def get_user_profile(self, user_id: int) -> Optional[dict]:
+        """プロフィールを取得（短時間キャッシュし、更新時に破棄）"""
+        profile = get_cached_profile(user_id)
+        if profile is not None:
+            return profile
+
+        generation = current_generation()
+        user = self.get_user_by_id(user_id)
+        if not user:
+            return None
+        profile = {field: getattr(user, field) for field in PROFILE_FIELDS}
+        cache_profile(user_id, profile, generation)
+        return profile
+
     def update_user(self, user_id: int, user_data: dict) -> User:
         """ユーザー情報を更新"""
         user = self.get_user_by_id(user_id)
@@ -107,6 +140,7 @@ class UserService:
                 setattr(user, field, user_data[field])
         
         self.db.commit()
+        invalidate_user(user.id)
         self.db.refresh(user)
         return user
 
@@ -125,8 +159,13 @@ class UserService:
                 detail="Incorrect current password"
             )
         
-        user.hashed_password = hash_password(new_password)
+        return self.set_password_hash(user, hash_password(new_password))
+
+    def set_password_hash(self, user: User, hashed_password: str) -> bool:
+        """ハッシュ化済みのパスワードを保存"""
+        user.hashed_password = hashed_password
         self.db.commit()
+        invalidate_user(user.id)
         return True
 
     def delete_user(self, user_id: int) -> bool:
@@ -141,4 +180,5 @@ class UserService:
         # ソフトデリート（is_active = False）
         user.is_active = False
         self.db.commit()
+        invalidate_user(user.id)
         return True
\ No newline at end of file
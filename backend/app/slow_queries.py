@@ -0,0 +1,242 @@
+import hashlib
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from decouple import config
+from sqlalchemy import event
+
+from app.metrics import Histogram
+
+# これを超えた SQL 文を遅いクエリとして数える（ミリ秒）
+SLOW_QUERY_THRESHOLD_MS = config("SLOW_QUERY_THRESHOLD_MS", default=100.0, cast=float)
+# 遅いクエリの実行計画（EXPLAIN、ANALYZE はしない）を取得するか
+SLOW_QUERY_EXPLAIN = config("SLOW_QUERY_EXPLAIN", default=False, cast=bool)
+# 同じフィンガープリントの EXPLAIN を取り直すまでの間隔（秒）
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS = config("SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS", default=300.0, cast=float)
+# 集計するフィンガープリントの上限（超えたら合計時間の最も短いものを捨てる）
+SLOW_QUERY_MAX_FINGERPRINTS = config("SLOW_QUERY_MAX_FINGERPRINTS", default=500, cast=int)
+
+# 1件の実行時間のバケット（秒）
+QUERY_SECONDS_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+# 保存しておく SQL 文の例の最大長
+SAMPLE_MAX_LENGTH = 2000
+
+ORDER_KEYS = ("total", "count", "mean", "p50", "p95", "max", "slow")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<![:\w]):\w+|\?")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_VALUES_ROWS = re.compile(r"(values\s*\(\?\+\))(?:\s*,\s*\(\?\+\))+", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """リテラル・パラメータ・IN の値の並びを ? にまとめた正規化済みの SQL 文
+
+    IN (?, ?, ?) や複数行の VALUES は件数に関係なく同じ形（(?+)）にする。
+    """
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _WHITESPACE.sub(" ", normalized).strip()
+    normalized = _VALUE_LIST.sub("(?+)", normalized)
+    normalized = _VALUES_ROWS.sub(r"\1", normalized)
+    return normalized
+
+
+def fingerprint_id(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+class QueryStats:
+    """フィンガープリントごとの実行回数・時間の集計"""
+
+    __slots__ = (
+        "fingerprint_id", "fingerprint", "sample", "count", "total", "max", "slow",
+        "histogram", "last_seen", "explain", "explained_at",
+    )
+
+    def __init__(self, normalized: str, sample: str):
+        self.fingerprint_id = fingerprint_id(normalized)
+        self.fingerprint = normalized
+        self.sample = sample[:SAMPLE_MAX_LENGTH]
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+        self.histogram = Histogram("query_seconds", "SQL文の実行時間", QUERY_SECONDS_BUCKETS)
+        self.last_seen = 0.0
+        self.explain: Optional[str] = None
+        self.explained_at = 0.0
+
+    def as_dict(self) -> Dict:
+        p50 = self.histogram.quantile(0.5)
+        p95 = self.histogram.quantile(0.95)
+        return {
+            "fingerprint_id": self.fingerprint_id,
+            "fingerprint": self.fingerprint,
+            "sample": self.sample,
+            "count": self.count,
+            "slow": self.slow,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else None,
+            # 分位点はバケット内の線形補間による推定値
+            "p50_ms": round(p50 * 1000, 3) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 3) if p95 is not None else None,
+            "max_ms": round(self.max * 1000, 3),
+            "last_seen": self.last_seen,
+            "explain": self.explain,
+        }
+
+    def sort_key(self, order_by: str) -> float:
+        if order_by == "count":
+            return self.count
+        if order_by == "mean":
+            return self.total / self.count if self.count else 0.0
+        if order_by == "p50":
+            return self.histogram.quantile(0.5) or 0.0
+        if order_by == "p95":
+            return self.histogram.quantile(0.95) or 0.0
+        if order_by == "max":
+            return self.max
+        if order_by == "slow":
+            return self.slow
+        return self.total
+
+
+class SlowQueryLog:
+    """SQL 文をフィンガープリントごとに集計し、遅いものの実行計画を取得する
+
+    エンジンの before / after_cursor_execute で実行時間を測る。しきい値を超えた
+    SELECT は、explain_engine が指定されていれば別スレッド・別の接続で EXPLAIN を
+    実行して結果を保存する（実行中のトランザクションには影響しない）。
+    """
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_THRESHOLD_MS,
+                 max_fingerprints: int = SLOW_QUERY_MAX_FINGERPRINTS,
+                 explain_interval_seconds: float = SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS):
+        self.threshold = threshold_ms / 1000
+        self.max_fingerprints = max(1, max_fingerprints)
+        self.explain_interval = explain_interval_seconds
+        self._stats: Dict[str, QueryStats] = {}
+        self._fingerprints: Dict[str, str] = {}  # SQL 文 -> 正規化済み（同じ文を毎回正規化しない）
+        self._lock = threading.Lock()
+        self._explain_engine = None
+        self._explainer: Optional[ThreadPoolExecutor] = None
+        self.started_at = time.time()
+
+    def install(self, target, explain: bool = False):
+        """エンジンに記録用のイベントを登録（explain=True なら同期エンジンで EXPLAIN を取る）"""
+        target = getattr(target, "sync_engine", target)
+        if not event.contains(target, "before_cursor_execute", self._before_cursor_execute):
+            event.listen(target, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(target, "after_cursor_execute", self._after_cursor_execute)
+            event.listen(target, "handle_error", self._handle_error)
+        if explain:
+            self._explain_engine = target
+            if self._explainer is None:
+                self._explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+    def _handle_error(self, exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("slow_query_started"):
+            connection.info["slow_query_started"].pop()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["slow_query_started"].pop()
+        if context is not None and context.execution_options.get("slow_query_ignore"):
+            return
+        stats = self.record(statement, elapsed)
+        if (
+            elapsed >= self.threshold
+            and self._explainer is not None
+            and not executemany
+            and conn.engine is self._explain_engine
+            and statement.lstrip()[:6].lower() in ("select", "with ")
+            and time.time() - stats.explained_at >= self.explain_interval
+        ):
+            stats.explained_at = time.time()
+            self._explainer.submit(self._explain, stats, statement, parameters)
+
+    def record(self, statement: str, elapsed: float) -> QueryStats:
+        """1件の実行時間を記録"""
+        normalized = self._fingerprints.get(statement)
+        if normalized is None:
+            normalized = fingerprint(statement)
+            if len(self._fingerprints) < self.max_fingerprints * 4:
+                self._fingerprints[statement] = normalized
+
+        with self._lock:
+            stats = self._stats.get(normalized)
+            if stats is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    evicted = min(self._stats.values(), key=lambda item: item.total)
+                    del self._stats[evicted.fingerprint]
+                stats = QueryStats(normalized, statement)
+                self._stats[normalized] = stats
+            stats.count += 1
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+            stats.last_seen = time.time()
+            if elapsed >= self.threshold:
+                stats.slow += 1
+        stats.histogram.observe(elapsed)
+        return stats
+
+    def _explain(self, stats: QueryStats, statement: str, parameters):
+        engine = self._explain_engine
+        prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+        try:
+            with engine.connect() as connection:
+                rows = connection.execution_options(slow_query_ignore=True).exec_driver_sql(
+                    prefix + statement, parameters
+                ).fetchall()
+                connection.rollback()
+            stats.explain = "\n".join(
+                " ".join(str(value) for value in row) for row in rows
+            )
+        except Exception as e:
+            stats.explain = f"EXPLAIN に失敗しました: {e}"
+
+    def top(self, limit: int = 20, order_by: str = "total") -> List[Dict]:
+        """order_by の降順で上位 limit 件"""
+        with self._lock:
+            items = list(self._stats.values())
+        items.sort(key=lambda item: item.sort_key(order_by), reverse=True)
+        return [item.as_dict() for item in items[:limit]]
+
+    def summary(self) -> Dict:
+        with self._lock:
+            items = list(self._stats.values())
+        return {
+            "since": self.started_at,
+            "threshold_ms": self.threshold * 1000,
+            "fingerprints": len(items),
+            "queries": sum(item.count for item in items),
+            "slow_queries": sum(item.slow for item in items),
+            "total_ms": round(sum(item.total for item in items) * 1000, 3),
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._fingerprints.clear()
+            self.started_at = time.time()
+
+    def shutdown(self):
+        if self._explainer is not None:
+            self._explainer.shutdown(wait=False)
+            self._explainer = None
+
+
+# プロセス内で共有する遅いクエリの記録
+slow_query_log = SlowQueryLog()
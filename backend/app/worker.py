@@ -0,0 +1,169 @@
+"""スクレイピングジョブのワーカー
+
+API（/api/v1/scraping/*）が登録したジョブを scraping_jobs テーブルから取り出して
+実行する。API サーバーとは別のプロセスとして起動し、各ワーカープロセスは自分の
+DB セッションを持つ。
+
+実行例（backend ディレクトリで）:
+    python -m app.worker --processes 2
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Dict, Optional
+
+from decouple import config
+
+from app.database import SessionLocal, create_tables
+from app.models.scraping_job import ScrapingJob
+from app.services.hospital_scraper import HospitalScraper
+from app.services.news_scraper import HealthNewsScraper
+from app.services.scraping_jobs import (
+    SCRAPING_JOB_HEARTBEAT_SECONDS, JobCancelled, claim_next_job, fail_stale_jobs, finish_job,
+    record_heartbeat
+)
+
+# 起動するワーカープロセス数と、実行待ちのジョブを探す間隔（秒）
+SCRAPING_WORKER_PROCESSES = config("SCRAPING_WORKER_PROCESSES", default=2, cast=int)
+SCRAPING_WORKER_POLL_SECONDS = config("SCRAPING_WORKER_POLL_SECONDS", default=2.0, cast=float)
+
+
+class JobReporter:
+    """実行中のジョブの進捗報告と取り消しの確認
+
+    別スレッドで SCRAPING_JOB_HEARTBEAT_SECONDS ごとに生存確認を記録し、取り消しが
+    要求されていればフラグを立てる。スクレイパーは区切りごとに report を呼び、
+    取り消されていれば JobCancelled が送出されて処理が打ち切られる。
+    """
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self.interval = SCRAPING_JOB_HEARTBEAT_SECONDS
+        self.cancelled = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._heartbeat, daemon=True)
+
+    def __enter__(self) -> "JobReporter":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+    def _record(self, progress: Optional[Dict] = None):
+        db = SessionLocal()
+        try:
+            if record_heartbeat(db, self.job_id, progress):
+                self.cancelled.set()
+        finally:
+            db.close()
+
+    def _heartbeat(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self._record()
+            except Exception as e:
+                print(f"ジョブ {self.job_id} の生存確認の記録に失敗しました: {e}")
+
+    def report(self, progress: Dict):
+        """進捗を記録（取り消されていれば JobCancelled）"""
+        self._record(progress)
+        if self.cancelled.is_set():
+            raise JobCancelled()
+
+
+def run_job(db, job, reporter: JobReporter) -> Dict:
+    """ジョブのソースに応じたスクレイパーを実行"""
+    params = json.loads(job.params) if job.params else {}
+    if job.source == 'hospitals':
+        return HospitalScraper(db).run_full_scraping(params.get('prefectures'), progress=reporter.report)
+    if job.source == 'news':
+        return HealthNewsScraper(db).run_full_scraping(progress=reporter.report)
+    raise ValueError(f"不明なソースです: {job.source}")
+
+
+def execute_job(job_id: int, worker_id: str):
+    """取得したジョブを実行し、結果を記録"""
+    db = SessionLocal()
+    try:
+        job = db.query(ScrapingJob).filter(ScrapingJob.id == job_id).one()
+        print(f"[{worker_id}] ジョブ {job_id}（{job.source}）を開始します")
+        try:
+            with JobReporter(job_id) as reporter:
+                result = run_job(db, job, reporter)
+            status, error = 'succeeded', None
+        except JobCancelled:
+            db.rollback()
+            result, status, error = None, 'cancelled', None
+        except Exception as e:
+            db.rollback()
+            result, status, error = None, 'failed', str(e)
+        finish_job(db, job_id, worker_id, status, result, error)
+        print(f"[{worker_id}] ジョブ {job_id} が終了しました: {status}")
+    finally:
+        db.close()
+
+
+def worker_loop(index: int, stop_event):
+    """ワーカープロセスの本体: ジョブを取り出しては実行する"""
+    # 停止はメインプロセスが stop_event で伝える（実行中のジョブは最後まで実行）
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    print(f"[{worker_id}] ワーカーを起動しました")
+    while not stop_event.is_set():
+        job_id = None
+        db = SessionLocal()
+        try:
+            fail_stale_jobs(db)
+            job_id = claim_next_job(db, worker_id)
+        except Exception as e:
+            print(f"[{worker_id}] ジョブの取得に失敗しました: {e}")
+        finally:
+            db.close()
+
+        if job_id is None:
+            stop_event.wait(SCRAPING_WORKER_POLL_SECONDS)
+        else:
+            execute_job(job_id, worker_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="スクレイピングジョブのワーカー")
+    parser.add_argument("--processes", type=int, default=SCRAPING_WORKER_PROCESSES,
+                        help="起動するワーカープロセス数")
+    args = parser.parse_args()
+
+    create_tables()
+
+    # 各プロセスで DB エンジンを作り直すため spawn で起動する
+    context = multiprocessing.get_context("spawn")
+    stop_event = context.Event()
+    processes = [
+        context.Process(target=worker_loop, args=(index, stop_event), name=f"scraping-worker-{index}")
+        for index in range(max(1, args.processes))
+    ]
+    for process in processes:
+        process.start()
+
+    def stop(signum, frame):
+        print("ワーカーを停止しています（実行中のジョブの終了を待ちます）...")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    while any(process.is_alive() for process in processes):
+        time.sleep(1)
+        for process in processes:
+            process.join(timeout=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""性能計測用のスクリプト群（backend ディレクトリから python -m benchmarks.<名前> で実行）"""
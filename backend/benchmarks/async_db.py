@@ -0,0 +1,207 @@
+"""同時リクエスト時のスループットを、DBアクセスの方式ごとに比較するベンチマーク
+
+同じ処理（周辺病院検索とスクレイピング状況の集計）を次の3通りで実装し、
+同時実行数を変えながらスループットと応答時間を計測する。
+
+    blocking   : async def から同期 Session を直接使う（変更前の実装）
+    threadpool : def エンドポイント（FastAPI がスレッドプールで実行）
+    async      : AsyncSession + 非同期サービス（get_async_db / Async*Service）
+
+アプリはプロセス内で httpx.ASGITransport 経由で呼び出すため、イベント
+ループを塞ぐ処理があるとその分だけ全リクエストが直列化される。SQLite では
+ネットワーク越しの DB の応答時間を再現するため、SQL 文ごとに --latency-ms
+だけ実行スレッドで待たせる。
+
+実行例（backend ディレクトリで）:
+    python -m benchmarks.async_db --concurrency 1,8,32 --requests 400
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+
+# 東京駅周辺（シードデータの病院が半径内に入る）
+NEARBY_PARAMS = {"latitude": 35.6812, "longitude": 139.7671, "radius": 10.0}
+
+
+def build_app():
+    """比較用の3通りのエンドポイントを持つアプリを作成"""
+    from fastapi import Depends, FastAPI
+    from sqlalchemy import func, select
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import Session
+
+    from app.database import get_async_db, get_db
+    from app.models.hospital import Hospital
+    from app.models.news import HealthAlert, HealthNews
+    from app.services.async_services import AsyncHospitalService
+    from app.services.hospital_service import HospitalService
+
+    bench_app = FastAPI()
+
+    def count_status_sync(db: Session) -> dict:
+        return {
+            "hospitals": db.query(func.count(Hospital.id)).scalar(),
+            "news": db.query(func.count(HealthNews.id)).scalar(),
+            "alerts": db.query(func.count(HealthAlert.id)).scalar(),
+        }
+
+    @bench_app.get("/blocking/nearby")
+    async def nearby_blocking(latitude: float, longitude: float, radius: float,
+                              db: Session = Depends(get_db)):
+        return HospitalService(db).get_nearby_hospitals(latitude, longitude, radius)
+
+    @bench_app.get("/blocking/status")
+    async def status_blocking(db: Session = Depends(get_db)):
+        return count_status_sync(db)
+
+    @bench_app.get("/threadpool/nearby")
+    def nearby_threadpool(latitude: float, longitude: float, radius: float,
+                          db: Session = Depends(get_db)):
+        return HospitalService(db).get_nearby_hospitals(latitude, longitude, radius)
+
+    @bench_app.get("/threadpool/status")
+    def status_threadpool(db: Session = Depends(get_db)):
+        return count_status_sync(db)
+
+    @bench_app.get("/async/nearby")
+    async def nearby_async(latitude: float, longitude: float, radius: float,
+                           db: AsyncSession = Depends(get_async_db)):
+        return await AsyncHospitalService(db).get_nearby_hospitals(latitude, longitude, radius)
+
+    @bench_app.get("/async/status")
+    async def status_async(db: AsyncSession = Depends(get_async_db)):
+        return {
+            "hospitals": await db.scalar(select(func.count(Hospital.id))),
+            "news": await db.scalar(select(func.count(HealthNews.id))),
+            "alerts": await db.scalar(select(func.count(HealthAlert.id))),
+        }
+
+    return bench_app
+
+
+def add_sqlite_latency(latency_ms: float):
+    """SQLite の SQL 文ごとに、実行スレッドで latency_ms だけ待たせる"""
+    from sqlalchemy import event
+    from app.database import async_engine, engine
+
+    if engine.dialect.name != "sqlite" or latency_ms <= 0:
+        return
+
+    def wait(statement):
+        time.sleep(latency_ms / 1000)
+
+    @event.listens_for(engine, "connect")
+    def sync_connect(dbapi_connection, connection_record):
+        dbapi_connection.set_trace_callback(wait)
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def async_connect(dbapi_connection, connection_record):
+        # aiosqlite の接続は専用スレッドで動くため、そのスレッドで設定する
+        dbapi_connection.await_(dbapi_connection.driver_connection.set_trace_callback(wait))
+
+
+async def run_variant(client: httpx.AsyncClient, variant: str, endpoint: str,
+                      concurrency: int, total_requests: int) -> dict:
+    """同時実行数 concurrency で total_requests 件を送り、結果を集計"""
+    params = NEARBY_PARAMS if endpoint == "nearby" else None
+    url = f"/{variant}/{endpoint}"
+    latencies = []
+    failures = 0
+    remaining = total_requests
+
+    async def worker():
+        nonlocal remaining, failures
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            response = await client.get(url, params=params)
+            if response.status_code != 200:
+                failures += 1
+            latencies.append(time.perf_counter() - started)
+
+    # ウォームアップ（インメモリ索引の構築など）
+    await client.get(url, params=params)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return {
+        "variant": variant,
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "failures": failures,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_p50_ms": round(statistics.median(ordered) * 1000, 2),
+        "latency_p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 2),
+    }
+
+
+async def run(args) -> list:
+    from app.database import async_engine
+
+    transport = httpx.ASGITransport(app=build_app())
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for endpoint in args.endpoints.split(","):
+            for concurrency in (int(value) for value in args.concurrency.split(",")):
+                for variant in ("blocking", "threadpool", "async"):
+                    results.append(await run_variant(
+                        client, variant, endpoint, concurrency, args.requests
+                    ))
+    await async_engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DBアクセス方式ごとの同時リクエスト性能の比較")
+    parser.add_argument("--endpoints", default="nearby,status")
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--requests", type=int, default=400, help="条件ごとのリクエスト数")
+    parser.add_argument("--latency-ms", type=float, default=2.0,
+                        help="SQLite で SQL 文ごとに加える待ち時間（ミリ秒）")
+    parser.add_argument("--json", action="store_true", help="結果を JSON で出力")
+    args = parser.parse_args()
+
+    # app.database の読み込み前に接続先とプールサイズを決める
+    temporary_directory = None
+    if not os.getenv("DATABASE_URL"):
+        temporary_directory = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(temporary_directory.name, 'async_db.db')}"
+    # 変更前の実装はプールが尽きるとイベントループごと待ち続けるため、
+    # 比較ではプールが律速にならないよう同時実行数以上にしておく
+    max_concurrency = max(int(value) for value in args.concurrency.split(","))
+    os.environ.setdefault("DB_POOL_SIZE", str(max_concurrency + 1))
+
+    from app.database import create_tables
+    from app.seed_data import seed_database
+
+    add_sqlite_latency(args.latency_ms)
+    create_tables()
+    seed_database()
+
+    results = asyncio.run(run(args))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        columns = ["endpoint", "concurrency", "variant", "throughput_rps",
+                   "latency_p50_ms", "latency_p95_ms", "failures"]
+        print("  ".join(f"{column:>15}" for column in columns))
+        for result in results:
+            print("  ".join(f"{result[column]:>15}" for column in columns))
+
+    if temporary_directory is not None:
+        temporary_directory.cleanup()
+
+
+if __name__ == "__main__":
+    main()
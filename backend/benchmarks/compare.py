@@ -0,0 +1,44 @@
+"""2回のベンチマーク結果（benchmarks.run の JSON）を比較する
+
+両方にあるケースの p50 / p95 を並べ、--threshold 以上遅くなったものを悪化として
+表示する。悪化があれば終了コード 1 を返すため、CI の判定にも使える。
+DB の方言やデータセットの規模が違う結果同士は比較の意味が薄いため警告を出す。
+
+実行例（backend ディレクトリで）:
+    python -m benchmarks.compare benchmark-results/before.json benchmark-results/after.json --threshold 0.15
+"""
+import argparse
+import sys
+
+from benchmarks.results import (
+    DEFAULT_REGRESSION_THRESHOLD, compare_reports, load_report, print_comparison
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ベンチマーク結果の比較")
+    parser.add_argument("baseline", help="基準の結果ファイル")
+    parser.add_argument("current", help="比較する結果ファイル")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help="悪化とみなす割合（0.1 で 10%%）")
+    args = parser.parse_args()
+
+    baseline = load_report(args.baseline)
+    current = load_report(args.current)
+    for key, label in (("dialect", "DB の方言"), ("commit", "コミット")):
+        before, after = baseline["environment"].get(key), current["environment"].get(key)
+        if before != after:
+            print(f"{label}: {before} → {after}")
+    if baseline["environment"]["dialect"] != current["environment"]["dialect"]:
+        print("警告: DB の方言が異なる結果同士の比較です")
+    # 件数は書き込みのケースで実行ごとに増えるため、生成時の規模とシードで比べる
+    if any(baseline["dataset"].get(key) != current["dataset"].get(key) for key in ("scale", "seed")):
+        print("警告: データセットの規模またはシードが異なる結果同士の比較です")
+
+    rows = compare_reports(baseline, current, args.threshold)
+    print_comparison(rows, args.threshold)
+    sys.exit(1 if any(row["regression"] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""エンドポイントのエンドツーエンドのベンチマーク
+
+app.main.app を httpx.AsyncClient（ASGITransport）からプロセス内で呼び出し、
+ミドルウェア・依存関係・シリアライズを含めた応答時間を計測する。--concurrency を
+指定すると同時にその数のリクエストを送り続け、スループットも記録する。
+"""
+import asyncio
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.results import summarize
+from benchmarks.services import SUGGESTION_PREFIXES, random_datetime, random_point
+from benchmarks.synthetic_data import BENCHMARK_PASSWORD, NEWS_CATEGORIES, SPECIALTY_NAMES
+
+SYMPTOM_TEXTS = [
+    ["頭痛", "発熱"], ["咳", "のどの痛み", "鼻水"], ["腹痛", "吐き気"], ["めまい"],
+    ["胸痛", "息切れ"], ["下痢", "発熱", "疲労感"], ["関節痛"], ["皮疹", "かゆみ"],
+]
+
+
+class EndpointCase:
+    """送るリクエスト（request(rng) が method, url, kwargs を返す）と回数の上限"""
+
+    __slots__ = ("name", "request", "max_iterations")
+
+    def __init__(self, name: str, request: Callable, max_iterations: Optional[int] = None):
+        self.name = name
+        self.request = request
+        self.max_iterations = max_iterations
+
+
+def endpoint_cases(fixtures) -> List[EndpointCase]:
+    def nearby(rng):
+        latitude, longitude = random_point(rng)
+        return "GET", "/api/v1/hospitals/nearby", {
+            "params": {"latitude": latitude, "longitude": longitude, "radius": 5}
+        }
+
+    def nearby_open(rng):
+        method, url, kwargs = nearby(rng)
+        kwargs["params"]["open_at"] = random_datetime(rng).isoformat()
+        kwargs["params"]["specialty"] = rng.choice(SPECIALTY_NAMES)
+        return method, url, kwargs
+
+    def login(rng):
+        email = rng.choice(fixtures.user_emails) if fixtures.user_emails else "missing@example.com"
+        return "POST", "/api/v1/users/login", {"json": {"email": email, "password": BENCHMARK_PASSWORD}}
+
+    return [
+        EndpointCase("GET /symptoms/suggestions", lambda rng: (
+            "GET", "/api/v1/symptoms/suggestions", {"params": {"q": rng.choice(SUGGESTION_PREFIXES)}}
+        )),
+        EndpointCase("GET /symptoms/categories", lambda rng: ("GET", "/api/v1/symptoms/categories", {})),
+        EndpointCase("POST /diagnosis/analyze", lambda rng: (
+            "POST", "/api/v1/diagnosis/analyze", {"json": {"symptoms": rng.choice(SYMPTOM_TEXTS)}}
+        )),
+        EndpointCase("GET /diagnosis/specialties", lambda rng: ("GET", "/api/v1/diagnosis/specialties", {})),
+        EndpointCase("GET /hospitals/nearby", nearby),
+        EndpointCase("GET /hospitals/nearby?open_at&specialty", nearby_open),
+        EndpointCase("POST /hospitals/search", lambda rng: (
+            "POST", "/api/v1/hospitals/search", {"json": {"specialties": [rng.choice(SPECIALTY_NAMES)]}}
+        )),
+        EndpointCase("GET /hospitals/{hospital_id}", lambda rng: (
+            "GET", f"/api/v1/hospitals/{rng.choice(fixtures.hospital_ids or [1])}", {}
+        )),
+        EndpointCase("GET /news/health-news", lambda rng: (
+            "GET", "/api/v1/news/health-news", {"params": {"category": rng.choice(NEWS_CATEGORIES)}}
+        )),
+        EndpointCase("GET /news/health-alerts", lambda rng: ("GET", "/api/v1/news/health-alerts", {})),
+        EndpointCase("GET /news/hospital-news/{hospital_id}", lambda rng: (
+            "GET", f"/api/v1/news/hospital-news/{rng.randint(1, 1000)}", {}
+        )),
+        EndpointCase("GET /news/categories", lambda rng: ("GET", "/api/v1/news/categories", {})),
+        EndpointCase("GET /scraping/status", lambda rng: ("GET", "/api/v1/scraping/status", {})),
+        # bcrypt の照合が大半を占めるため回数を絞る
+        EndpointCase("POST /users/login", login, max_iterations=10),
+    ]
+
+
+async def run_endpoint_case(client: httpx.AsyncClient, case: EndpointCase, iterations: int,
+                            warmup: int, concurrency: int, seed: int) -> Dict:
+    rng = random.Random(f"{seed}:{case.name}")
+    iterations = min(iterations, case.max_iterations or iterations)
+    for _ in range(min(warmup, iterations)):
+        method, url, kwargs = case.request(rng)
+        await client.request(method, url, **kwargs)
+
+    durations = []
+    statuses: Dict[int, int] = {}
+    remaining = iterations
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            method, url, kwargs = case.request(rng)
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            durations.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    elapsed = time.perf_counter() - started
+
+    result = {"name": case.name, "concurrency": concurrency, **summarize(durations)}
+    result["throughput_rps"] = round(len(durations) / elapsed, 1) if elapsed else 0.0
+    result["errors"] = sum(count for status, count in statuses.items() if status >= 400)
+    result["statuses"] = {str(status): count for status, count in sorted(statuses.items())}
+    return result
+
+
+async def _run(fixtures, iterations: int, warmup: int, concurrency: int, seed: int,
+               name_filter: Optional[str]) -> List[Dict]:
+    from app.database import async_engine
+    from app.main import app
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for case in endpoint_cases(fixtures):
+            if name_filter and name_filter not in case.name:
+                continue
+            try:
+                result = await run_endpoint_case(client, case, iterations, warmup, concurrency, seed)
+            except Exception as e:
+                result = {"name": case.name, "error": str(e)}
+            results.append(result)
+            print(f"  {case.name}: {result.get('p50_ms', '-')} ms (p50)", flush=True)
+    await async_engine.dispose()
+    return results
+
+
+def run_endpoint_benchmarks(fixtures, iterations: int = 50, warmup: int = 3, concurrency: int = 1,
+                            seed: int = 42, name_filter: Optional[str] = None) -> List[Dict]:
+    return asyncio.run(_run(fixtures, iterations, warmup, concurrency, seed, name_filter))
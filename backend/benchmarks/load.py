@@ -0,0 +1,460 @@
+"""本番に近いトラフィックの混合による負荷試験（SLO の判定つき）
+
+エンドポイントを重み（--weights）に応じた割合で呼び分け、到着率（--rates の rps）を
+段階的に上げながら、エンドポイントごとの p50/p95/p99 とエラー率を計測して SLO の
+合否と飽和点を表示する。
+
+- 到着はオープンループ（ポアソン到着）: 応答を待たずに予定の時刻に送るため、
+  アプリが詰まると応答時間とエラー率にそのまま表れる。応答時間は予定の時刻から測る
+  （送信側の遅れも含め、応答の遅れで計測が間引かれないようにする）
+- 各段の最初の --warmup 秒に到着したリクエストは集計しない
+- 応答待ちが --max-in-flight 件を超えた到着は送らずにエラー（dropped）として数える
+- 飽和点: そのエンドポイントが初めて SLO を満たさなかった段の到着率。全体では
+  段の終了から1秒以内に完了したリクエストが到着数の 90% を下回った段も飽和とみなす
+- 段の中で1件も到着しなかったエンドポイントは合否なし（-）とし、飽和点・SLO の
+  判定に含めない。到着が 100 件未満の場合は p99 が参考値である旨を表示する
+- 既定では合成データ（benchmarks.synthetic_data）を用意し、その DB で uvicorn を
+  別プロセスで起動して HTTP で送る。--url を指定すると起動済みのアプリに送る
+  （ログインに使う合成ユーザーを読むため、アプリと同じ DB を DATABASE_URL で指定する）
+- 取得ジョブの登録（POST /scraping/news/scrape）で作ったジョブは終了時に取り消す
+
+SLO の合否は --slo-rate（既定は --rates の最初の値）の段で判定し、満たさない
+エンドポイントがあれば終了コード 1 を返す。結果は benchmarks.run と同じ形式の JSON
+（ケース名は "<到着率>rps <名前>"）で保存するため、benchmarks.compare で比較できる。
+
+実行例（backend ディレクトリで）:
+    python -m benchmarks.load --scale small --rates 20,50,100,200 --duration 30 --warmup 5
+    python -m benchmarks.load --weights suggestions=60,nearby=30,analyze=10 --slo nearby:p95=150,p99=400
+    python -m benchmarks.load --url http://localhost:8000 --rates 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.synthetic_data import add_arguments, resolve_scale, use_database
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 名前: (重み, p95 の上限 ms, p99 の上限 ms)
+DEFAULT_MIX = {
+    "suggestions": (45, 100, 250),
+    "nearby": (30, 300, 800),
+    "analyze": (12, 300, 800),
+    # bcrypt の照合（既定の強度で 300ms 前後）を含む
+    "login": (10, 1000, 2000),
+    "scrape": (3, 300, 800),
+}
+DEFAULT_MAX_ERROR_RATE = 0.01
+# 段の終了から猶予の秒数までに完了した割合がこれを下回ったら飽和とみなす
+SATURATION_COMPLETION_RATIO = 0.9
+SATURATION_GRACE_SECONDS = 1.0
+# p99 を判定に使える最小の件数（下回る場合は警告を表示する）
+MIN_P99_SAMPLES = 100
+
+
+class LoadTarget:
+    """負荷の1種類（request(rng) が method, url, kwargs を返す）と SLO"""
+
+    __slots__ = ("name", "weight", "request", "p95_ms", "p99_ms", "max_error_rate", "on_response")
+
+    def __init__(self, name: str, weight: float, request: Callable, p95_ms: float, p99_ms: float,
+                 max_error_rate: float = DEFAULT_MAX_ERROR_RATE, on_response: Optional[Callable] = None):
+        self.name = name
+        self.weight = weight
+        self.request = request
+        self.p95_ms = p95_ms
+        self.p99_ms = p99_ms
+        self.max_error_rate = max_error_rate
+        self.on_response = on_response
+
+    def slo(self) -> Dict:
+        return {"p95_ms": self.p95_ms, "p99_ms": self.p99_ms, "max_error_rate": self.max_error_rate}
+
+
+def load_targets(fixtures, created_jobs: List[int]) -> List[LoadTarget]:
+    """DEFAULT_MIX の既定の重みと SLO で負荷の種類を作る"""
+    from benchmarks.endpoints import endpoint_cases
+
+    cases = {case.name: case.request for case in endpoint_cases(fixtures)}
+
+    def record_job(response: httpx.Response):
+        if response.status_code == 200:
+            created_jobs.append(response.json()["data"]["job_id"])
+
+    requests = {
+        "suggestions": (cases["GET /symptoms/suggestions"], None),
+        "nearby": (cases["GET /hospitals/nearby"], None),
+        "analyze": (cases["POST /diagnosis/analyze"], None),
+        "login": (cases["POST /users/login"], None),
+        "scrape": (lambda rng: ("POST", "/api/v1/scraping/news/scrape", {}), record_job),
+    }
+    return [
+        LoadTarget(name, weight, requests[name][0], p95_ms, p99_ms, on_response=requests[name][1])
+        for name, (weight, p95_ms, p99_ms) in DEFAULT_MIX.items()
+    ]
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """"suggestions=60,nearby=30" の形の重みの上書き（0 でその種類を送らない）"""
+    weights = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"不明な種類です: {name}（{', '.join(DEFAULT_MIX)}）")
+        weights[name] = float(value)
+    return weights
+
+
+def parse_slo(spec: str) -> Dict[str, Dict[str, float]]:
+    """"nearby:p95=150,p99=400,errors=0.02" の形の SLO の上書き"""
+    name, _, values = spec.partition(":")
+    if name not in DEFAULT_MIX:
+        raise ValueError(f"不明な種類です: {name}（{', '.join(DEFAULT_MIX)}）")
+    fields = {"p95": "p95_ms", "p99": "p99_ms", "errors": "max_error_rate"}
+    overrides = {}
+    for item in filter(None, (part.strip() for part in values.split(","))):
+        key, _, value = item.partition("=")
+        if key not in fields:
+            raise ValueError(f"不明な SLO の項目です: {key}（p95, p99, errors）")
+        overrides[fields[key]] = float(value)
+    return {name: overrides}
+
+
+async def run_stage(client: httpx.AsyncClient, targets: List[LoadTarget], rate: float, duration: float,
+                    warmup: float, max_in_flight: int, rng: random.Random) -> Dict:
+    """到着率 rate で warmup + duration 秒送り、集計の対象の結果を返す"""
+    from benchmarks.results import percentile, summarize
+
+    weights = [target.weight for target in targets]
+    durations: Dict[str, List[float]] = {target.name: [] for target in targets}
+    offered = {target.name: 0 for target in targets}
+    errors = {target.name: 0 for target in targets}
+    statuses: Dict[str, Dict[str, int]] = {target.name: {} for target in targets}
+    lags: List[float] = []
+    in_flight = 0
+    completed_in_window = 0
+    tasks = set()
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    measure_from = started + warmup
+    end = measure_from + duration
+
+    async def send(target: LoadTarget, method: str, url: str, kwargs: Dict, scheduled: float,
+                   measured: bool):
+        nonlocal in_flight, completed_in_window
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = str(response.status_code)
+            failed = response.status_code >= 400
+            if target.on_response is not None:
+                target.on_response(response)
+        except httpx.HTTPError as e:
+            response = None
+            status = type(e).__name__
+            failed = True
+        finally:
+            in_flight -= 1
+        finished = loop.time()
+        if not measured:
+            return
+        statuses[target.name][status] = statuses[target.name].get(status, 0) + 1
+        errors[target.name] += failed
+        if response is not None:
+            durations[target.name].append(finished - scheduled)
+        if finished <= end + SATURATION_GRACE_SECONDS:
+            completed_in_window += 1
+
+    scheduled = started
+    while True:
+        scheduled += rng.expovariate(rate)
+        if scheduled >= end:
+            break
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        target = rng.choices(targets, weights)[0]
+        method, url, kwargs = target.request(rng)
+        measured = scheduled >= measure_from
+        if measured:
+            offered[target.name] += 1
+            lags.append(max(0.0, loop.time() - scheduled))
+        if in_flight >= max_in_flight:
+            if measured:
+                statuses[target.name]["dropped"] = statuses[target.name].get("dropped", 0) + 1
+                errors[target.name] += 1
+            continue
+        in_flight += 1
+        task = asyncio.create_task(send(target, method, url, kwargs, scheduled, measured))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+
+    endpoints = []
+    for target in targets:
+        count = offered[target.name]
+        result = {"name": target.name, "offered": count, **summarize(durations[target.name])}
+        result["errors"] = errors[target.name]
+        result["error_rate"] = round(errors[target.name] / count, 4) if count else 0.0
+        result["statuses"] = statuses[target.name]
+        result["slo"] = target.slo()
+        # 到着が無かった段は合否を決めない（None）
+        result["passed"] = None if not count else (
+            result["p95_ms"] <= target.p95_ms
+            and result["p99_ms"] <= target.p99_ms
+            and result["error_rate"] <= target.max_error_rate
+        )
+        result["few_samples"] = count < MIN_P99_SAMPLES
+        endpoints.append(result)
+
+    total = sum(offered.values())
+    return {
+        "rate": rate,
+        "duration": duration,
+        "offered": total,
+        "completed_in_window": completed_in_window,
+        "achieved_rps": round(completed_in_window / duration, 1) if duration else 0.0,
+        # 送信側（このプロセス）の遅れ。大きい場合は負荷をかける側が先に飽和している
+        "client_lag_p99_ms": round(percentile(sorted(lags), 0.99) * 1000, 3),
+        "saturated": bool(total) and completed_in_window < total * SATURATION_COMPLETION_RATIO,
+        "endpoints": endpoints,
+    }
+
+
+async def run_load(base_url: str, targets: List[LoadTarget], rates: List[float], duration: float,
+                   warmup: float, max_in_flight: int, timeout: float, seed: int,
+                   created_jobs: List[int]) -> List[Dict]:
+    targets = [target for target in targets if target.weight > 0]
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    stages = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        for rate in rates:
+            rng = random.Random(f"{seed}:{rate}")
+            print(f"{rate:g} rps で {warmup:g} + {duration:g} 秒送ります", flush=True)
+            stage = await run_stage(client, targets, rate, duration, warmup, max_in_flight, rng)
+            stages.append(stage)
+            print_stage(stage)
+
+        # 登録した取得ジョブはワーカーに実行させない
+        for job_id in created_jobs:
+            try:
+                await client.post(f"/api/v1/scraping/jobs/{job_id}/cancel")
+            except httpx.HTTPError as e:
+                print(f"ジョブ {job_id} の取り消しに失敗しました: {e}")
+    return stages
+
+
+def summarize_slo(stages: List[Dict], slo_rate: float) -> Dict:
+    """エンドポイントごとの飽和点と、slo_rate の段での合否"""
+    endpoints = {}
+    for stage in stages:
+        for result in stage["endpoints"]:
+            summary = endpoints.setdefault(result["name"], {
+                "saturation_rps": None, "max_passing_rps": None, "passed": None
+            })
+            if result["passed"] is None:
+                continue
+            if result["passed"] and summary["saturation_rps"] is None:
+                summary["max_passing_rps"] = stage["rate"]
+            elif not result["passed"] and summary["saturation_rps"] is None:
+                summary["saturation_rps"] = stage["rate"]
+            if stage["rate"] == slo_rate:
+                summary["passed"] = result["passed"]
+
+    saturation = next(
+        (stage["rate"] for stage in stages
+         if stage["saturated"] or any(result["passed"] is False for result in stage["endpoints"])),
+        None,
+    )
+    return {
+        "slo_rate": slo_rate,
+        # slo_rate の段で到着が無かったエンドポイント（None）は不合格にしない
+        "passed": all(summary["passed"] is not False for summary in endpoints.values()),
+        "saturation_rps": saturation,
+        "endpoints": endpoints,
+    }
+
+
+def print_stage(stage: Dict):
+    print(f"  到着 {stage['offered']} 件 / 終了後1秒までに完了 {stage['completed_in_window']} 件"
+          f"（{stage['achieved_rps']} rps）、送信側の遅れ p99 {stage['client_lag_p99_ms']} ms"
+          + ("  ← 飽和" if stage["saturated"] else ""))
+    print(f"  {'name':<12}{'offered':>9}{'p50_ms':>11}{'p95_ms':>11}{'p99_ms':>11}{'errors':>9}  SLO")
+    for result in stage["endpoints"]:
+        print(f"  {result['name']:<12}{result['offered']:>9}{result['p50_ms']:>11}{result['p95_ms']:>11}"
+              f"{result['p99_ms']:>11}{result['error_rate']:>9.1%}  {verdict(result['passed'], 'OK', 'NG')}")
+    few = [result["name"] for result in stage["endpoints"] if result["few_samples"]]
+    if few:
+        print(f"  ※ 到着が {MIN_P99_SAMPLES} 件未満のため p99 は参考値です: {', '.join(few)}"
+              "（--duration を延ばすと判定が安定します）")
+
+
+def verdict(passed: Optional[bool], ok: str, ng: str) -> str:
+    """合否の表示（None は到着が無く判定していない）"""
+    return "-" if passed is None else (ok if passed else ng)
+
+
+def print_slo(summary: Dict, targets: List[LoadTarget]):
+    slos = {target.name: target for target in targets}
+    print(f"\nSLO（{summary['slo_rate']:g} rps の段で判定）:")
+    for name, result in summary["endpoints"].items():
+        target = slos[name]
+        saturation = f"{result['saturation_rps']:g} rps" if result["saturation_rps"] is not None else "なし"
+        print(f"  {name:<12} p95≤{target.p95_ms:g}ms p99≤{target.p99_ms:g}ms エラー≤{target.max_error_rate:.1%}"
+              f"  {verdict(result['passed'], '合格', '不合格')}  飽和点: {saturation}")
+    overall = f"{summary['saturation_rps']:g} rps" if summary["saturation_rps"] is not None else "計測した範囲ではなし"
+    print(f"全体: {'合格' if summary['passed'] else '不合格'}、飽和点: {overall}")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, workers: int) -> subprocess.Popen:
+    """DATABASE_URL を引き継いで uvicorn を別プロセスで起動"""
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=os.environ.copy(),
+    )
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"アプリの起動に失敗しました（終了コード {process.returncode}）")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"{timeout:g} 秒以内にアプリが起動しませんでした")
+
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="混合トラフィックの負荷試験")
+    add_arguments(parser)
+    parser.add_argument("--url", default=None, help="起動済みのアプリの URL（省略時はこのスクリプトが起動）")
+    parser.add_argument("--workers", type=int, default=1, help="起動するアプリの uvicorn ワーカー数")
+    parser.add_argument("--rates", default="10,25,50,100", help="到着率の段（rps、カンマ区切り）")
+    parser.add_argument("--duration", type=float, default=30, help="段ごとの計測秒数")
+    parser.add_argument("--warmup", type=float, default=5, help="段ごとに集計しない最初の秒数")
+    parser.add_argument("--weights", default="",
+                        help=f"重みの上書き（例: suggestions=60,scrape=0、種類: {', '.join(DEFAULT_MIX)}）")
+    parser.add_argument("--slo", action="append", default=[],
+                        help="SLO の上書き（例: nearby:p95=150,p99=400,errors=0.02、複数指定可）")
+    parser.add_argument("--slo-rate", type=float, default=None, help="SLO を判定する段（既定は最初の段）")
+    parser.add_argument("--max-in-flight", type=int, default=500, help="応答待ちの上限（超えた到着はエラー）")
+    parser.add_argument("--timeout", type=float, default=10, help="リクエストのタイムアウト秒数")
+    parser.add_argument("--output", default=None, help="結果の保存先（JSON）")
+    parser.add_argument("--output-dir", default="benchmark-results", help="--output が無いときの保存先")
+    args = parser.parse_args()
+
+    try:
+        rates = [float(rate) for rate in args.rates.split(",") if rate.strip()]
+    except ValueError:
+        parser.error(f"--rates が不正です: {args.rates}")
+    if not rates or any(rate <= 0 for rate in rates):
+        parser.error("--rates には正の到着率を指定してください")
+    slo_rate = args.slo_rate if args.slo_rate is not None else rates[0]
+    if slo_rate not in rates:
+        parser.error(f"--slo-rate は --rates のいずれかを指定してください: {args.rates}")
+    try:
+        weights = parse_weights(args.weights)
+        slos: Dict[str, Dict[str, float]] = {}
+        for spec in args.slo:
+            for name, overrides in parse_slo(spec).items():
+                slos.setdefault(name, {}).update(overrides)
+    except ValueError as e:
+        parser.error(str(e))
+    if not any(weights.get(name, weight) > 0 for name, (weight, _, _) in DEFAULT_MIX.items()):
+        parser.error("重みが正の種類がありません")
+    scale = resolve_scale(args.scale, args.counts)
+
+    # app.database の読み込み前に接続先を決める
+    url = use_database(args.database or f"bench-{args.scale}.db")
+
+    from benchmarks.results import build_report, default_output_path, save_report
+    from benchmarks.services import load_fixtures
+    from benchmarks.synthetic_data import dataset_counts, generate
+
+    print(f"接続先: {url}")
+    if args.url is None:
+        print(f"合成データを確認しています（{args.scale}: {scale}）")
+        generation = generate(scale, args.seed, args.reference_date)
+        dataset = {"scale_name": args.scale, "scale": scale, "seed": args.seed,
+                   "reference_date": generation["reference_date"]}
+    else:
+        # 起動済みのアプリのデータはこのスクリプトでは作らない
+        dataset = {"scale_name": "external"}
+    dataset["counts"] = dataset_counts()
+
+    created_jobs: List[int] = []
+    targets = load_targets(load_fixtures(), created_jobs)
+    for target in targets:
+        target.weight = weights.get(target.name, target.weight)
+        for field, value in slos.get(target.name, {}).items():
+            setattr(target, field, value)
+
+    process = None
+    base_url = args.url
+    if base_url is None:
+        base_url = f"http://127.0.0.1:{free_port()}"
+        process = start_server(int(base_url.rsplit(":", 1)[1]), args.workers)
+    try:
+        if process is not None:
+            wait_until_ready(base_url, process)
+        stages = asyncio.run(run_load(
+            base_url.rstrip("/"), targets, rates, args.duration, args.warmup,
+            args.max_in_flight, args.timeout, args.seed, created_jobs
+        ))
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    summary = summarize_slo(stages, slo_rate)
+    print_slo(summary, [target for target in targets if target.weight > 0])
+
+    cases = [
+        {**result, "name": f"{stage['rate']:g}rps {result['name']}"}
+        for stage in stages for result in stage["endpoints"]
+    ]
+    report = build_report({"load": cases}, dataset, {
+        "url": args.url,
+        "workers": None if args.url else args.workers,
+        "rates": rates,
+        "duration": args.duration,
+        "warmup": args.warmup,
+        "max_in_flight": args.max_in_flight,
+        "weights": {target.name: target.weight for target in targets},
+    })
+    report["stages"] = stages
+    report["slo"] = summary
+    path = save_report(report, args.output or default_output_path(args.output_dir, report))
+    print(f"\n結果を保存しました: {os.path.abspath(path)}")
+    sys.exit(0 if summary["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
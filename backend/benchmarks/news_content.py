@@ -0,0 +1,141 @@
+"""記事本文の取得方式ごとの所要時間を比較するベンチマーク
+
+ローカルに立てた疑似ニュースサイト（応答に --latency-ms かかる）から
+記事ページを取得し、本文を抽出するまでの時間を次の2通りで計測する。
+
+    serial     : requests.Session で1件ずつ取得・解析（変更前の実装）
+    concurrent : HealthNewsScraper.fetch_contents（並行取得 + ワーカーでの解析）
+
+疑似サイトは --hosts 個のポートで待ち受け、記事はそれぞれに振り分ける
+（ホストごとの同時接続数の上限 SCRAPER_HOST_CONNECTIONS が効くことを確認できる）。
+
+実行例（backend ディレクトリで）:
+    python -m benchmarks.news_content --articles 60 --hosts 3 --latency-ms 100
+    NEWS_PARSE_EXECUTOR=process python -m benchmarks.news_content --paragraphs 400
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def article_html(index: int, paragraphs: int) -> bytes:
+    body = "".join(
+        f"<p>記事{index}の第{paragraph}段落です。感染症の予防について説明します。</p>"
+        for paragraph in range(paragraphs)
+    )
+    return (
+        "<html><head><title>記事</title></head><body>"
+        "<nav><a href='/'>トップ</a></nav>"
+        f"<article><h1>記事{index}</h1>{body}</article>"
+        "</body></html>"
+    ).encode("utf-8")
+
+
+def start_fake_site(latency_ms: float, paragraphs: int) -> ThreadingHTTPServer:
+    """記事ページを返す疑似サイトを起動（ポートは自動割り当て）"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive を有効にする
+
+        def do_GET(self):
+            time.sleep(latency_ms / 1000)
+            index = int(self.path.rsplit("/", 1)[-1])
+            body = article_html(index, paragraphs)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_serial(urls) -> dict:
+    """変更前と同じく1件ずつ取得・解析"""
+    import requests
+    from app.services.news_scraper import extract_article_text
+
+    session = requests.Session()
+    contents = {}
+    for url in urls:
+        response = session.get(url, timeout=10)
+        if response.status_code == 200:
+            contents[url] = extract_article_text(response.text)
+    return contents
+
+
+def run_concurrent(urls) -> dict:
+    from app.services.news_scraper import HealthNewsScraper
+
+    return asyncio.run(HealthNewsScraper(db=None).fetch_contents(urls))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="記事本文の取得方式ごとの所要時間の比較")
+    parser.add_argument("--articles", type=int, default=60, help="取得する記事数")
+    parser.add_argument("--hosts", type=int, default=3, help="疑似サイトのホスト数")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="疑似サイトの応答時間（ミリ秒）")
+    parser.add_argument("--paragraphs", type=int, default=50, help="記事1件あたりの段落数（解析の重さ）")
+    parser.add_argument("--json", action="store_true", help="結果を JSON で出力")
+    args = parser.parse_args()
+
+    # app のモジュールは読み込み時に DB エンジンを作るため、未設定なら一時 SQLite を使う
+    temporary_directory = None
+    if not os.getenv("DATABASE_URL"):
+        temporary_directory = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(temporary_directory.name, 'news_content.db')}"
+
+    servers = [start_fake_site(args.latency_ms, args.paragraphs) for _ in range(max(1, args.hosts))]
+    urls = [
+        f"http://127.0.0.1:{servers[index % len(servers)].server_port}/article/{index}"
+        for index in range(args.articles)
+    ]
+
+    results = []
+    baseline = None
+    expected = None
+    for variant, run in (("serial", run_serial), ("concurrent", run_concurrent)):
+        started = time.perf_counter()
+        contents = run(urls)
+        elapsed = time.perf_counter() - started
+        if expected is None:
+            expected = contents
+        baseline = baseline or elapsed
+        results.append({
+            "variant": variant,
+            "articles": len(contents),
+            "matches_serial": contents == expected,
+            "seconds": round(elapsed, 3),
+            "articles_per_second": round(len(contents) / elapsed, 1),
+            "speedup": round(baseline / elapsed, 1),
+        })
+
+    for server in servers:
+        server.shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        columns = ["variant", "articles", "matches_serial", "seconds", "articles_per_second", "speedup"]
+        print(f"articles={args.articles} hosts={args.hosts} latency_ms={args.latency_ms} paragraphs={args.paragraphs}")
+        print("  ".join(f"{column:>20}" for column in columns))
+        for result in results:
+            print("  ".join(f"{str(result[column]):>20}" for column in columns))
+
+    if temporary_directory is not None:
+        temporary_directory.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""ベンチマーク結果の集計・保存・比較
+
+結果は1回の実行ごとに JSON ファイルへ保存する。ファイルには実行環境（DB の方言、
+Python、コミット）とデータセットの件数を含め、ケースごとに所要時間の分布を記録する。
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# 比較で悪化とみなす既定の割合（p50 / p95 が 10% 以上遅くなったら）
+DEFAULT_REGRESSION_THRESHOLD = 0.10
+COMPARED_METRICS = ("p50_ms", "p95_ms")
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """並べ替え済みの値の分位点（線形補間）"""
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(durations: List[float]) -> Dict:
+    """所要時間（秒）の一覧をミリ秒の統計にまとめる"""
+    ordered = sorted(durations)
+    total = sum(ordered)
+    return {
+        "iterations": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3) if ordered else 0.0,
+        "min_ms": round(ordered[0] * 1000, 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        "ops_per_second": round(len(ordered) / total, 1) if total else 0.0,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict:
+    """結果に記録する実行環境（接続先のパスワードは含めない）"""
+    from sqlalchemy.engine import make_url
+
+    from app.database import engine
+
+    url = make_url(os.environ.get("DATABASE_URL", str(engine.url)))
+    return {
+        "dialect": engine.dialect.name,
+        "server_version": ".".join(str(part) for part in engine.dialect.server_version_info or ()),
+        "database": url.render_as_string(hide_password=True),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": git_commit(),
+    }
+
+
+def build_report(suites: Dict[str, List[Dict]], dataset: Dict, options: Dict) -> Dict:
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "command": " ".join(sys.argv),
+        "environment": environment(),
+        "dataset": dataset,
+        "options": options,
+        "suites": suites,
+    }
+
+
+def default_output_path(directory: str, report: Dict) -> str:
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    scale = report["dataset"].get("scale_name", "custom")
+    return os.path.join(directory, f"{stamp}_{report['environment']['dialect']}_{scale}.json")
+
+
+def save_report(report: Dict, path: str) -> str:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def load_report(path: str) -> Dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_reports(baseline: Dict, current: Dict,
+                    threshold: float = DEFAULT_REGRESSION_THRESHOLD) -> List[Dict]:
+    """両方にあるケースの p50 / p95 を比べる（change は current / baseline - 1）"""
+    rows = []
+    for suite, cases in current["suites"].items():
+        baseline_cases = {case["name"]: case for case in baseline["suites"].get(suite, [])}
+        for case in cases:
+            previous = baseline_cases.get(case["name"])
+            if previous is None:
+                continue
+            row = {"suite": suite, "name": case["name"], "regression": False}
+            for metric in COMPARED_METRICS:
+                before, after = previous.get(metric), case.get(metric)
+                change = (after / before - 1) if before and after is not None else None
+                row[metric] = (before, after, change)
+                if change is not None and change > threshold:
+                    row["regression"] = True
+            rows.append(row)
+    return rows
+
+
+def print_report(report: Dict):
+    columns = ["iterations", "p50_ms", "p95_ms", "p99_ms", "max_ms", "ops_per_second"]
+    for suite, cases in report["suites"].items():
+        print(f"\n[{suite}]")
+        width = max((len(case["name"]) for case in cases), default=10)
+        print(f"{'name':<{width}}  " + "  ".join(f"{column:>14}" for column in columns))
+        for case in cases:
+            if "error" in case:
+                print(f"{case['name']:<{width}}  エラー: {case['error']}")
+                continue
+            print(f"{case['name']:<{width}}  " + "  ".join(f"{case[column]:>14}" for column in columns))
+
+
+def print_comparison(rows: List[Dict], threshold: float):
+    width = max((len(f"{row['suite']}/{row['name']}") for row in rows), default=10)
+    print(f"\n{'case':<{width}}  " + "  ".join(f"{metric + ' (前→後)':>28}" for metric in COMPARED_METRICS))
+    for row in rows:
+        cells = []
+        for metric in COMPARED_METRICS:
+            before, after, change = row[metric]
+            change_text = f"{change:+.1%}" if change is not None else "-"
+            cells.append(f"{before}→{after} ({change_text})".rjust(28))
+        mark = "  ← 悪化" if row["regression"] else ""
+        print(f"{row['suite'] + '/' + row['name']:<{width}}  " + "  ".join(cells) + mark)
+    regressions = sum(row["regression"] for row in rows)
+    print(f"\n{len(rows)} 件中 {regressions} 件が {threshold:.0%} 以上悪化しました")
@@ -0,0 +1,250 @@
+"""サービスのメソッドごとのマイクロベンチマーク
+
+各ケースは1回ごとに新しい Session を作り（リクエストと同じ）、引数は --seed から
+決まる乱数で選ぶ。応答キャッシュを使うメソッドは毎回キャッシュを空にして DB への
+問い合わせを計測し、メモリ上のインデックスは構築済みの状態で計測する（構築自体は
+*.rebuild のケースで別に計測する）。書き込みを伴うケースはベンチマーク用のユーザー
+（BENCHMARK_WRITER_EMAIL）で実行するため、合成データの件数は変わらない。
+"""
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.results import summarize
+from benchmarks.synthetic_data import (
+    BENCHMARK_PASSWORD, CITIES, NEWS_CATEGORIES, NEWS_TOPICS, SPECIALTY_NAMES,
+    SYNTHETIC_EMAIL_DOMAIN, SYNTHETIC_EMAIL_PREFIX
+)
+
+BENCHMARK_WRITER_EMAIL = "benchmark-writer@example.org"
+# 入力途中の症状名として使う文字列（読み・同義語・部分一致を含む）
+SUGGESTION_PREFIXES = ["", "ず", "ずつう", "頭", "は", "ねつ", "せき", "腹", "いた", "め", "胸", "かゆ"]
+SYMPTOM_QUERIES = ["頭痛", "熱", "のど", "お腹が痛い", "咳", "めまい", "疲れ", "発疹"]
+
+
+class BenchmarkCase:
+    """計測する処理（run(db, rng)）と、1回ごとの前処理・回数の上限"""
+
+    __slots__ = ("name", "run", "max_iterations", "before_each")
+
+    def __init__(self, name: str, run: Callable, max_iterations: Optional[int] = None,
+                 before_each: Optional[Callable[[], None]] = None):
+        self.name = name
+        self.run = run
+        self.max_iterations = max_iterations
+        self.before_each = before_each
+
+
+class Fixtures:
+    """ケースの引数に使う既存データ（合成データから取得）"""
+
+    __slots__ = ("hospital_ids", "news_ids", "user_ids", "user_emails", "result_ids", "symptom_ids",
+                 "writer_id")
+
+    def __init__(self, db, sample_size: int = 1000):
+        from sqlalchemy import func, select
+
+        from app.auth.password import hash_password
+        from app.models.diagnosis import DiagnosisResult
+        from app.models.hospital import Hospital
+        from app.models.news import HealthNews
+        from app.models.symptom import Symptom
+        from app.models.user import User
+
+        def sample(column, *conditions):
+            # ORDER BY random() は大きな表で遅いため、ID の範囲から等間隔に取る
+            low, high = db.execute(select(func.min(column), func.max(column)).where(*conditions)).one()
+            if low is None:
+                return []
+            step = max(1, (high - low) // sample_size)
+            return db.execute(
+                select(column).where(column >= low, (column - low) % step == 0, *conditions).limit(sample_size)
+            ).scalars().all()
+
+        self.hospital_ids = sample(Hospital.id, Hospital.is_active == True)
+        self.news_ids = sample(HealthNews.id, HealthNews.is_published == True)
+        synthetic_user = User.email.like(f"{SYNTHETIC_EMAIL_PREFIX}%{SYNTHETIC_EMAIL_DOMAIN}")
+        self.user_ids = sample(User.id, synthetic_user)
+        self.user_emails = db.execute(
+            select(User.email).where(User.id.in_(self.user_ids[:100]))
+        ).scalars().all()
+        self.result_ids = db.execute(
+            select(DiagnosisResult.id, DiagnosisResult.user_id).where(
+                DiagnosisResult.user_id.in_(self.user_ids[:200])
+            ).limit(sample_size)
+        ).all()
+        self.symptom_ids = db.execute(select(Symptom.id)).scalars().all()
+
+        writer = db.execute(select(User).where(User.email == BENCHMARK_WRITER_EMAIL)).scalar_one_or_none()
+        if writer is None:
+            writer = User(email=BENCHMARK_WRITER_EMAIL, hashed_password=hash_password(BENCHMARK_PASSWORD),
+                          full_name="ベンチマーク 書き込み用")
+            db.add(writer)
+            db.commit()
+        self.writer_id = writer.id
+
+
+def random_point(rng: random.Random):
+    """病院の多い都市の周辺の座標"""
+    _, _, latitude, longitude, spread, _ = rng.choice(CITIES)
+    return rng.gauss(latitude, spread / 2), rng.gauss(longitude, spread / 2)
+
+
+def random_datetime(rng: random.Random) -> datetime:
+    return datetime(2024, 1, 1) + timedelta(days=rng.randint(0, 6), hours=rng.randint(0, 23))
+
+
+def service_cases(fixtures: Fixtures) -> List[BenchmarkCase]:
+    from app.response_cache import response_cache
+    from app.services.diagnosis_scoring import diagnosis_scoring_engine
+    from app.services.diagnosis_service import DiagnosisService
+    from app.services.hospital_service import HospitalService
+    from app.services.news_service import NewsService
+    from app.services.spatial_index import hospital_index
+    from app.services.symptom_autocomplete import symptom_autocomplete
+    from app.services.symptom_search import symptom_search_index
+    from app.services.symptom_service import SymptomService
+    from app.services.user_service import UserService
+
+    def choice(values):
+        return lambda rng: rng.choice(values) if values else 0
+
+    hospital_id = choice(fixtures.hospital_ids)
+    news_id = choice(fixtures.news_ids)
+    user_id = choice(fixtures.user_ids)
+    email = choice(fixtures.user_emails)
+    result = choice(fixtures.result_ids)
+
+    def symptoms(rng, count=3):
+        return [
+            {"symptom_id": symptom_id, "severity": rng.randint(1, 10)}
+            for symptom_id in rng.sample(fixtures.symptom_ids, min(count, len(fixtures.symptom_ids)))
+        ]
+
+    def new_news(rng):
+        topic = rng.choice(NEWS_TOPICS)
+        return {
+            "title": f"{topic}に関するベンチマーク記事 {rng.getrandbits(48):x}",
+            "content": f"{topic}についての記事です。",
+            "category": rng.choice(NEWS_CATEGORIES),
+        }
+
+    return [
+        # 病院
+        BenchmarkCase("hospital.search_hospitals.name",
+                      lambda db, rng: HospitalService(db).search_hospitals(rng.choice(CITIES)[1])),
+        BenchmarkCase("hospital.search_hospitals.specialty",
+                      lambda db, rng: HospitalService(db).search_hospitals("", rng.choice(SPECIALTY_NAMES))),
+        BenchmarkCase("hospital.search_hospitals.open_at",
+                      lambda db, rng: HospitalService(db).search_hospitals("", open_at=random_datetime(rng))),
+        BenchmarkCase("hospital.get_nearby_hospitals",
+                      lambda db, rng: HospitalService(db).get_nearby_hospitals(*random_point(rng), distance_km=5)),
+        BenchmarkCase("hospital.get_nearby_hospitals.specialty_open_at",
+                      lambda db, rng: HospitalService(db).get_nearby_hospitals(
+                          *random_point(rng), distance_km=10, specialty=rng.choice(SPECIALTY_NAMES),
+                          open_at=random_datetime(rng))),
+        BenchmarkCase("hospital.get_nearest_hospitals",
+                      lambda db, rng: HospitalService(db).get_nearest_hospitals(*random_point(rng), count=5)),
+        BenchmarkCase("hospital.get_hospital_detail",
+                      lambda db, rng: HospitalService(db).get_hospital_detail(hospital_id(rng))),
+        BenchmarkCase("hospital_index.rebuild", lambda db, rng: hospital_index.rebuild(db), max_iterations=3),
+        # ニュース
+        BenchmarkCase("news.get_health_news", lambda db, rng: NewsService(db).get_health_news()),
+        BenchmarkCase("news.get_health_news.category",
+                      lambda db, rng: NewsService(db).get_health_news(rng.choice(NEWS_CATEGORIES))),
+        BenchmarkCase("news.get_health_news.featured",
+                      lambda db, rng: NewsService(db).get_health_news(featured_only=True)),
+        BenchmarkCase("news.get_news_by_id", lambda db, rng: NewsService(db).get_news_by_id(news_id(rng))),
+        BenchmarkCase("news.get_health_alerts", lambda db, rng: NewsService(db).get_health_alerts()),
+        BenchmarkCase("news.get_emergency_alerts", lambda db, rng: NewsService(db).get_emergency_alerts()),
+        BenchmarkCase("news.get_hospital_news",
+                      lambda db, rng: NewsService(db).get_hospital_news(rng.randint(1, 1000))),
+        BenchmarkCase("news.search_news",
+                      lambda db, rng: NewsService(db).search_news(rng.choice(NEWS_TOPICS))),
+        BenchmarkCase("news.get_news_categories", lambda db, rng: NewsService(db).get_news_categories(),
+                      before_each=response_cache.clear),
+        BenchmarkCase("news.get_trending_news", lambda db, rng: NewsService(db).get_trending_news()),
+        BenchmarkCase("news.create_news", lambda db, rng: NewsService(db).create_news(new_news(rng)),
+                      max_iterations=50),
+        # 症状
+        BenchmarkCase("symptom.get_all_symptoms", lambda db, rng: SymptomService(db).get_all_symptoms()),
+        BenchmarkCase("symptom.get_symptom_categories",
+                      lambda db, rng: SymptomService(db).get_symptom_categories(),
+                      before_each=response_cache.clear),
+        BenchmarkCase("symptom.search_symptoms",
+                      lambda db, rng: SymptomService(db).search_symptoms(rng.choice(SYMPTOM_QUERIES))),
+        BenchmarkCase("symptom.get_symptom_suggestions",
+                      lambda db, rng: SymptomService(db).get_symptom_suggestions(rng.choice(SUGGESTION_PREFIXES))),
+        BenchmarkCase("symptom.record_user_symptoms",
+                      lambda db, rng: SymptomService(db).record_user_symptoms(fixtures.writer_id, symptoms(rng)),
+                      max_iterations=50),
+        BenchmarkCase("symptom_autocomplete.rebuild", lambda db, rng: symptom_autocomplete.rebuild(db),
+                      max_iterations=3),
+        BenchmarkCase("symptom_search.rebuild", lambda db, rng: symptom_search_index.rebuild(db),
+                      max_iterations=3),
+        # 診断
+        BenchmarkCase("diagnosis.analyze_symptoms",
+                      lambda db, rng: DiagnosisService(db).analyze_symptoms(fixtures.writer_id, symptoms(rng)),
+                      max_iterations=50),
+        BenchmarkCase("diagnosis.get_user_diagnosis_history",
+                      lambda db, rng: DiagnosisService(db).get_user_diagnosis_history(user_id(rng))),
+        BenchmarkCase("diagnosis.get_diagnosis_result",
+                      lambda db, rng: DiagnosisService(db).get_diagnosis_result(*result(rng))),
+        BenchmarkCase("diagnosis_scoring.rebuild", lambda db, rng: diagnosis_scoring_engine.rebuild(db),
+                      max_iterations=3),
+        # ユーザー
+        BenchmarkCase("user.get_user_by_email", lambda db, rng: UserService(db).get_user_by_email(email(rng))),
+        BenchmarkCase("user.get_user_profile", lambda db, rng: UserService(db).get_user_profile(user_id(rng))),
+        # bcrypt の照合が大半を占めるため回数を絞る
+        BenchmarkCase("user.authenticate_user",
+                      lambda db, rng: UserService(db).authenticate_user(email(rng), BENCHMARK_PASSWORD),
+                      max_iterations=5),
+    ]
+
+
+def run_case(case: BenchmarkCase, iterations: int, warmup: int, seed: int) -> Dict:
+    """warmup 回実行してから iterations 回（上限つき）計測する"""
+    from app.database import SessionLocal
+
+    rng = random.Random(f"{seed}:{case.name}")
+    iterations = min(iterations, case.max_iterations or iterations)
+    durations = []
+    for iteration in range(min(warmup, iterations) + iterations):
+        if case.before_each is not None:
+            case.before_each()
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            case.run(db, rng)
+            elapsed = time.perf_counter() - started
+        finally:
+            db.close()
+        if iteration >= min(warmup, iterations):
+            durations.append(elapsed)
+    return {"name": case.name, **summarize(durations)}
+
+
+def load_fixtures() -> Fixtures:
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return Fixtures(db)
+    finally:
+        db.close()
+
+
+def run_service_benchmarks(fixtures: Fixtures, iterations: int = 50, warmup: int = 3, seed: int = 42,
+                           name_filter: Optional[str] = None) -> List[Dict]:
+    results = []
+    for case in service_cases(fixtures):
+        if name_filter and name_filter not in case.name:
+            continue
+        try:
+            result = run_case(case, iterations, warmup, seed)
+        except Exception as e:
+            result = {"name": case.name, "error": str(e)}
+        results.append(result)
+        print(f"  {case.name}: {result.get('p50_ms', '-')} ms (p50)", flush=True)
+    return results
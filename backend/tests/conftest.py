@@ -0,0 +1,32 @@
+import os
+import tempfile
+
+# app.database の読み込み前にテスト用の SQLite を指定する
+_database_dir = tempfile.mkdtemp(prefix="symptom-checker-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_database_dir, 'test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def tables():
+    from app.database import create_tables
+
+    create_tables()
+
+
+@pytest.fixture
+def db(tables):
+    """テスト用のセッション（終了後に全テーブルを空にする）"""
+    from app.database import SessionLocal, engine
+    from app.models.base import Base
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        with engine.begin() as connection:
+            for table in reversed(Base.metadata.sorted_tables):
+                connection.execute(table.delete())
@@ -0,0 +1,66 @@
+"""認証済みユーザーのキャッシュが更新・削除・トークンの期限切れに追従すること"""
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.auth.jwt_handler import create_access_token
+from app.auth.principal import get_cached_principal, profile_cache, token_cache
+from app.main import app
+from app.models.user import User
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def user(db):
+    token_cache.clear()
+    profile_cache.clear()
+    user = User(email="cached@example.com", hashed_password="x", full_name="キャッシュ太郎", is_active=True)
+    db.add(user)
+    db.commit()
+    yield user
+    token_cache.clear()
+    profile_cache.clear()
+
+
+def auth(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_deleted_account_stops_authenticating_with_a_cached_token(user):
+    token = create_access_token(data={"sub": user.email})
+    assert client.get("/api/v1/users/profile", headers=auth(token)).status_code == 200
+    assert get_cached_principal(token) is not None
+
+    assert client.delete("/api/v1/users/account", headers=auth(token)).status_code == 200
+    response = client.get("/api/v1/users/profile", headers=auth(token))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Inactive user"
+
+
+def test_profile_update_is_visible_on_the_next_request(user):
+    token = create_access_token(data={"sub": user.email})
+    assert client.get("/api/v1/users/profile", headers=auth(token)).json()["full_name"] == "キャッシュ太郎"
+
+    response = client.put("/api/v1/users/profile", headers=auth(token), json={"full_name": "更新花子"})
+    assert response.status_code == 200
+    assert client.get("/api/v1/users/profile", headers=auth(token)).json()["full_name"] == "更新花子"
+
+
+def test_cached_token_does_not_outlive_its_expiry(user):
+    token = create_access_token(data={"sub": user.email}, expires_delta=timedelta(seconds=1))
+    assert client.get("/api/v1/users/profile", headers=auth(token)).status_code == 200
+    cached = get_cached_principal(token)
+    assert cached is not None
+    expires_at = cached[0]["exp"]
+
+    # キャッシュの有効期間（AUTH_CACHE_TTL_SECONDS）内でも exp を過ぎたら使わない
+    time.sleep(max(0.0, expires_at - time.time()) + 0.1)
+    assert get_cached_principal(token) is None
+
+    # JWT の検証は秒単位のため、exp の1秒後には期限切れとして拒否される
+    time.sleep(max(0.0, expires_at + 1 - time.time()) + 0.1)
+    assert client.get("/api/v1/users/profile", headers=auth(token)).status_code == 401
+    assert get_cached_principal(token) is None
@@ -0,0 +1,116 @@
+import random
+
+import pytest
+
+from app.models.diagnosis import Diagnosis, DiagnosisSymptom
+from app.models.symptom import Symptom
+from app.services import diagnosis_scoring
+from app.services.diagnosis_scoring import DiagnosisScoringEngine, diagnosis_scoring_engine
+
+BACKENDS = [pytest.param(True, id="numpy"), pytest.param(False, id="python")]
+DIAGNOSIS_COUNT = 40
+SYMPTOM_COUNT = 60
+
+
+def random_model(seed=0):
+    rng = random.Random(seed)
+    diagnoses = [(100 + i, f"診断{i}") for i in range(DIAGNOSIS_COUNT)]
+    associations = [
+        (diagnosis_id, symptom_id, rng.uniform(0.05, 0.95))
+        for diagnosis_id, _ in diagnoses
+        for symptom_id in rng.sample(range(1, SYMPTOM_COUNT + 1), 6)
+    ]
+    return diagnoses, associations
+
+
+def make_engine(use_numpy, seed=0):
+    engine = DiagnosisScoringEngine(use_numpy=use_numpy)
+    engine.build(*random_model(seed))
+    return engine
+
+
+def random_inputs(count, seed=1):
+    rng = random.Random(seed)
+    inputs = [rng.sample(range(1, SYMPTOM_COUNT + 1), rng.randint(1, 5)) for _ in range(count)]
+    # 空・未知の症状だけ・重複ありの入力も混ぜる
+    inputs[3] = []
+    inputs[7] = [SYMPTOM_COUNT + 100]
+    inputs[11] = inputs[11] + inputs[11]
+    return inputs
+
+
+def as_tuples(candidates):
+    return [(candidate.id, candidate.name) for candidate in candidates]
+
+
+def assert_same_ranking(actual, expected):
+    assert as_tuples(actual) == as_tuples(expected)
+    for a, e in zip(actual, expected):
+        assert a.probability == pytest.approx(e.probability, rel=1e-9, abs=1e-12)
+        assert a.score == pytest.approx(e.score, rel=1e-9, abs=1e-9)
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+@pytest.mark.parametrize("limit", [1, 5, DIAGNOSIS_COUNT])
+def test_rank_batch_matches_rank_across_chunk_boundaries(use_numpy, limit, monkeypatch):
+    engine = make_engine(use_numpy)
+    inputs = random_inputs(25)
+    # 3件ごとに分割させ、チャンクの境界をまたがせる
+    monkeypatch.setattr(diagnosis_scoring, "BATCH_SCORE_CELLS", DIAGNOSIS_COUNT * 3)
+    batch = engine.rank_batch(inputs, limit)
+    assert len(batch) == len(inputs)
+    for symptom_ids, candidates in zip(inputs, batch):
+        assert_same_ranking(candidates, engine.rank(symptom_ids, limit))
+    assert batch[3] == [] and batch[7] == []
+
+
+def test_numpy_and_python_rankings_agree():
+    numpy_engine, python_engine = make_engine(True), make_engine(False)
+    for symptom_ids in random_inputs(25):
+        assert_same_ranking(numpy_engine.rank(symptom_ids, 10), python_engine.rank(symptom_ids, 10))
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_probabilities_sum_to_one(use_numpy):
+    engine = make_engine(use_numpy)
+    for symptom_ids in random_inputs(25):
+        if not engine.known_symptoms(symptom_ids):
+            continue
+        ranked = engine.rank(symptom_ids, DIAGNOSIS_COUNT)
+        assert len(ranked) == DIAGNOSIS_COUNT
+        assert sum(candidate.probability for candidate in ranked) == pytest.approx(1.0)
+        scores = [candidate.score for candidate in ranked]
+        assert scores == sorted(scores, reverse=True)
+    for ranked in engine.rank_batch(random_inputs(25), DIAGNOSIS_COUNT):
+        if ranked:
+            assert sum(candidate.probability for candidate in ranked) == pytest.approx(1.0)
+
+
+def test_committed_association_changes_the_next_ranking(db):
+    fever = Symptom(name="発熱", category="全身")
+    rash = Symptom(name="発疹", category="皮膚")
+    cold = Diagnosis(name="かぜ", category="呼吸器")
+    measles = Diagnosis(name="はしか", category="感染症")
+    db.add_all([fever, rash, cold, measles])
+    db.flush()
+    db.add_all([
+        DiagnosisSymptom(diagnosis_id=cold.id, symptom_id=fever.id, likelihood=0.9),
+        DiagnosisSymptom(diagnosis_id=measles.id, symptom_id=fever.id, likelihood=0.5),
+    ])
+    db.commit()
+
+    diagnosis_scoring_engine.ensure_built(db)
+    assert diagnosis_scoring_engine.rank([fever.id, rash.id], 1)[0].name == "かぜ"
+
+    # ロールバックした変更では無効化しない
+    db.add(DiagnosisSymptom(diagnosis_id=measles.id, symptom_id=rash.id, likelihood=0.95))
+    db.flush()
+    db.rollback()
+    assert diagnosis_scoring_engine._stale is False
+
+    db.add(DiagnosisSymptom(diagnosis_id=measles.id, symptom_id=rash.id, likelihood=0.95))
+    db.commit()
+    assert diagnosis_scoring_engine._stale is True
+    diagnosis_scoring_engine.ensure_built(db)
+    assert diagnosis_scoring_engine.rank([fever.id, rash.id], 1)[0].name == "はしか"
+    diagnosis_scoring_engine.invalidate()
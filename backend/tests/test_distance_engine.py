@@ -0,0 +1,128 @@
+import math
+import random
+
+import pytest
+
+from app.services.distance_engine import DistanceEngine, haversine_distance
+
+# 浮動小数点の丸めの差だけを許容する（km）
+TOLERANCE_KM = 1e-6
+
+BACKENDS = [pytest.param(True, id="numpy"), pytest.param(False, id="python")]
+
+
+def random_points(count, seed=0):
+    rng = random.Random(seed)
+    return [(rng.uniform(-90, 90), rng.uniform(-180, 180)) for _ in range(count)]
+
+
+def make_engine(points, use_numpy):
+    return DistanceEngine(
+        list(range(1, len(points) + 1)),
+        [lat for lat, _ in points],
+        [lon for _, lon in points],
+        use_numpy=use_numpy,
+    )
+
+
+def expected_distances(origin, points):
+    return [haversine_distance(origin[0], origin[1], lat, lon) for lat, lon in points]
+
+
+def assert_close(actual, expected):
+    actual = [float(value) for value in actual]
+    assert len(actual) == len(expected)
+    for value, reference in zip(actual, expected):
+        assert not math.isnan(value)
+        assert value == pytest.approx(reference, abs=TOLERANCE_KM)
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_use_numpy_selects_backend(use_numpy):
+    engine = make_engine(random_points(3), use_numpy)
+    assert engine.use_numpy is use_numpy
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_random_points_match_scalar_function(use_numpy):
+    points = random_points(500)
+    engine = make_engine(points, use_numpy)
+    for origin in random_points(20, seed=1):
+        assert_close(engine.distances_from(*origin), expected_distances(origin, points))
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_positions_subset_matches_scalar_function(use_numpy):
+    points = random_points(100)
+    engine = make_engine(points, use_numpy)
+    positions = engine.positions_from_ranges([(3, 10), (50, 60)])
+    subset = points[3:10] + points[50:60]
+    origin = (35.68, 139.69)
+    assert_close(engine.distances_from(*origin, positions), expected_distances(origin, subset))
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+@pytest.mark.parametrize("origin, point", [
+    ((0.0, 0.0), (0.0, 180.0)),
+    ((35.68, 139.69), (-35.68, -40.31)),
+    ((90.0, 0.0), (-90.0, 0.0)),
+    ((45.0, 10.0), (-45.0, -170.0)),
+])
+def test_antipodal_points(use_numpy, origin, point):
+    engine = make_engine([point], use_numpy)
+    expected = expected_distances(origin, [point])
+    assert expected[0] == pytest.approx(math.pi * 6371, abs=1e-3)
+    assert_close(engine.distances_from(*origin), expected)
+    assert_close(engine.distance_matrix([origin])[0], expected)
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_identical_points(use_numpy):
+    points = random_points(50)
+    engine = make_engine(points, use_numpy)
+    for position, origin in enumerate(points):
+        positions = engine.positions_from_ranges([(position, position + 1)])
+        assert float(engine.distances_from(*origin, positions)[0]) == 0.0
+    assert engine.within(points[0][0], points[0][1], 0.0)[0] == (1, 0.0)
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_distance_matrix_matches_scalar_function(use_numpy):
+    points = random_points(200)
+    origins = random_points(15, seed=2)
+    engine = make_engine(points, use_numpy)
+    matrix = engine.distance_matrix(origins)
+    assert len(matrix) == len(origins)
+    for origin, row in zip(origins, matrix):
+        assert_close(row, expected_distances(origin, points))
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_within_matches_scalar_filter(use_numpy):
+    points = random_points(1000)
+    engine = make_engine(points, use_numpy)
+    origin = (35.68, 139.69)
+    radius = 3000
+    distances = expected_distances(origin, points)
+    expected = sorted(
+        ((hospital_id, distance) for hospital_id, distance in enumerate(distances, start=1) if distance <= radius),
+        key=lambda item: (item[1], item[0]),
+    )
+    actual = engine.within(origin[0], origin[1], radius)
+    assert [hospital_id for hospital_id, _ in actual] == [hospital_id for hospital_id, _ in expected]
+    assert_close([distance for _, distance in actual], [distance for _, distance in expected])
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_empty_candidate_set(use_numpy):
+    engine = make_engine(random_points(10), use_numpy)
+    positions = engine.positions_from_ranges([])
+    assert len(engine.distances_from(35.68, 139.69, positions)) == 0
+    assert engine.within(35.68, 139.69, 100, positions) == []
+    matrix = engine.distance_matrix([(35.68, 139.69), (34.69, 135.50)], positions)
+    assert [len(row) for row in matrix] == [0, 0]
+
+    empty = make_engine([], use_numpy)
+    assert len(empty) == 0
+    assert len(empty.distances_from(35.68, 139.69)) == 0
+    assert empty.within(35.68, 139.69, 100) == []
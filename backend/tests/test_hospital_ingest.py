@@ -0,0 +1,72 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import inspect, text
+
+from app.database import create_tables, engine
+from app.models.hospital import Hospital, HospitalSpecialty
+from app.services.hospital_scraper import HospitalScraper
+from app.services.hospital_service import HospitalService
+
+
+def drop_unique_indexes():
+    with engine.begin() as connection:
+        for name in ("uq_hospitals_name_address", "uq_hospital_specialties_hospital_name"):
+            connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def test_duplicates_are_merged_before_creating_unique_indexes(db):
+    # 一意インデックスが無かった頃の DB を再現する
+    drop_unique_indexes()
+    first = Hospital(name="重複病院", address="東京都新宿区1-1", phone_number="03-0000-0000", is_active=False)
+    second = Hospital(name="重複病院", address="東京都新宿区1-1", phone_number="03-0000-0001", is_active=True)
+    third = Hospital(name="重複病院", address="東京都新宿区1-1", phone_number="03-0000-0002", is_active=True)
+    db.add_all([first, second, third])
+    db.flush()
+    db.add_all([
+        HospitalSpecialty(hospital_id=first.id, specialty_name="内科"),
+        HospitalSpecialty(hospital_id=second.id, specialty_name="内科"),
+        HospitalSpecialty(hospital_id=third.id, specialty_name="外科"),
+        HospitalSpecialty(hospital_id=third.id, specialty_name="外科"),
+    ])
+    db.commit()
+
+    create_tables()
+
+    indexes = {index["name"] for index in inspect(engine).get_indexes("hospitals")}
+    assert "uq_hospitals_name_address" in indexes
+    hospitals = db.query(Hospital).all()
+    # 有効な行のうち ID が最小のものを残す
+    assert [hospital.id for hospital in hospitals] == [second.id]
+    specialties = sorted(
+        (specialty.hospital_id, specialty.specialty_name) for specialty in db.query(HospitalSpecialty)
+    )
+    assert specialties == [(second.id, "内科"), (second.id, "外科")]
+
+    # 一意インデックスがあれば upsert で既存の病院が更新される
+    saved = HospitalScraper(db).save_scraped_hospitals([
+        {"name": "重複病院", "address": "東京都新宿区1-1", "phone_number": "03-1111-1111",
+         "specialties": ["小児科"]},
+    ], rebuild_index=False)
+    assert saved == 1
+    db.expire_all()
+    assert db.query(Hospital).one().phone_number == "03-1111-1111"
+    assert db.query(HospitalSpecialty).count() == 3
+
+
+def test_manual_duplicates_are_rejected_before_the_unique_indexes(db):
+    service = HospitalService(db)
+    data = {"name": "手動病院", "address": "東京都港区1-1", "phone_number": "03-0000-0000"}
+    hospital = service.create_hospital(dict(data))
+    with pytest.raises(HTTPException) as excinfo:
+        service.create_hospital(dict(data, phone_number="03-9999-9999"))
+    assert excinfo.value.status_code == 400
+
+    service.add_hospital_specialty(hospital.id, {"specialty_name": "内科"})
+    with pytest.raises(HTTPException) as excinfo:
+        service.add_hospital_specialty(hospital.id, {"specialty_name": "内科"})
+    assert excinfo.value.status_code == 400
+
+    # セッションはロールバック不要のまま使える
+    service.add_hospital_specialty(hospital.id, {"specialty_name": "外科"})
+    assert db.query(Hospital).count() == 1
+    assert db.query(HospitalSpecialty).count() == 2
@@ -0,0 +1,41 @@
+"""負荷試験の SLO 判定: 到着が無かったエンドポイントを不合格・飽和とみなさないこと"""
+from benchmarks.load import summarize_slo
+
+
+def stage(rate, saturated=False, **passed):
+    return {
+        "rate": rate,
+        "saturated": saturated,
+        "endpoints": [{"name": name, "passed": value} for name, value in passed.items()],
+    }
+
+
+def test_endpoint_without_requests_is_not_a_failure():
+    summary = summarize_slo([
+        stage(5, nearby=True, scrape=True),
+        stage(10, nearby=True, scrape=None),
+    ], slo_rate=10)
+    assert summary["passed"] is True
+    assert summary["saturation_rps"] is None
+    assert summary["endpoints"]["scrape"] == {
+        "saturation_rps": None, "max_passing_rps": 5, "passed": None
+    }
+    assert summary["endpoints"]["nearby"]["max_passing_rps"] == 10
+
+
+def test_failures_still_set_saturation_and_fail_the_run():
+    summary = summarize_slo([
+        stage(5, nearby=True, scrape=None),
+        stage(10, nearby=False, scrape=True),
+        stage(20, saturated=True, nearby=True, scrape=True),
+    ], slo_rate=10)
+    assert summary["passed"] is False
+    assert summary["saturation_rps"] == 10
+    assert summary["endpoints"]["nearby"]["saturation_rps"] == 10
+    assert summary["endpoints"]["scrape"]["saturation_rps"] is None
+
+
+def test_saturated_stage_counts_for_the_whole_run():
+    summary = summarize_slo([stage(5, nearby=True), stage(10, saturated=True, nearby=True)], 5)
+    assert summary["passed"] is True
+    assert summary["saturation_rps"] == 10
@@ -0,0 +1,44 @@
+import pytest
+
+from app.services import news_scraper
+from app.services.news_scraper import HealthNewsScraper
+
+FEED_URL = "https://example.org/rss.xml"
+
+
+@pytest.fixture
+def scraper(db, tmp_path):
+    scraper = HealthNewsScraper(db, cache_path=str(tmp_path / "http_cache.db"))
+
+    def scrape_health_news():
+        scraper._pending_validators.append((FEED_URL, {"ETag": '"v1"'}))
+        return [{"title": "感染症の予防について", "source": "テスト", "url": "https://example.org/1"}]
+
+    scraper.scrape_health_news = scrape_health_news
+    scraper.scrape_health_alerts = lambda: []
+    return scraper
+
+
+def test_validators_are_stored_after_successful_save(scraper):
+    results = scraper.run_full_scraping()
+    assert results["news"]["inserted"] == 1
+    assert scraper.cache.validators(FEED_URL)["etag"] == '"v1"'
+
+
+def test_validators_are_not_stored_when_a_batch_fails(scraper, monkeypatch):
+    def failing_insert(db, table):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(news_scraper, "dialect_insert", failing_insert)
+    results = scraper.run_full_scraping()
+    assert results["news"]["rejected"] == 1
+    assert scraper.cache.validators(FEED_URL)["etag"] is None
+    assert scraper._pending_validators == []
+
+
+def test_feed_without_status_is_not_counted(scraper, monkeypatch):
+    network_error = news_scraper.feedparser.FeedParserDict(bozo=1, entries=[])
+    monkeypatch.setattr(news_scraper.feedparser, "parse", lambda *args, **kwargs: network_error)
+    scraper.cache.reset_stats()
+    assert scraper._scrape_from_mhlw() == []
+    assert scraper.cache.stats() == {"hits": 0, "misses": 0}
@@ -0,0 +1,20 @@
+"""管理者が作成したニュースにもスクレイピングと同じ重複判定キーが付くこと"""
+import pytest
+from fastapi import HTTPException
+
+from app.services.bulk_ingest import news_hash
+from app.services.news_service import NewsService
+
+NEWS = {"title": "季節性インフルエンザの流行", "content": "本文", "category": "感染症", "source": "厚生労働省"}
+
+
+def test_create_news_sets_content_hash(db):
+    news = NewsService(db).create_news(dict(NEWS))
+    assert news.content_hash == news_hash("厚生労働省", "季節性インフルエンザの流行")
+
+
+def test_create_news_rejects_duplicates_of_scraped_news(db):
+    NewsService(db).create_news(dict(NEWS))
+    with pytest.raises(HTTPException) as excinfo:
+        NewsService(db).create_news(dict(NEWS, content="別の本文"))
+    assert excinfo.value.status_code == 400
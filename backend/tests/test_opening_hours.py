@@ -0,0 +1,76 @@
+from datetime import datetime, time
+
+import pytest
+
+from app.services.opening_hours import WeeklySchedule, build_week_mask
+
+# 2024-01-15 は月曜日
+MONDAY = datetime(2024, 1, 15)
+
+
+def every_day(open_time, close_time):
+    return WeeklySchedule([(open_time, close_time)] * 7)
+
+
+def at(hour, minute, second=0, days=0):
+    return MONDAY.replace(day=MONDAY.day + days, hour=hour, minute=minute, second=second)
+
+
+def test_24_hours_stored_as_2359_is_open_until_midnight():
+    schedule = every_day(time(0, 0), time(23, 59))
+    for hour, minute, second in [(0, 0, 0), (12, 0, 0), (23, 45, 0), (23, 58, 59), (23, 59, 0), (23, 59, 59)]:
+        assert schedule.is_open_at(at(hour, minute, second)), (hour, minute, second)
+    assert schedule.next_open_at(at(23, 50)) is not None
+    assert bin(schedule.mask).count("1") == 7 * 96
+
+
+@pytest.mark.parametrize("hour, minute, expected", [
+    (9, 0, False),
+    (9, 4, False),
+    (9, 5, True),
+    (9, 10, True),
+    (16, 59, True),
+    (17, 0, True),
+    (17, 7, True),
+    (17, 8, False),
+])
+def test_off_grid_times(hour, minute, expected):
+    schedule = WeeklySchedule([(time(9, 5), time(17, 8))] + [(None, None)] * 6)
+    assert schedule.is_open_at(at(hour, minute)) is expected
+
+
+def test_mask_marks_every_overlapping_slot():
+    # 09:05〜09:10 は 09:00 のスロットだけに重なる
+    mask = build_week_mask([(time(9, 5), time(9, 10))] + [(None, None)] * 6)
+    assert mask == 1 << (9 * 4)
+
+
+def test_overnight_hours():
+    schedule = WeeklySchedule([(time(22, 10), time(2, 20))] + [(None, None)] * 6)
+    assert not schedule.is_open_at(at(22, 5))
+    assert schedule.is_open_at(at(22, 10))
+    assert schedule.is_open_at(at(2, 19, days=1))
+    assert not schedule.is_open_at(at(2, 20, days=1))
+    assert not schedule.is_open_at(at(1, 0))
+
+
+def test_overnight_from_sunday_wraps_to_monday():
+    schedule = WeeklySchedule([(None, None)] * 6 + [(time(23, 0), time(1, 30))])
+    assert schedule.is_open_at(at(1, 0))
+    assert not schedule.is_open_at(at(1, 30))
+
+
+def test_next_open_at_returns_exact_opening_time():
+    schedule = WeeklySchedule([(time(9, 5), time(17, 0))] * 5 + [(None, None)] * 2)
+    assert schedule.next_open_at(at(8, 0)) == at(9, 5)
+    assert schedule.next_open_at(at(9, 1)) == at(9, 5)
+    assert schedule.next_open_at(at(17, 30)) == at(9, 5, days=1)
+    # 金曜の夜は翌週の月曜
+    assert schedule.next_open_at(at(18, 0, days=4)) == at(9, 5, days=7)
+
+
+def test_closed_all_week():
+    schedule = WeeklySchedule([(None, None)] * 7)
+    assert schedule.mask == 0
+    assert not schedule.is_open_at(at(12, 0))
+    assert schedule.next_open_at(at(12, 0)) is None
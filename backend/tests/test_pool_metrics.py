@@ -0,0 +1,30 @@
+"""同期・非同期エンジンのプールのメトリクスが混ざらないこと"""
+from sqlalchemy import text
+
+from app import database
+from app.metrics import registry
+
+
+def test_each_engine_records_its_own_checkout_metrics():
+    sync_metrics = database.engine.pool.metrics
+    async_metrics = database.async_engine.sync_engine.pool.metrics
+    assert sync_metrics is database.pool_metrics
+    assert async_metrics is database.async_pool_metrics
+    assert async_metrics.checkout_seconds is not sync_metrics.checkout_seconds
+    assert async_metrics.checkout_seconds.name == "db_async_pool_checkout_seconds"
+    assert async_metrics.checkout_timeouts.name == "db_async_pool_checkout_timeouts_total"
+
+    sync_before = sync_metrics.checkout_seconds.snapshot()["count"]
+    async_before = async_metrics.checkout_seconds.snapshot()["count"]
+    with database.engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    assert sync_metrics.checkout_seconds.snapshot()["count"] == sync_before + 1
+    assert async_metrics.checkout_seconds.snapshot()["count"] == async_before
+
+
+def test_metrics_registry_exposes_both_pools():
+    assert "db_pool_checkout_seconds" in registry.snapshot("db_pool_")
+    assert "db_async_pool_checkout_seconds" not in registry.snapshot("db_pool_")
+    assert set(registry.snapshot("db_async_pool_")) >= {
+        "db_async_pool_checkout_seconds", "db_async_pool_checkout_timeouts_total",
+    }
@@ -0,0 +1,107 @@
+"""病院の一覧・詳細が件数に関係なく一定回数の SQL で済むこと（N+1 の回帰検出）"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import async_engine, count_queries
+from app.main import app
+from app.models.hospital import Hospital, HospitalSpecialty
+from app.response_cache import response_cache
+from app.services.hospital_service import HospitalService
+from app.services.spatial_index import hospital_index
+
+TOKYO = (35.6812, 139.7671)
+
+
+def seed_hospitals(db, count):
+    hospitals = [
+        Hospital(
+            name=f"テスト病院{i}", address=f"東京都千代田区{i}-1", phone_number="03-0000-0000",
+            latitude=TOKYO[0] + i * 0.001, longitude=TOKYO[1] + i * 0.001, is_active=True,
+        )
+        for i in range(count)
+    ]
+    db.add_all(hospitals)
+    db.flush()
+    db.add_all([
+        HospitalSpecialty(hospital_id=hospital.id, specialty_name=name, is_available=True)
+        for hospital in hospitals
+        for name in ("内科", "小児科", "皮膚科")
+    ])
+    db.commit()
+    hospital_index.invalidate()
+    response_cache.clear()
+    return [hospital.id for hospital in hospitals]
+
+
+def counted(bind, call):
+    """1回目（インデックスの構築など）の後に、2回目の SQL 文の数を返す"""
+    call()
+    response_cache.clear()
+    with count_queries(bind) as counter:
+        call()
+    return counter.count
+
+
+@pytest.fixture
+def client():
+    # startup（初期データの投入）は実行しない
+    return TestClient(app)
+
+
+def test_get_nearby_hospitals_query_count_is_constant(db):
+    counts = {}
+    for count in (1, 20):
+        seed_hospitals(db, count)
+        service = HospitalService(db)
+
+        def call():
+            hospitals = service.get_nearby_hospitals(TOKYO[0], TOKYO[1], distance_km=10, limit=count)
+            assert len(hospitals) == count
+            assert all(len(hospital["specialties"]) == 3 for hospital in hospitals)
+
+        counts[count] = counted(db.get_bind(), call)
+        db.query(HospitalSpecialty).delete()
+        db.query(Hospital).delete()
+        db.commit()
+    assert counts[1] == counts[20]
+
+
+def test_search_endpoint_query_count_is_constant(db, client):
+    counts = {}
+    for count in (1, 20):
+        seed_hospitals(db, count)
+
+        def call():
+            response = client.post("/api/v1/hospitals/search", json={"specialties": ["内科"]})
+            assert response.status_code == 200
+            assert len(response.json()) == count
+            assert all(len(hospital["specialties"]) == 3 for hospital in response.json())
+
+        counts[count] = counted(async_engine.sync_engine, call)
+        db.query(HospitalSpecialty).delete()
+        db.query(Hospital).delete()
+        db.commit()
+    assert counts[1] == counts[20]
+
+
+def test_detail_endpoint_query_count_is_constant(db, client):
+    counts = {}
+    for count in (1, 20):
+        hospital_ids = seed_hospitals(db, count)
+        # 診療科の数を病院数に合わせて増やしても SQL の数は変わらない
+        db.add_all([
+            HospitalSpecialty(hospital_id=hospital_ids[0], specialty_name=f"診療科{i}", is_available=True)
+            for i in range(count)
+        ])
+        db.commit()
+
+        def call():
+            response = client.get(f"/api/v1/hospitals/{hospital_ids[0]}")
+            assert response.status_code == 200
+            assert len(response.json()["specialties"]) == count + 3
+
+        counts[count] = counted(async_engine.sync_engine, call)
+        db.query(HospitalSpecialty).delete()
+        db.query(Hospital).delete()
+        db.commit()
+    assert counts[1] == counts[20]
@@ -0,0 +1,80 @@
+"""応答キャッシュ: ETag / 304 と、作成時のバージョンによる無効化"""
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.news import HealthNews
+from app.response_cache import response_cache
+from app.services.news_service import NewsService
+from app.services.symptom_autocomplete import symptom_autocomplete
+from app.services.symptom_service import SymptomService
+
+client = TestClient(app)
+SUGGESTIONS = "/api/v1/symptoms/suggestions"
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    response_cache.clear()
+    symptom_autocomplete.invalidate()
+    yield
+    response_cache.clear()
+    symptom_autocomplete.invalidate()
+
+
+def test_etag_and_not_modified():
+    first = client.get("/api/v1/symptoms/categories")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = client.get("/api/v1/symptoms/categories", headers={"If-None-Match": if_none_match})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    response = client.get("/api/v1/symptoms/categories", headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+    assert response.json() == first.json()
+
+
+def test_create_symptom_changes_the_etag_instead_of_a_stale_304(db):
+    service = SymptomService(db)
+    service.create_symptom({"name": "頭痛", "category": "頭部"})
+    first = client.get(SUGGESTIONS, params={"q": "頭"})
+    assert [item["text"] for item in first.json()] == ["頭痛"]
+    etag = first.headers["etag"]
+    assert client.get(SUGGESTIONS, params={"q": "頭"}, headers={"If-None-Match": etag}).status_code == 304
+
+    service.create_symptom({"name": "頭重感", "category": "頭部"})
+    response = client.get(SUGGESTIONS, params={"q": "頭"}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert sorted(item["text"] for item in response.json()) == ["頭痛", "頭重感"]
+
+
+def test_create_news_invalidates_cached_queries(db):
+    service = NewsService(db)
+    service.create_news({"title": "花粉の飛散予測", "content": "本文", "category": "季節"})
+    assert service.get_news_categories() == ["季節"]
+
+    service.create_news({"title": "食中毒に注意", "content": "本文", "category": "感染症"})
+    assert sorted(service.get_news_categories()) == ["季節", "感染症"]
+
+
+def test_cached_query_is_reused_until_invalidated(db):
+    service = NewsService(db)
+    service.create_news({"title": "花粉の飛散予測", "content": "本文", "category": "季節"})
+    assert service.get_news_categories() == ["季節"]
+
+    # 作成系を通さない変更は無効化されるまで反映されない（キャッシュが使われている）
+    db.add(HealthNews(
+        title="直接追加", content="本文", category="直接", is_published=True, published_date=datetime.utcnow()
+    ))
+    db.commit()
+    assert service.get_news_categories() == ["季節"]
+    response_cache.invalidate("news")
+    assert sorted(service.get_news_categories()) == ["季節", "直接"]
@@ -0,0 +1,57 @@
+"""他プロセスでの病院の更新を空間インデックスが検出すること"""
+from app.database import count_queries, engine
+from app.models.hospital import Hospital
+from app.services import spatial_index
+from app.services.spatial_index import HospitalSpatialIndex
+
+TOKYO = (35.6812, 139.7671)
+
+
+def add_hospital(db, name, latitude=TOKYO[0], longitude=TOKYO[1]):
+    hospital = Hospital(
+        name=name, address=f"東京都千代田区 {name}", phone_number="03-0000-0000",
+        latitude=latitude, longitude=longitude, is_active=True,
+    )
+    db.add(hospital)
+    db.commit()
+    return hospital
+
+
+def nearby_ids(index):
+    return {hospital_id for hospital_id, _ in index.query_radius(*TOKYO, 5.0)}
+
+
+def test_ensure_built_picks_up_writes_from_other_processes(db, monkeypatch):
+    monkeypatch.setattr(spatial_index, "INDEX_CHECK_SECONDS", 0)
+    index = HospitalSpatialIndex()
+    first = add_hospital(db, "既存病院")
+    index.ensure_built(db)
+    assert nearby_ids(index) == {first.id}
+
+    # 別プロセスのワーカーによる追加（このインデックスには通知されない）
+    second = add_hospital(db, "新規病院")
+    index.ensure_built(db)
+    assert nearby_ids(index) == {first.id, second.id}
+
+    second.latitude, second.longitude = 43.0621, 141.3544  # 札幌へ移転
+    db.commit()
+    index.ensure_built(db)
+    assert nearby_ids(index) == {first.id}
+
+
+def test_ensure_built_checks_cheaply_and_throttles(db, monkeypatch):
+    index = HospitalSpatialIndex()
+    add_hospital(db, "既存病院")
+    index.ensure_built(db)
+
+    monkeypatch.setattr(spatial_index, "INDEX_CHECK_SECONDS", 0)
+    with count_queries(engine) as counter:
+        index.ensure_built(db)
+    assert counter.count == 1  # 変更が無ければ確認の1文だけ
+
+    monkeypatch.setattr(spatial_index, "INDEX_CHECK_SECONDS", 3600)
+    add_hospital(db, "新規病院")
+    with count_queries(engine) as counter:
+        index.ensure_built(db)
+    assert counter.count == 0
+    assert len(index) == 1
@@ -0,0 +1,94 @@
+import random
+
+from sqlalchemy import func
+
+from app.models.symptom import Symptom, UserSymptom
+from app.models.user import User
+from app.services.symptom_autocomplete import (
+    NODE_TOP_K, SuggestionEntry, SymptomAutocomplete, symptom_autocomplete
+)
+from app.services.symptom_service import SymptomService
+
+
+def build(popularity):
+    autocomplete = SymptomAutocomplete()
+    autocomplete.build([
+        (SuggestionEntry(symptom_id, f"頭痛{symptom_id}", "頭部", None, count), [])
+        for symptom_id, count in popularity.items()
+    ])
+    return autocomplete
+
+
+def expected_top(autocomplete, prefix):
+    """部分木から数え直した上位候補"""
+    return [entry.id for entry in sorted(
+        (entry for entry in autocomplete._entries.values() if entry.name.startswith(prefix)),
+        key=lambda entry: entry.rank_key()
+    )][:NODE_TOP_K]
+
+
+def test_record_usage_keeps_top_equal_to_full_rebuild():
+    rng = random.Random(0)
+    autocomplete = build({symptom_id: rng.randint(0, 5) for symptom_id in range(1, NODE_TOP_K * 2 + 1)})
+    for _ in range(200):
+        symptom_ids = rng.sample(range(1, NODE_TOP_K * 2 + 1), 3)
+        if rng.random() < 0.5:
+            autocomplete.record_usage(symptom_ids)
+        else:
+            autocomplete.record_usage([], symptom_ids)
+        assert [entry.id for entry in autocomplete.suggest("頭痛", NODE_TOP_K)] == expected_top(autocomplete, "頭痛")
+
+
+def test_decrement_lets_lower_ranked_symptom_back_into_top():
+    popularity = {symptom_id: 10 for symptom_id in range(1, NODE_TOP_K + 1)}
+    popularity[NODE_TOP_K + 1] = 5
+    autocomplete = build(popularity)
+    assert NODE_TOP_K + 1 not in autocomplete._root.top
+
+    autocomplete.record_usage([], [1] * 10)
+    assert NODE_TOP_K + 1 in autocomplete._root.top
+    assert 1 not in autocomplete._root.top
+    assert autocomplete._entries[1].popularity == 0
+
+
+def test_promote_replaces_top_list_instead_of_mutating_it():
+    autocomplete = build({1: 1, 2: 2})
+    before = autocomplete._root.top
+    snapshot = list(before)
+    autocomplete.record_usage([1, 1, 1])
+    assert before == snapshot
+    assert autocomplete._root.top == [1, 2]
+
+
+def test_rerecording_symptoms_keeps_popularity_equal_to_database(db):
+    user = User(email="record@example.com", hashed_password="x", full_name="記録")
+    symptoms = [Symptom(name=f"咳{i}", category="呼吸器") for i in range(3)]
+    db.add_all([user, *symptoms])
+    db.commit()
+    service = SymptomService(db)
+    symptom_autocomplete.invalidate()
+    symptom_autocomplete.ensure_built(db)
+
+    service.record_user_symptoms(user.id, [{"symptom_id": symptoms[0].id, "severity": 3}])
+    service.record_user_symptoms(user.id, [{"symptom_id": symptoms[0].id, "severity": 4}])
+    service.record_user_symptoms(user.id, [{"symptom_id": symptoms[1].id, "severity": 2}])
+
+    counts = dict(
+        db.query(UserSymptom.symptom_id, func.count(UserSymptom.id)).group_by(UserSymptom.symptom_id)
+    )
+    for symptom in symptoms:
+        assert symptom_autocomplete._entries[symptom.id].popularity == counts.get(symptom.id, 0)
+    symptom_autocomplete.invalidate()
+
+
+def test_recording_symptoms_does_not_invalidate_response_cache(db):
+    from app.response_cache import response_cache
+
+    user = User(email="cache@example.com", hashed_password="x", full_name="キャッシュ")
+    symptom = Symptom(name="鼻水", category="呼吸器")
+    db.add_all([user, symptom])
+    db.commit()
+    before = response_cache.versions(["symptoms"])
+    SymptomService(db).record_user_symptoms(user.id, [{"symptom_id": symptom.id, "severity": 2}])
+    assert response_cache.versions(["symptoms"]) == before
+    symptom_autocomplete.invalidate()